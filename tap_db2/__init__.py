@@ -1,6 +1,8 @@
 # import datetime
 import collections
+import concurrent.futures
 import itertools
+import json
 
 # from itertools import dropwhile
 # import json
@@ -30,12 +32,41 @@ from tap_db2.connection import (
     get_db2_sql_engine,
     ResultIterator,
 )
+from tap_db2.output import SharedState, snapshot_state, write_message
 
 from sqlalchemy import text
 from sqlalchemy.exc import ProgrammingError
 
 ARRAYSIZE = 1
 
+# Fetch size for the discovery queries when cursor_array_size is auto
+AUTO_DISCOVERY_ARRAYSIZE = 1000
+
+# (schema, table) pairs looked up per SYSCAT query when discovering
+# specific tables
+DISCOVERY_BATCH_SIZE = 100
+
+CATALOG_CACHE_VERSION = 2
+
+# Config changing the discovered schemas; a catalog cache built with other
+# values is discarded
+CATALOG_CACHE_CONFIG_KEYS = ["use_date_datatype", "use_singer_decimal"]
+
+# SYSCAT.TABLES statistics (from RUNSTATS) kept in table_info, with the
+# stream metadata they are written to
+TABLE_STATISTICS_METADATA = {
+    "row_count": "row-count",
+    "pages": "pages",
+    "file_pages": "file-pages",
+    "average_row_size": "average-row-size",
+}
+
+STREAM_ORDERINGS = ["largest_first", "smallest_first"]
+
+# Stream metadata describing how the table is laid out, always taken from the
+# freshly discovered catalog when syncing
+DISCOVERED_TABLE_METADATA = ["data-partition-key", "data-partitions"]
+
 Column = collections.namedtuple(
     "Column",
     [
@@ -46,6 +77,8 @@ Column = collections.namedtuple(
         "character_maximum_length",
         "numeric_scale",
         "is_primary_key",
+        "column_cardinality",
+        "average_column_length",
     ],
 )
 
@@ -254,53 +287,318 @@ def create_column_metadata(cols, config):
             "sql-datatype",
             c.data_type.strip().lower(),
         )
+        # COLCARD is -1 when statistics have not been collected
+        if c.column_cardinality is not None and c.column_cardinality >= 0:
+            mdata = metadata.write(
+                mdata,
+                ("properties", c.column_name),
+                "column-cardinality",
+                c.column_cardinality,
+            )
+        # AVGCOLLEN is -1 when statistics have not been collected
+        if c.average_column_length is not None and c.average_column_length >= 0:
+            mdata = metadata.write(
+                mdata,
+                ("properties", c.column_name),
+                "average-column-length",
+                c.average_column_length,
+            )
+        if c.data_type.strip().lower() in DECIMAL_TYPES:
+            mdata = metadata.write(
+                mdata,
+                ("properties", c.column_name),
+                "numeric-precision",
+                c.character_maximum_length,
+            )
+            mdata = metadata.write(
+                mdata,
+                ("properties", c.column_name),
+                "numeric-scale",
+                c.numeric_scale,
+            )
 
     return metadata.to_list(mdata)
 
 
-def discover_catalog(db2_conn, config):
-    
-    """Returns a Catalog describing the structure of the database."""
-    LOGGER.info("Preparing Catalog")
+def data_partition_limit(value):
+    """Returns a SYSCAT.DATAPARTITIONS LOWVALUE/HIGHVALUE as the string DB2
+    casts back when comparing it with the partitioning column, or None for
+    MINVALUE and MAXVALUE"""
+    if value is None:
+        return None
+    value = value.strip()
+    if value in ("MINVALUE", "MAXVALUE", ""):
+        return None
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        value = value[1:-1].replace("''", "'")
+    return value
 
-    with db2_conn.connect() as open_conn:
-        LOGGER.info("Fetching tables")
-        # Query for LUW DB2 instances only - SYSCAT may not exist on Z/OS
-        tables_results = open_conn.execute(text(
+
+def config_list(value):
+    """Config lists can be given as a list or a comma separated string"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value if item.strip()]
+
+
+def discovery_filter(config, schema_column="t.TABSCHEMA", table_column="t.TABNAME"):
+    """
+    Returns predicates (each starting with AND) restricting a SYSCAT query to
+    the schemas in filter_schemas and to the tables matching the LIKE
+    patterns in include_tables but none in exclude_tables, with their bind
+    parameters.
+    """
+    predicates = []
+    params = {}
+
+    filter_schemas = config_list(config.get("filter_schemas"))
+    if filter_schemas:
+        names = []
+        for i, schema in enumerate(filter_schemas):
+            params[f"filter_schema_{i}"] = schema
+            names.append(f":filter_schema_{i}")
+        predicates.append(f"AND {schema_column} IN ({', '.join(names)})")
+
+    include_tables = config_list(config.get("include_tables"))
+    if include_tables:
+        patterns = []
+        for i, pattern in enumerate(include_tables):
+            params[f"include_table_{i}"] = pattern
+            patterns.append(f"{table_column} LIKE :include_table_{i}")
+        predicates.append(f"AND ({' OR '.join(patterns)})")
+
+    for i, pattern in enumerate(config_list(config.get("exclude_tables"))):
+        params[f"exclude_table_{i}"] = pattern
+        predicates.append(f"AND {table_column} NOT LIKE :exclude_table_{i}")
+
+    return "\n".join(predicates), params
+
+
+def table_pairs_filter(pairs, schema_column="t.TABSCHEMA", table_column="t.TABNAME"):
+    """Returns a predicate (starting with AND) restricting a SYSCAT query to
+    the given (schema, table) pairs, with its bind parameters"""
+    terms = []
+    params = {}
+    for i, (schema, table) in enumerate(pairs):
+        params[f"pair_schema_{i}"] = schema
+        params[f"pair_table_{i}"] = table
+        terms.append(
+            f"({schema_column} = :pair_schema_{i} AND {table_column} = :pair_table_{i})"
+        )
+    return f"AND ({' OR '.join(terms)})", params
+
+
+def table_range_filter(table_range, schema_column="t.TABSCHEMA", table_column="t.TABNAME"):
+    """Returns predicates (each starting with AND) restricting a SYSCAT query
+    to the tables from the (schema, table) pair low, included, up to high,
+    excluded, with their bind parameters. Either end may be None."""
+    low, high = table_range
+    predicates = []
+    params = {}
+    for name, bound, operator in (("low", low, ">"), ("high", high, "<")):
+        if bound is None:
+            continue
+        params[f"range_{name}_schema"], params[f"range_{name}_table"] = bound
+        table_operator = ">=" if name == "low" else "<"
+        predicates.append(
+            f"AND ({schema_column} {operator} :range_{name}_schema"
+            f" OR ({schema_column} = :range_{name}_schema"
+            f" AND {table_column} {table_operator} :range_{name}_table))"
+        )
+    return "\n".join(predicates), params
+
+
+def table_filters(
+    config, pairs, schema_column="t.TABSCHEMA", table_column="t.TABNAME", table_range=None
+):
+    """Yields the predicates and parameters of each SYSCAT query needed to
+    cover pairs, DISCOVERY_BATCH_SIZE pairs at a time, or of the single
+    query covering every table passing the discovery filter (within
+    table_range, when given) when pairs is None"""
+    if pairs is None:
+        predicates, params = discovery_filter(config, schema_column, table_column)
+        if table_range is not None:
+            range_predicates, range_params = table_range_filter(
+                table_range, schema_column, table_column
+            )
+            predicates = "\n".join(p for p in (predicates, range_predicates) if p)
+            params.update(range_params)
+        yield predicates, params
+        return
+    for start in range(0, len(pairs), DISCOVERY_BATCH_SIZE):
+        yield table_pairs_filter(
+            pairs[start : start + DISCOVERY_BATCH_SIZE], schema_column, table_column
+        )
+
+
+def fetch_tables(open_conn, config, pairs=None):
+    """Returns the tables to discover, those in pairs when given, as
+    {schema: {table: info}}"""
+    LOGGER.info("Fetching tables")
+    table_info = {}
+
+    for table_filter, filter_params in table_filters(config, pairs):
+        fetch_table_batch(open_conn, table_filter, filter_params, table_info)
+
+    return table_info
+
+
+def table_statistic(value):
+    # -1 until RUNSTATS has collected the statistic
+    if value is None or int(value) < 0:
+        return None
+    return int(value)
+
+
+def write_table_statistics(md_map, info):
+    """Writes the statistics in a table's info to its metadata, dropping
+    those that are no longer known"""
+    for key, metadata_key in TABLE_STATISTICS_METADATA.items():
+        value = info.get(key)
+        if value is not None:
+            md_map = metadata.write(md_map, (), metadata_key, value)
+        else:
+            md_map.get((), {}).pop(metadata_key, None)
+    return md_map
+
+
+def fetch_table_batch(open_conn, table_filter, filter_params, table_info):
+    # Query for LUW DB2 instances only - SYSCAT may not exist on Z/OS
+    tables_results = open_conn.execute(text(
+        """
+        SELECT
+            RTRIM(TABSCHEMA) AS TABLE_SCHEMA,
+            TABNAME AS TABLE_NAME,
+            TYPE AS TABLE_TYPE,
+            CREATE_TIME,
+            ALTER_TIME,
+            STATS_TIME,
+            CARD,
+            NPAGES,
+            FPAGES,
+            AVGROWSIZE
+        FROM SYSCAT.TABLES t
+        WHERE t.TABSCHEMA NOT IN (
+            'SYSTOOLS',
+            'SYSIBM',
+            'SYSCAT',
+            'SYSPUBLIC',
+            'SYSSTAT',
+            'SYSIBMADM'
+        )
+        {}
+        """.format(table_filter)).bindparams(**filter_params)
+    )
+
+    for (
+        db,
+        table,
+        table_type,
+        create_time,
+        alter_time,
+        stats_time,
+        card,
+        npages,
+        fpages,
+        avgrowsize,
+    ) in tables_results.fetchall():
+        if db not in table_info:
+            table_info[db] = {}
+
+        table_info[db][table] = {
+            "row_count": table_statistic(card),
+            "pages": table_statistic(npages),
+            "file_pages": table_statistic(fpages),
+            "average_row_size": table_statistic(avgrowsize),
+            "is_view": table_type == "V",
+            "is_alias": table_type == "A",
+            "create_time": str(create_time),
+            "alter_time": str(alter_time),
+            "stats_time": str(stats_time),
+        }
+
+        LOGGER.debug(f"Schema: {db}, Table: {table}")
+        # Previously this would dump the entire catalog each loop
+        # this will only dump the current table info
+        LOGGER.debug(table_info[db][table])
+
+
+def fetch_data_partitions(open_conn, config, table_info, pairs=None, table_range=None):
+    """Adds the data partitions of the tables in pairs (default: every
+    table, or those in table_range) to table_info"""
+    LOGGER.info("Fetching data partitions")
+
+    for partition_filter, filter_params in table_filters(
+        config, pairs, "p.TABSCHEMA", "p.TABNAME", table_range
+    ):
+        # Range partitioned tables with a single partitioning column; STATUS
+        # is blank for partitions that are visible (attached and not
+        # being detached)
+        data_partition_results = open_conn.execute(text(
             """
             SELECT
-                RTRIM(TABSCHEMA) AS TABLE_SCHEMA,
-                TABNAME AS TABLE_NAME,
-                TYPE AS TABLE_TYPE
-            FROM SYSCAT.TABLES t
-            WHERE t.TABSCHEMA NOT IN (
-                'SYSTOOLS',
-                'SYSIBM',
-                'SYSCAT',
-                'SYSPUBLIC',
-                'SYSSTAT',
-                'SYSIBMADM'
+                RTRIM(p.TABSCHEMA) AS TABLE_SCHEMA,
+                p.TABNAME AS TABLE_NAME,
+                e.DATAPARTITIONEXPRESSION AS PARTITION_KEY,
+                p.DATAPARTITIONNAME AS PARTITION_NAME,
+                p.LOWVALUE,
+                p.HIGHVALUE,
+                p.LOWINCLUSIVE,
+                p.HIGHINCLUSIVE
+            FROM SYSCAT.DATAPARTITIONS p
+            JOIN SYSCAT.DATAPARTITIONEXPRESSION e
+            ON e.TABSCHEMA = p.TABSCHEMA
+            AND e.TABNAME = p.TABNAME
+            WHERE p.TABSCHEMA NOT LIKE 'SYS%'
+            AND p.STATUS = ''
+            AND NOT EXISTS (
+                SELECT 1 FROM SYSCAT.DATAPARTITIONEXPRESSION e2
+                WHERE e2.TABSCHEMA = p.TABSCHEMA
+                AND e2.TABNAME = p.TABNAME
+                AND e2.DATAPARTITIONKEYSEQ > 1
             )
-            """)
+            {}
+            ORDER BY p.TABSCHEMA, p.TABNAME, p.SEQNO
+            """.format(partition_filter)).bindparams(**filter_params)
         )
-        table_info = {}
 
-        for (db, table, table_type) in tables_results.fetchall():
-            if db not in table_info:
-                table_info[db] = {}
+        for (
+            db,
+            table,
+            partition_key,
+            partition_name,
+            low_value,
+            high_value,
+            low_inclusive,
+            high_inclusive,
+        ) in data_partition_results.fetchall():
+            if table not in table_info.get(db, {}):
+                continue
+            table_info[db][table]["data_partition_key"] = (
+                str(partition_key).strip().strip('"')
+            )
+            table_info[db][table].setdefault("data_partitions", []).append(
+                {
+                    "name": partition_name,
+                    "low": data_partition_limit(low_value),
+                    "high": data_partition_limit(high_value),
+                    "low-inclusive": low_inclusive == "Y",
+                    "high-inclusive": high_inclusive == "Y",
+                }
+            )
 
-            table_info[db][table] = {
-                "row_count": None,
-                "is_view": table_type == "V",
-            }
 
-            LOGGER.debug(f"Schema: {db}, Table: {table}")
-            # Previously this would dump the entire catalog each loop
-            # this will only dump the current table info
-            LOGGER.debug(table_info[db][table])
-            
-        LOGGER.info("Tables fetched, fetching columns")
+def fetch_columns(open_conn, config, pairs=None, table_range=None):
+    """Returns the Columns of the tables in pairs (default: every table, or
+    those in table_range), ordered by table"""
+    LOGGER.info("Fetching columns")
+    columns = []
 
+    for table_filter, filter_params in table_filters(
+        config, pairs, table_range=table_range
+    ):
         # Query for LUW DB2 instances only - SYSCAT may not exist on Z/OS
         # 1.0.4 - updated to include BASE_TABNAME check for aliases
         column_results = open_conn.execute(text(
@@ -315,7 +613,9 @@ def discover_catalog(db2_conn, config):
                 CASE
                     WHEN c.KEYSEQ IS NOT NULL THEN 1
                     ELSE 0
-                END AS IS_PRIMARY_KEY
+                END AS IS_PRIMARY_KEY,
+                c.COLCARD AS COLUMN_CARDINALITY,
+                c.AVGCOLLEN AS AVERAGE_COLUMN_LENGTH
             FROM 
             SYSCAT.TABLES t
             LEFT JOIN 
@@ -323,71 +623,277 @@ def discover_catalog(db2_conn, config):
             ON (c.TABNAME = t.TABNAME or C.TABNAME = t.BASE_TABNAME) 
             AND c.TABSCHEMA = t.TABSCHEMA 
             WHERE t.TABSCHEMA NOT LIKE 'SYS%'
+            {}
             ORDER BY t.TABSCHEMA,t.TABNAME,c.COLNO;
-            """)
+            """.format(table_filter)).bindparams(**filter_params)
         )
-        columns = []
         LOGGER.info(f"{ARRAYSIZE=}")
-        
+
         for r in ResultIterator(column_results, ARRAYSIZE):
             columns.append(Column(*r))
-        
-        LOGGER.info("Columns Fetched")
-        entries = []
-        for (k, cols) in itertools.groupby(
-            columns, lambda c: (c.table_schema, c.table_name)
+
+    LOGGER.info("Columns Fetched")
+    return columns
+
+
+def build_catalog_entries(columns, table_info, config):
+    entries = []
+    for (k, cols) in itertools.groupby(
+        columns, lambda c: (c.table_schema, c.table_name)
+    ):
+        cols = list(cols)
+        (table_schema, table_name) = k
+        schema = Schema(
+            type="object",
+            properties={c.column_name: schema_for_column(c, config) for c in cols},
+        )
+        md = create_column_metadata(cols, config)
+        md_map = metadata.to_map(md)
+
+        md_map = metadata.write(md_map, (), "database-name", table_schema)
+
+        is_view = table_info[table_schema][table_name]["is_view"]
+
+        if (
+            table_schema in table_info
+            and table_name in table_info[table_schema]
         ):
-            cols = list(cols)
-            (table_schema, table_name) = k
-            schema = Schema(
-                type="object",
-                properties={c.column_name: schema_for_column(c, config) for c in cols},
+            md_map = write_table_statistics(
+                md_map, table_info[table_schema][table_name]
             )
-            md = create_column_metadata(cols, config)
-            md_map = metadata.to_map(md)
 
-            md_map = metadata.write(md_map, (), "database-name", table_schema)
+            md_map = metadata.write(md_map, (), "is-view", is_view)
 
-            is_view = table_info[table_schema][table_name]["is_view"]
-
-            if (
-                table_schema in table_info
-                and table_name in table_info[table_schema]
-            ):
-                row_count = table_info[table_schema][table_name].get(
-                    "row_count"
+            data_partitions = table_info[table_schema][table_name].get(
+                "data_partitions"
+            )
+            if data_partitions:
+                md_map = metadata.write(
+                    md_map,
+                    (),
+                    "data-partition-key",
+                    table_info[table_schema][table_name]["data_partition_key"],
+                )
+                md_map = metadata.write(
+                    md_map, (), "data-partitions", data_partitions
                 )
 
-                if row_count is not None:
-                    md_map = metadata.write(md_map, (), "row-count", row_count)
+        key_properties = [
+            c.column_name for c in cols if c.is_primary_key == 1
+        ]
 
-                md_map = metadata.write(md_map, (), "is-view", is_view)
+        md_map = metadata.write(
+            md_map, (), "table-key-properties", key_properties
+        )
 
-            key_properties = [
-                c.column_name for c in cols if c.is_primary_key == 1
-            ]
+        entry = CatalogEntry(
+            table=table_name,
+            stream=table_name,
+            metadata=metadata.to_list(md_map),
+            tap_stream_id=common.generate_tap_stream_id(
+                table_schema, table_name
+            ),
+            schema=schema,
+        )
 
-            md_map = metadata.write(
-                md_map, (), "table-key-properties", key_properties
-            )
+        entries.append(entry)
+    return entries
 
-            entry = CatalogEntry(
-                table=table_name,
-                stream=table_name,
-                metadata=metadata.to_list(md_map),
-                tap_stream_id=common.generate_tap_stream_id(
-                    table_schema, table_name
-                ),
-                schema=schema,
+
+def catalog_cache_config(config):
+    return {key: config.get(key) for key in CATALOG_CACHE_CONFIG_KEYS}
+
+
+def load_catalog_cache(path, config):
+    """Returns the cached tables as {tap_stream_id: {create_time,
+    alter_time, stats_time, entry}}, or nothing when the cache is missing or was built
+    with another version or schema config"""
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            cache = json.load(cache_file)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        LOGGER.warning(f"Catalog cache {path} is not valid JSON, rebuilding it")
+        return {}
+
+    if cache.get("version") != CATALOG_CACHE_VERSION or cache.get(
+        "config"
+    ) != catalog_cache_config(config):
+        LOGGER.info(f"Catalog cache {path} is out of date, rebuilding it")
+        return {}
+    return cache.get("tables", {})
+
+
+def save_catalog_cache(path, config, tables):
+    cache = {
+        "version": CATALOG_CACHE_VERSION,
+        "config": catalog_cache_config(config),
+        "tables": tables,
+    }
+    cache_tmp = path + ".tmp"
+    with open(cache_tmp, "w", encoding="utf-8") as cache_file:
+        json.dump(cache, cache_file)
+    os.replace(cache_tmp, path)
+
+
+def is_cached(cached_table, info):
+    # An alias does not change when its base table does. RUNSTATS changes
+    # STATS_TIME, not ALTER_TIME, and the column statistics in the entry.
+    return (
+        cached_table is not None
+        and not info["is_alias"]
+        and cached_table["create_time"] == info["create_time"]
+        and cached_table["alter_time"] == info["alter_time"]
+        and cached_table["stats_time"] == info["stats_time"]
+    )
+
+
+def discovery_shards(table_info, pairs, workers):
+    """
+    Splits the tables to discover into up to workers shards of about as many
+    tables each, returned in (schema, table) order as (pairs, table_range)
+    tuples. The tables in pairs are dealt out directly. When every table is
+    discovered, each shard is a range of (schema, table): the first and last
+    ranges are open-ended, so that the shards cover every table however the
+    database collates names.
+    """
+    if pairs is not None:
+        shard_count = max(1, min(workers, len(pairs)))
+        if shard_count == 1:
+            return [(pairs, None)]
+        pairs = sorted(pairs)
+        return [
+            (pairs[len(pairs) * i // shard_count : len(pairs) * (i + 1) // shard_count], None)
+            for i in range(shard_count)
+        ]
+
+    keys = sorted(
+        (db, table) for db, db_tables in table_info.items() for table in db_tables
+    )
+    shard_count = max(1, min(workers, len(keys)))
+    bounds = [keys[len(keys) * i // shard_count] for i in range(1, shard_count)]
+    return [
+        (None, table_range)
+        for table_range in zip([None] + bounds, bounds + [None])
+    ]
+
+
+def discover_shard(db2_conn, config, table_info, pairs, table_range):
+    with db2_conn.connect() as open_conn:
+        fetch_data_partitions(open_conn, config, table_info, pairs, table_range)
+        columns = fetch_columns(open_conn, config, pairs, table_range)
+
+    return build_catalog_entries(columns, table_info, config)
+
+
+def discover_catalog(db2_conn, config, changed_only=False, tables=None):
+    """Returns a Catalog describing the structure of the database, or only
+    of the (schema, table) pairs in tables.
+
+    With catalog_cache_path, the entries of the tables whose CREATE_TIME,
+    ALTER_TIME and STATS_TIME have not changed since they were cached are
+    reused and only
+    the other tables' columns are queried. changed_only then leaves the
+    reused entries out of the Catalog.
+
+    With discovery_workers above 1, the tables are split into that many
+    shards, each discovered on its own connection, and the shards' entries
+    are merged in (schema, table) order.
+    """
+    LOGGER.info("Preparing Catalog")
+    cache_path = config.get("catalog_cache_path")
+
+    with db2_conn.connect() as open_conn:
+        table_info = fetch_tables(open_conn, config, tables)
+
+    pairs = tables
+    cached = {}
+    cached_entries = []
+    if cache_path:
+        cached = load_catalog_cache(cache_path, config)
+        pairs = []
+        for db, db_tables in table_info.items():
+            for table, info in db_tables.items():
+                tap_stream_id = common.generate_tap_stream_id(db, table)
+                if is_cached(cached.get(tap_stream_id), info):
+                    cached_entries.append(cached[tap_stream_id]["entry"])
+                else:
+                    pairs.append((db, table))
+        LOGGER.info(
+            f"Reusing {len(cached_entries)} cached tables, "
+            f"discovering {len(pairs)} new or changed tables"
+        )
+        if not cached_entries:
+            # Every table has to be discovered, in as few queries as
+            # possible
+            pairs = tables
+
+    workers = int(config.get("discovery_workers") or 1)
+    shards = discovery_shards(table_info, pairs, workers)
+    if len(shards) > 1:
+        LOGGER.info(f"Discovering {len(shards)} shards in parallel")
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(shards), thread_name_prefix="discovery"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    discover_shard, db2_conn, config, table_info, *shard
+                )
+                for shard in shards
+            ]
+            # Merged in shard order, whichever shard finishes first
+            entries = [
+                entry for future in futures for entry in future.result()
+            ]
+    else:
+        entries = discover_shard(db2_conn, config, table_info, *shards[0])
+
+    if cache_path:
+        discovered = {entry.tap_stream_id: entry for entry in entries}
+        cache_tables = {}
+        if tables is not None:
+            # The other tables were not looked at, their entries are kept
+            cache_tables = dict(cached)
+            for db, table in tables:
+                cache_tables.pop(common.generate_tap_stream_id(db, table), None)
+        for db, db_tables in table_info.items():
+            for table, info in db_tables.items():
+                tap_stream_id = common.generate_tap_stream_id(db, table)
+                if tap_stream_id in discovered:
+                    entry = discovered[tap_stream_id].to_dict()
+                elif is_cached(cached.get(tap_stream_id), info):
+                    entry = cached[tap_stream_id]["entry"]
+                else:
+                    continue
+                cache_tables[tap_stream_id] = {
+                    "create_time": info["create_time"],
+                    "alter_time": info["alter_time"],
+                    "stats_time": info["stats_time"],
+                    "entry": entry,
+                }
+        save_catalog_cache(cache_path, config, cache_tables)
+
+        if not changed_only:
+            # The table statistics of cached entries are those read by this
+            # run
+            for entry in Catalog.from_dict({"streams": cached_entries}).streams:
+                md_map = metadata.to_map(entry.metadata)
+                info = table_info[common.get_database_name(entry)][entry.table]
+                entry.metadata = metadata.to_list(write_table_statistics(md_map, info))
+                entries.append(entry)
+            entries.sort(
+                key=lambda entry: (common.get_database_name(entry), entry.table)
             )
 
-            entries.append(entry)
     LOGGER.info("Catalog ready")
     return Catalog(entries)
 
 
 def do_discover(db2_conn, config):
-    discover_catalog(db2_conn, config).dump()
+    discover_catalog(
+        db2_conn, config, changed_only=bool(config.get("discover_changed_only"))
+    ).dump()
 
 
 # TODO: Maybe put in a singer-db-utils library.
@@ -443,6 +949,22 @@ def is_valid_currently_syncing_stream(selected_stream, state):
     return True
 
 
+def discovered_metadata(catalog_entry, discovered_table):
+    """Returns the metadata of catalog_entry with the table level metadata
+    describing the table's current layout taken from discovered_table, as
+    partitions attached after the catalog was generated must still be read."""
+    md_map = metadata.to_map(catalog_entry.metadata)
+    discovered_md = metadata.to_map(discovered_table.metadata).get((), {})
+    table_md = dict(md_map.get((), {}))
+    for key in DISCOVERED_TABLE_METADATA:
+        if key in discovered_md:
+            table_md[key] = discovered_md[key]
+        else:
+            table_md.pop(key, None)
+    md_map[()] = table_md
+    return metadata.to_list(md_map)
+
+
 def resolve_catalog(discovered_catalog, streams_to_sync):
     result = Catalog(streams=[])
 
@@ -477,7 +999,7 @@ def resolve_catalog(discovered_catalog, streams_to_sync):
         result.streams.append(
             CatalogEntry(
                 tap_stream_id=catalog_entry.tap_stream_id,
-                metadata=catalog_entry.metadata,
+                metadata=discovered_metadata(catalog_entry, discovered_table),
                 stream=catalog_entry.tap_stream_id,
                 table=catalog_entry.table,
                 schema=Schema(
@@ -508,21 +1030,53 @@ def get_non_binlog_streams(db2_conn, catalog, config, state):
     "selected" that currently exist in the database. Columns marked as
     "selected" and those labled "automatic" (e.g. primary keys and replication
     keys) will be included. Streams will be prioritized in the following order:
-      1. currently_syncing if it is SELECT-based
+      1. currently_syncing (any of them after a parallel run) if it is
+         SELECT-based
       2. any streams that do not have state
       3. any remaining streams
     Modify the stream_ordering function to change behaviour
 
+    With stream_ordering set to largest_first or smallest_first, the streams
+    after those currently syncing are ordered by the pages their tables take
+    up instead, those without statistics last.
     """
-    discovered = discover_catalog(db2_conn, config)
+    ordering = config.get("stream_ordering")
+    if ordering is not None and ordering not in STREAM_ORDERINGS:
+        raise Exception(
+            f"Unknown stream_ordering {ordering}, expected one of "
+            f"{', '.join(STREAM_ORDERINGS)}"
+        )
+
+    selected_streams = [s for s in catalog.streams if common.stream_is_selected(s)]
+
+    # Only the selected tables are looked up
+    discovered = discover_catalog(
+        db2_conn,
+        config,
+        tables=[(common.get_database_name(s), s.table) for s in selected_streams],
+    )
 
     currently_syncing = singer.get_currently_syncing(state)
+    # A parallel run records every stream it was syncing
+    if not isinstance(currently_syncing, list):
+        currently_syncing = [currently_syncing]
 
     # Define a function which returns an ordering integer to use in sorted()
+    # The freshly discovered statistics, the input Catalog's may be stale
+    pages = {
+        entry.tap_stream_id: metadata.to_map(entry.metadata).get((), {}).get("pages")
+        for entry in discovered.streams
+    }
+
     def stream_ordering(stream):
-        if stream.tap_stream_id == currently_syncing: 
+        if stream.tap_stream_id in currently_syncing: 
             LOGGER.debug(f"{stream.tap_stream_id} is currently_syncing: ordering is 0")
             return 0
+        elif ordering:
+            LOGGER.debug(
+                f"{stream.tap_stream_id} has {pages.get(stream.tap_stream_id)} pages"
+            )
+            return 1
         elif not(state.get("bookmarks",{}).get(stream.tap_stream_id)):
             LOGGER.debug(f"{stream.tap_stream_id} does not have a state: ordering is 1")
             return 1
@@ -531,9 +1085,15 @@ def get_non_binlog_streams(db2_conn, catalog, config, state):
             return 2
 
     # Filter the catalog by those selected and then order by the ordering function
+    def size_ordering(stream):
+        size = pages.get(stream.tap_stream_id)
+        if not ordering or size is None:
+            return (1, 0)
+        return (0, -size if ordering == "largest_first" else size)
+
     streams_to_sync = sorted(
-        [s for s in catalog.streams if common.stream_is_selected(s)],
-        key=lambda s:stream_ordering(s)
+        selected_streams,
+        key=lambda s:(stream_ordering(s), size_ordering(s))
         )
 
     # Finally ensure the the streams are in the freshly-discovered catalog
@@ -563,7 +1123,7 @@ def write_schema_message(config, catalog_entry, bookmark_properties=[]):
 
     table_stream = common.set_schema_mapping(config, catalog_entry.stream)
 
-    singer.write_message(
+    write_message(
         singer.SchemaMessage(
             stream=table_stream,
             schema=catalog_entry.schema.to_dict(),
@@ -588,7 +1148,9 @@ def do_sync_incremental(db2_conn, config, catalog_entry, state, columns):
     LOGGER.info("Schema written")
     incremental.sync_table(db2_conn, config, catalog_entry, state, columns)
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    write_message(
+        singer.StateMessage(value=snapshot_state(state, catalog_entry.tap_stream_id))
+    )
 
 
 def do_sync_full_table(db2_conn, config, catalog_entry, state, columns):
@@ -611,7 +1173,9 @@ def do_sync_full_table(db2_conn, config, catalog_entry, state, columns):
         state, catalog_entry.tap_stream_id, "initial_full_table_complete", True
     )
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    write_message(
+        singer.StateMessage(value=snapshot_state(state, catalog_entry.tap_stream_id))
+    )
 
 
 def do_sync_log_based_table(db2_conn, config, catalog_entry, state, columns):
@@ -677,83 +1241,132 @@ def do_sync_log_based_table(db2_conn, config, catalog_entry, state, columns):
         log_based.execute_log_based_sync()
 
 
-def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
+def sync_non_binlog_stream(db2_conn, catalog_entry, config, state):
+    columns = list(catalog_entry.schema.properties.keys())
+    md_map = metadata.to_map(catalog_entry.metadata)
+    replication_method = md_map.get((), {}).get("replication-method")
+    replication_key = md_map.get((), {}).get("replication-key")
+    # primary_keys = md_map.get((), {}).get("table-key-properties")
+    LOGGER.info(
+        f"Table {catalog_entry.table} proposes {replication_method} sync"
+    )
+    if replication_method == "INCREMENTAL" and not replication_key:
+        LOGGER.info(
+            f"No replication key for {catalog_entry.table}, "
+            "using full table replication"
+        )
+        replication_method = "FULL_TABLE"
+    # Removing conditional check for primary keys - if a replication key
+    # is already specified, we can allow incremental loads on views
+
+    # if replication_method == "INCREMENTAL" and not primary_keys:
+    #     LOGGER.info(
+    #         f"No primary key for {catalog_entry.table}, "
+    #           "using full table replication"
+    #     )
+    #     replication_method = "FULL_TABLE"
+    LOGGER.info(
+        f"Table {catalog_entry.table} will use {replication_method} sync"
+    )
 
-    for catalog_entry in non_binlog_catalog.streams:
-        columns = list(catalog_entry.schema.properties.keys())
+    database_name = common.get_database_name(catalog_entry)
+
+    with metrics.job_timer("sync_table") as timer:
+        timer.tags["database"] = database_name
+        timer.tags["table"] = catalog_entry.table
+
+        if replication_method == "INCREMENTAL":
+            LOGGER.info(f"syncing {catalog_entry.table} incrementally")
+            do_sync_incremental(
+                db2_conn, config, catalog_entry, state, columns
+            )
+        elif replication_method == "FULL_TABLE":
+            LOGGER.info(f"syncing {catalog_entry.table} full table")
+            do_sync_full_table(
+                db2_conn, config, catalog_entry, state, columns
+            )
+        elif replication_method == "LOG_BASED":
+            LOGGER.info(
+                f"syncing {catalog_entry.table} using replication method "
+                "LOG_BASED"
+            )
+            do_sync_log_based_table(
+                db2_conn, config, catalog_entry, state, columns
+            )
+        else:
+            raise Exception(
+                "only INCREMENTAL and FULL TABLE replication methods are "
+                "supported"
+            )
+
+
+def sync_parallel_stream(db2_conn, catalog_entry, config, shared_state):
+    """Syncs one stream of a parallel run against its own private state"""
+    state = shared_state.stream_state(catalog_entry.tap_stream_id)
+    shared_state.start(catalog_entry.tap_stream_id)
+
+    # Emit a state message to indicate that we've started this stream
+    write_message(singer.StateMessage(value=copy.deepcopy(state)))
+
+    sync_non_binlog_stream(db2_conn, catalog_entry, config, state)
+    shared_state.finish(catalog_entry.tap_stream_id)
 
-        if not columns:
+
+def sync_non_binlog_streams_in_parallel(
+    db2_conn, catalog_entries, config, state, max_parallel_streams
+):
+    shared_state = SharedState(state)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_parallel_streams, thread_name_prefix="stream"
+    ) as executor:
+        futures = [
+            executor.submit(
+                sync_parallel_stream, db2_conn, catalog_entry, config, shared_state
+            )
+            for catalog_entry in catalog_entries
+        ]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+        except BaseException:
+            # Let the streams already running finish and checkpoint, but
+            # don't start any more
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
+    catalog_entries = []
+    for catalog_entry in non_binlog_catalog.streams:
+        if not catalog_entry.schema.properties:
             LOGGER.warning(
                 "There are no columns selected for stream %s, skipping it.",
                 catalog_entry.stream,
             )
             continue
+        catalog_entries.append(catalog_entry)
 
-        state = singer.set_currently_syncing(
-            state, catalog_entry.tap_stream_id
-        )
-
-        # Emit a state message to indicate that we've started this stream
-        singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
-
-        md_map = metadata.to_map(catalog_entry.metadata)
-        replication_method = md_map.get((), {}).get("replication-method")
-        replication_key = md_map.get((), {}).get("replication-key")
-        # primary_keys = md_map.get((), {}).get("table-key-properties")
-        LOGGER.info(
-            f"Table {catalog_entry.table} proposes {replication_method} sync"
+    max_parallel_streams = int(config.get("max_parallel_streams") or 1)
+    if max_parallel_streams > 1:
+        LOGGER.info(f"Syncing up to {max_parallel_streams} streams in parallel")
+        sync_non_binlog_streams_in_parallel(
+            db2_conn, catalog_entries, config, state, max_parallel_streams
         )
-        if replication_method == "INCREMENTAL" and not replication_key:
-            LOGGER.info(
-                f"No replication key for {catalog_entry.table}, "
-                "using full table replication"
+    else:
+        for catalog_entry in catalog_entries:
+            state = singer.set_currently_syncing(
+                state, catalog_entry.tap_stream_id
             )
-            replication_method = "FULL_TABLE"
-        # Removing conditional check for primary keys - if a replication key
-        # is already specified, we can allow incremental loads on views
-
-        # if replication_method == "INCREMENTAL" and not primary_keys:
-        #     LOGGER.info(
-        #         f"No primary key for {catalog_entry.table}, "
-        #           "using full table replication"
-        #     )
-        #     replication_method = "FULL_TABLE"
-        LOGGER.info(
-            f"Table {catalog_entry.table} will use {replication_method} sync"
-        )
 
-        database_name = common.get_database_name(catalog_entry)
+            # Emit a state message to indicate that we've started this stream
+            write_message(singer.StateMessage(value=snapshot_state(state)))
 
-        with metrics.job_timer("sync_table") as timer:
-            timer.tags["database"] = database_name
-            timer.tags["table"] = catalog_entry.table
-
-            if replication_method == "INCREMENTAL":
-                LOGGER.info(f"syncing {catalog_entry.table} incrementally")
-                do_sync_incremental(
-                    db2_conn, config, catalog_entry, state, columns
-                )
-            elif replication_method == "FULL_TABLE":
-                LOGGER.info(f"syncing {catalog_entry.table} full table")
-                do_sync_full_table(
-                    db2_conn, config, catalog_entry, state, columns
-                )
-            elif replication_method == "LOG_BASED":
-                LOGGER.info(
-                    f"syncing {catalog_entry.table} using replication method "
-                    "LOG_BASED"
-                )
-                do_sync_log_based_table(
-                    db2_conn, config, catalog_entry, state, columns
-                )
-            else:
-                raise Exception(
-                    "only INCREMENTAL and FULL TABLE replication methods are "
-                    "supported"
-                )
+            sync_non_binlog_stream(db2_conn, catalog_entry, config, state)
 
     state = singer.set_currently_syncing(state, None)
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    write_message(singer.StateMessage(value=snapshot_state(state)))
 
 
 def do_sync(db2_conn, config, catalog, state):
@@ -763,7 +1376,8 @@ def do_sync(db2_conn, config, catalog, state):
     )
     for entry in non_binlog_catalog.streams:
         LOGGER.info(f"Need to sync {entry.table}")
-    sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state)
+    with common.encoder_pool(config):
+        sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state)
 
 
 def log_server_params(db2_conn):
@@ -816,6 +1430,9 @@ def main_impl():
     # Set ARRAYSIZE here
     ARRAYSIZE = args.config.get('cursor_array_size',1)
     common.ARRAYSIZE = ARRAYSIZE
+    # With auto the fetch size is tuned per stream during sync
+    if ARRAYSIZE == "auto":
+        ARRAYSIZE = AUTO_DISCOVERY_ARRAYSIZE
 
     if args.discover:
         do_discover(db2_conn, args.config)
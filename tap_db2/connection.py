@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 
+import decimal
+import re
+import time
+
 import backoff
 
+import ibm_db
 import pyodbc
 
 from sqlalchemy import create_engine
@@ -55,6 +60,10 @@ def revert_ouput_converter(conn, prev_converter):
     conn.connection.add_output_converter(pyodbc.SQL_WVARCHAR, prev_converter)
 
 
+# SQLAlchemy's default QueuePool size
+DEFAULT_POOL_SIZE = 5
+
+
 def get_db2_sql_engine(config) -> Engine:
     """Using parameters from the config to connect to DB2 using ibm_db_sa+pyodbc"""
 
@@ -67,14 +76,186 @@ def get_db2_sql_engine(config) -> Engine:
         config["port"],
         config["database"],
     )
-    engine = create_engine(connection_string)
+    # Streams, table slices and discovery shards handled in parallel each
+    # hold a pooled connection, so the pool may grow past pool_size instead
+    # of timing out
+    max_parallel_streams = int(config.get("max_parallel_streams") or 1)
+    full_table_ranges = int(config.get("full_table_ranges") or 1)
+    discovery_workers = int(config.get("discovery_workers") or 1)
+    engine = create_engine(
+        connection_string,
+        pool_size=max(
+            DEFAULT_POOL_SIZE, max_parallel_streams, full_table_ranges, discovery_workers
+        ),
+        max_overflow=-1,
+    )
 
     return engine
 
-def ResultIterator(cursor, arraysize=1):
+
+# ibm_db field types returned as strings by fetch_tuple which the
+# SQLAlchemy/ibm_db_dbi path turns into Decimal
+NATIVE_DECIMAL_FIELD_TYPES = {"decimal", "decfloat"}
+
+
+class NativeResult:
+    """
+    Runs a query directly on the ibm_db connection handle underneath a
+    SQLAlchemy connection and fetches plain tuples, skipping the ibm_db_dbi
+    cursor and SQLAlchemy Row objects.
+
+    The statement is prepared and its named :parameters are bound as qmark
+    parameters, in the order they appear in the SQL and as often as they
+    appear. Its handle is freed once the rows are exhausted or the result is
+    closed.
+    """
+
+    def __init__(self, sqlalchemy_conn, select_sql, params):
+        conn_handle = sqlalchemy_conn.connection.dbapi_connection.conn_handler
+
+        # select_sql is written for SQLAlchemy's text(): named parameters and
+        # doubled percent signs
+        sql = select_sql.replace("%%", "%")
+        values = []
+        if params:
+            # Longest names first so that :pk_1 never matches within :pk_10
+            names = sorted(params, key=len, reverse=True)
+            pattern = re.compile(r":({})\b".format("|".join(map(re.escape, names))))
+
+            def placeholder(match):
+                values.append(params[match.group(1)])
+                return "?"
+
+            sql = pattern.sub(placeholder, sql)
+
+        self.stmt = ibm_db.prepare(conn_handle, sql)
+        try:
+            ibm_db.execute(self.stmt, tuple(values))
+
+            self.decimal_indexes = [
+                i
+                for i in range(ibm_db.num_fields(self.stmt))
+                if str(ibm_db.field_type(self.stmt, i)).lower()
+                in NATIVE_DECIMAL_FIELD_TYPES
+            ]
+        except BaseException:
+            self.close()
+            raise
+
+    def fetchmany(self, arraysize):
+        fetch_tuple = ibm_db.fetch_tuple
+        stmt = self.stmt
+        rows = []
+        if stmt is None:
+            return rows
+        for _ in range(arraysize):
+            row = fetch_tuple(stmt)
+            if not row:
+                self.close()
+                break
+            rows.append(row)
+
+        if self.decimal_indexes and rows:
+            rows = [self.to_decimal(row) for row in rows]
+
+        return rows
+
+    def close(self):
+        if self.stmt is not None:
+            stmt, self.stmt = self.stmt, None
+            ibm_db.free_stmt(stmt)
+
+    def to_decimal(self, row):
+        row = list(row)
+        for i in self.decimal_indexes:
+            if isinstance(row[i], str):
+                row[i] = decimal.Decimal(row[i])
+        return tuple(row)
+
+
+class FetchSizeTuner:
+    """
+    Chooses the fetchmany size for a stream while it is being read.
+
+    The size starts at initial and stays within [minimum, maximum], where the
+    maximum is derived from the memory budget. Fetch throughput (rows/s spent
+    in fetchmany) is measured over windows of WINDOW_FETCHES full fetches;
+    the size is doubled or halved in the direction that last improved
+    throughput, and reversed when throughput drops.
+    """
+
+    WINDOW_FETCHES = 5
+    TOLERANCE = 0.05
+
+    def __init__(self, initial, minimum, maximum):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.arraysize = min(max(initial, self.minimum), self.maximum)
+        self.direction = 1
+        self.last_throughput = None
+        self.window_fetches = 0
+        self.window_rows = 0
+        self.window_seconds = 0.0
+
+    def observe(self, rows, seconds):
+        if rows < self.arraysize:
+            # The final, partial fetch says nothing about the size
+            return
+
+        self.window_fetches += 1
+        self.window_rows += rows
+        self.window_seconds += seconds
+        if self.window_fetches < self.WINDOW_FETCHES:
+            return
+
+        throughput = self.window_rows / max(self.window_seconds, 1e-9)
+        if self.last_throughput is not None:
+            if throughput < self.last_throughput * (1 - self.TOLERANCE):
+                self.direction = -self.direction or -1
+            elif throughput < self.last_throughput * (1 + self.TOLERANCE):
+                self.direction = 0
+        self.last_throughput = throughput
+
+        if self.direction > 0:
+            arraysize = min(self.arraysize * 2, self.maximum)
+        elif self.direction < 0:
+            arraysize = max(self.arraysize // 2, self.minimum)
+        else:
+            arraysize = self.arraysize
+
+        if arraysize != self.arraysize:
+            LOGGER.debug(
+                f"fetch size {self.arraysize} -> {arraysize} "
+                f"({throughput:.0f} rows/s)"
+            )
+            self.arraysize = arraysize
+        elif self.direction:
+            # Pinned at a bound, so come back the other way next time
+            self.direction = -self.direction
+
+        self.window_fetches = 0
+        self.window_rows = 0
+        self.window_seconds = 0.0
+
+
+def ChunkIterator(cursor, arraysize=1, tuner=None):
+    """Yields each non-empty fetchmany(arraysize) chunk of the cursor.
+
+    When a FetchSizeTuner is given it chooses the size of every fetch.
+    """
     while True:
+        if tuner is not None:
+            arraysize = tuner.arraysize
+            started = time.monotonic()
         results = cursor.fetchmany(arraysize)
         if not results:
             break
+        if tuner is not None:
+            tuner.observe(len(results), time.monotonic() - started)
+        yield results
+
+
+def ResultIterator(cursor, arraysize=1):
+    for results in ChunkIterator(cursor, arraysize):
         for result in results:
             yield result
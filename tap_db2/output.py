@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+
+import copy
+import decimal
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import pytz
+import simplejson
+import singer
+import singer.utils as u
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+LOGGER = singer.get_logger()
+
+DEFAULT_OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# Rows between STATE messages when records are written to stdout
+STATE_MESSAGE_INTERVAL = 1000
+
+CHECKPOINT_POLICY_KEYS = {"rows", "seconds", "bytes"}
+
+DEFAULT_BATCH_SIZE_ROWS = 1000000
+
+BATCH_FILE_EXTENSIONS = {
+    "gzip": ".json.gz",
+    "zstd": ".json.zst",
+    "none": ".json",
+}
+
+PARQUET_COMPRESSIONS = {"snappy", "gzip", "zstd", "none"}
+
+# DB2 DECIMAL precision is at most 31 digits
+MAX_DECIMAL_PRECISION = 31
+
+INTEGER_BITS_FOR_MAXIMUM = {
+    2 ** 15 - 1: 16,
+    2 ** 31 - 1: 32,
+}
+
+
+# Held while writing to stdout so that streams synced in parallel never
+# interleave within a line or a buffered block
+OUTPUT_LOCK = threading.RLock()
+
+_worker = threading.local()
+
+
+class SharedState:
+    """
+    The state of a run whose streams are synced in parallel.
+
+    Each stream is synced against a private state holding only its own
+    bookmark. Every STATE message a stream emits is merged here under
+    OUTPUT_LOCK, so the STATE written to stdout always holds the latest
+    bookmark of every stream and currently_syncing lists the streams still in
+    progress.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.syncing = []
+
+    def stream_state(self, tap_stream_id):
+        with OUTPUT_LOCK:
+            bookmark = self.state.get("bookmarks", {}).get(tap_stream_id)
+            stream_state = {"currently_syncing": tap_stream_id, "bookmarks": {}}
+            if bookmark is not None:
+                stream_state["bookmarks"][tap_stream_id] = copy.deepcopy(bookmark)
+            return stream_state
+
+    def start(self, tap_stream_id):
+        with OUTPUT_LOCK:
+            self.syncing.append(tap_stream_id)
+        set_state_merger(lambda value: self.merge(tap_stream_id, value))
+
+    def finish(self, tap_stream_id):
+        set_state_merger(None)
+        with OUTPUT_LOCK:
+            self.syncing.remove(tap_stream_id)
+            write_message(singer.StateMessage(value=self.merge(tap_stream_id, None)))
+
+    def merge(self, tap_stream_id, stream_state):
+        """Returns a copy of the run's state updated with stream_state"""
+        if stream_state is not None:
+            bookmark = stream_state.get("bookmarks", {}).get(tap_stream_id)
+            bookmarks = self.state.setdefault("bookmarks", {})
+            if bookmark is None:
+                bookmarks.pop(tap_stream_id, None)
+            else:
+                # Copied as the stream keeps updating its own bookmark, the
+                # copy is replaced by the next merge rather than modified
+                bookmarks[tap_stream_id] = copy.deepcopy(bookmark)
+        self.state["currently_syncing"] = list(self.syncing) or None
+        return snapshot_state(self.state)
+
+
+def snapshot_state(state, tap_stream_id=None):
+    """
+    Returns a copy of state for a STATE message that only copies what can
+    still change: the bookmark of the stream being synced.
+
+    The other streams' bookmarks are shared with state, which holds as they
+    are not modified while another stream syncs, so a checkpoint costs the
+    same however many streams the state holds.
+    """
+    snapshot = dict(state)
+    bookmarks = state.get("bookmarks")
+    if bookmarks is not None:
+        snapshot["bookmarks"] = dict(bookmarks)
+        if tap_stream_id in bookmarks:
+            snapshot["bookmarks"][tap_stream_id] = copy.deepcopy(
+                bookmarks[tap_stream_id]
+            )
+    return snapshot
+
+
+def get_state_merger():
+    return getattr(_worker, "merge_state", None)
+
+
+def set_state_merger(merge_state):
+    """Makes write_message pass the value of every STATE message written from
+    the current thread through merge_state, which is called with OUTPUT_LOCK
+    held and returns the state to write"""
+    _worker.merge_state = merge_state
+
+
+def write_output(text):
+    with OUTPUT_LOCK:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+def write_message(message):
+    """singer.write_message, safe to call from parallel stream syncs"""
+    with OUTPUT_LOCK:
+        merge_state = get_state_merger()
+        if merge_state is not None and isinstance(message, singer.StateMessage):
+            message = singer.StateMessage(value=merge_state(message.value))
+        write_output(singer.format_message(message) + "\n")
+
+
+def encode_stdlib(obj):
+    """Encodes as singer.format_message does, keeping decimals exact. NaN and
+    infinite floats are written as null, like orjson writes them, as JSON
+    has no representation for them."""
+    return simplejson.dumps(obj, use_decimal=True, ignore_nan=True)
+
+
+def encode_orjson(obj):
+    try:
+        return orjson.dumps(obj).decode("utf-8")
+    except TypeError:
+        # orjson cannot encode Decimal values (e.g. DECIMAL columns without
+        # use_singer_decimal) so hand those records to the exact encoder
+        return encode_stdlib(obj)
+
+
+def get_json_encoder(config):
+    """Returns the function used to encode record bodies.
+
+    json_encoder can be "auto" (the default - orjson when it is installed),
+    "orjson" or "stdlib".
+    """
+    json_encoder = config.get("json_encoder") or "auto"
+
+    if json_encoder in ("auto", "orjson"):
+        if orjson is not None:
+            return encode_orjson
+        if json_encoder == "orjson":
+            LOGGER.warning(
+                "json_encoder is orjson but orjson is not installed, "
+                "using the standard encoder"
+            )
+    elif json_encoder != "stdlib":
+        raise Exception(f"Unknown json_encoder {json_encoder}")
+
+    return encode_stdlib
+
+
+class CheckpointPolicy:
+    """
+    Decides when a stream writes STATE: once max_rows records, max_bytes
+    bytes of records or max_seconds seconds have gone by since the last
+    STATE, whichever comes first. A limit that is 0 or None never triggers.
+    """
+
+    def __init__(self, max_rows=STATE_MESSAGE_INTERVAL, max_seconds=None, max_bytes=None):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.checkpoint_rows = 0
+        self.checkpoint_bytes = 0
+        self.checkpoint_time = time.monotonic()
+
+    def due(self, rows, written_bytes):
+        if not (
+            (self.max_rows and rows - self.checkpoint_rows >= self.max_rows)
+            or (
+                self.max_bytes
+                and written_bytes - self.checkpoint_bytes >= self.max_bytes
+            )
+            or (
+                self.max_seconds
+                and time.monotonic() - self.checkpoint_time >= self.max_seconds
+            )
+        ):
+            return False
+
+        self.checkpoint_rows = rows
+        self.checkpoint_bytes = written_bytes
+        self.checkpoint_time = time.monotonic()
+        return True
+
+
+def get_checkpoint_policy(config, catalog_entry=None):
+    """Merges the global checkpoint_policy with the stream's entry in
+    stream_checkpoint_policies, the latter taking precedence"""
+    policy = dict(config.get("checkpoint_policy") or {})
+    if catalog_entry is not None:
+        policy.update(
+            (config.get("stream_checkpoint_policies") or {}).get(
+                catalog_entry.tap_stream_id
+            )
+            or {}
+        )
+
+    unknown = set(policy) - CHECKPOINT_POLICY_KEYS
+    if unknown:
+        raise Exception(f"Unknown checkpoint policy keys {sorted(unknown)}")
+    return CheckpointPolicy(
+        max_rows=policy.get("rows", STATE_MESSAGE_INTERVAL),
+        max_seconds=policy.get("seconds"),
+        max_bytes=policy.get("bytes"),
+    )
+
+
+class RecordWriter:
+    """
+    Writes the messages of a single stream to stdout.
+
+    The RECORD envelope (type, stream, version, time_extracted) is the same
+    for every record of a stream, so it is serialised once and only the
+    record body is encoded per row. Encoded lines are buffered and written in
+    bulk once output_buffer_size bytes are pending, or when any other message
+    is written so that STATE never overtakes the records before it.
+    """
+
+    accepts_rows = False
+
+    def __init__(
+        self, config, stream, version=None, time_extracted=None, checkpoint_policy=None
+    ):
+        self.encode = get_json_encoder(config)
+        self.buffer_size = config.get("output_buffer_size") or DEFAULT_OUTPUT_BUFFER_SIZE
+        self.buffer = []
+        self.buffered = 0
+        self.written_bytes = 0
+        self.checkpoint_policy = checkpoint_policy or CheckpointPolicy()
+
+        envelope = {"type": "RECORD", "stream": stream}
+        if version is not None:
+            envelope["version"] = version
+        if time_extracted:
+            envelope["time_extracted"] = u.strftime(time_extracted.astimezone(pytz.utc))
+
+        # Drop the closing brace so the record body can be appended
+        self.prefix = encode_stdlib(envelope)[:-1] + ', "record": '
+
+    def encode_record(self, record):
+        return self.prefix + self.encode(record) + "}\n"
+
+    def write_record(self, record):
+        self.write_encoded(self.encode_record(record))
+
+    def write_encoded(self, line):
+        self.buffer.append(line)
+        self.buffered += len(line)
+        self.written_bytes += len(line)
+
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def write_message(self, message):
+        with OUTPUT_LOCK:
+            self.flush()
+            write_message(message)
+
+    def should_checkpoint(self, rows_saved):
+        return self.checkpoint_policy.due(rows_saved, self.written_bytes)
+
+    def flush(self):
+        if self.buffer:
+            write_output("".join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+class BatchWriter:
+    """
+    Writes the records of a single stream to local JSONL files and announces
+    each file with a Singer BATCH message.
+
+    A file is sealed once it holds batch_size_rows records or batch_size_bytes
+    of uncompressed JSON, and always before a STATE message is written, so an
+    emitted bookmark never refers to a record that is not in a sealed file.
+    The batch_config follows the layout used by the Meltano SDK:
+
+        "batch_config": {
+            "encoding": {"format": "jsonl", "compression": "gzip"},
+            "storage": {"root": "file:///tmp/tap-db2", "prefix": "batch-"},
+            "batch_size_rows": 1000000
+        }
+    """
+
+    accepts_rows = False
+    default_compression = "gzip"
+
+    def __init__(self, config, stream, version=None, time_extracted=None):
+        batch_config = config["batch_config"]
+        encoding = batch_config.get("encoding", {})
+        storage = batch_config.get("storage", {})
+
+        self.encode = get_json_encoder(config)
+        self.stream = stream
+        self.format = encoding.get("format", "jsonl")
+        self.compression = encoding.get("compression", self.default_compression)
+        self.root = urlparse(storage.get("root") or tempfile.gettempdir()).path
+        self.prefix = storage.get("prefix", "")
+        self.batch_size_rows = batch_config.get("batch_size_rows") or DEFAULT_BATCH_SIZE_ROWS
+        self.batch_size_bytes = batch_config.get("batch_size_bytes")
+
+        self.check_encoding()
+        os.makedirs(self.root, exist_ok=True)
+
+        self.file = None
+        self.path = None
+        self.file_rows = 0
+        self.file_bytes = 0
+
+    def check_encoding(self):
+        if self.format != "jsonl":
+            raise Exception(f"Unsupported batch format {self.format}")
+        if self.compression not in BATCH_FILE_EXTENSIONS:
+            raise Exception(f"Unsupported batch compression {self.compression}")
+        if self.compression == "zstd" and zstandard is None:
+            raise Exception("zstd batch compression requires the zstandard package")
+
+    def open_file(self):
+        file_name = "{}{}-{}{}".format(
+            self.prefix,
+            self.stream.replace(os.sep, "_"),
+            uuid.uuid4().hex,
+            BATCH_FILE_EXTENSIONS[self.compression],
+        )
+        self.path = os.path.join(self.root, file_name)
+
+        if self.compression == "gzip":
+            self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        elif self.compression == "zstd":
+            self.file = zstandard.open(self.path, "wt", encoding="utf-8")
+        else:
+            self.file = open(self.path, "w", encoding="utf-8")
+
+        self.file_rows = 0
+        self.file_bytes = 0
+
+    def encode_record(self, record):
+        return self.encode(record) + "\n"
+
+    def write_record(self, record):
+        self.write_encoded(self.encode_record(record))
+
+    def write_encoded(self, line):
+        if self.file is None:
+            self.open_file()
+
+        self.file.write(line)
+        self.file_rows += 1
+        self.file_bytes += len(line)
+
+    def should_checkpoint(self, rows_saved):
+        if self.file is None:
+            return False
+        if self.file_rows >= self.batch_size_rows:
+            return True
+        return bool(self.batch_size_bytes) and self.file_bytes >= self.batch_size_bytes
+
+    def seal(self):
+        """Closes the current file and emits the BATCH message for it"""
+        if self.file is None:
+            return
+
+        self.file.close()
+        self.file = None
+        LOGGER.info(f"Sealed batch file {self.path} with {self.file_rows} rows")
+
+        batch_message = {
+            "type": "BATCH",
+            "stream": self.stream,
+            "encoding": {"format": self.format, "compression": self.compression},
+            "manifest": ["file://" + os.path.abspath(self.path)],
+        }
+        write_output(encode_stdlib(batch_message) + "\n")
+
+    def write_message(self, message):
+        with OUTPUT_LOCK:
+            self.seal()
+            write_message(message)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Discards a file that was never sealed, e.g. after an error"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.path)
+        self.flush()
+
+
+def arrow_column(property_schema, column_metadata):
+    """
+    Returns the Arrow type for a column and a function preparing its fetched
+    values, derived from the discovered schema and sql-datatype metadata.
+    """
+    sql_data_type = column_metadata.get("sql-datatype") or ""
+    property_type = property_schema.type or []
+
+    def identity(values):
+        return values
+
+    if "boolean" in sql_data_type or "boolean" in property_type:
+        return pyarrow.bool_(), lambda values: [
+            None if v is None else v not in (0, b"\x00") for v in values
+        ]
+
+    if "integer" in property_type:
+        bits = INTEGER_BITS_FOR_MAXIMUM.get(property_schema.maximum, 64)
+        return getattr(pyarrow, f"int{bits}")(), identity
+
+    if sql_data_type in ("decimal", "numeric"):
+        precision = column_metadata.get("numeric-precision") or MAX_DECIMAL_PRECISION
+        scale = column_metadata.get("numeric-scale")
+        if scale is None:
+            scale = 0
+            if property_schema.multipleOf:
+                scale = max(0, -decimal.Decimal(str(property_schema.multipleOf)).adjusted())
+        return pyarrow.decimal128(precision, scale), identity
+
+    if sql_data_type == "real":
+        return pyarrow.float32(), identity
+
+    if sql_data_type in ("double", "decfloat"):
+        return pyarrow.float64(), lambda values: [
+            None if v is None else float(v) for v in values
+        ]
+
+    if sql_data_type in ("timestamp", "datetime"):
+        # Values are treated as UTC, as in RECORD messages
+        return pyarrow.timestamp("us", tz="UTC"), identity
+
+    if sql_data_type == "date":
+        return pyarrow.date32(), identity
+
+    if sql_data_type == "time":
+        return pyarrow.time64("us"), identity
+
+    if sql_data_type in ("binary", "varbinary"):
+        return pyarrow.binary(), identity
+
+    return pyarrow.string(), lambda values: [
+        None if v is None else str(v) for v in values
+    ]
+
+
+class ParquetBatchWriter(BatchWriter):
+    """
+    Writes fetched chunks of a single stream straight to Parquet files.
+
+    Each chunk returned by fetchmany is transposed into Arrow arrays and
+    written as a record batch, so no per-row record dict or JSON is built.
+    Files are written under <root>/<stream>/ and rolled like the JSONL batch
+    files; every sealed file is announced with a BATCH message and listed in
+    the stream's manifest.json.
+    """
+
+    accepts_rows = True
+    default_compression = "snappy"
+
+    def __init__(self, config, stream, version=None, time_extracted=None,
+                 catalog_entry=None, columns=None):
+        super().__init__(config, stream, version, time_extracted)
+
+        self.root = os.path.join(self.root, stream.replace(os.sep, "_"))
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self.manifest = {"stream": stream, "version": version, "files": []}
+
+        md_map = singer.metadata.to_map(catalog_entry.metadata)
+        fields = []
+        self.prepare = []
+        for column in columns:
+            arrow_type, prepare = arrow_column(
+                catalog_entry.schema.properties[column],
+                md_map.get(("properties", column), {}),
+            )
+            fields.append(pyarrow.field(column, arrow_type))
+            self.prepare.append(prepare)
+        self.arrow_schema = pyarrow.schema(fields)
+
+    def open_file(self):
+        file_name = "{}part-{}.parquet".format(self.prefix, uuid.uuid4().hex)
+        self.path = os.path.join(self.root, file_name)
+        self.file = pyarrow.parquet.ParquetWriter(
+            self.path, self.arrow_schema, compression=self.compression
+        )
+        self.file_rows = 0
+        self.file_bytes = 0
+
+    def write_rows(self, rows):
+        if self.file is None:
+            self.open_file()
+
+        arrays = [
+            pyarrow.array(prepare(list(values)), type=field.type)
+            for prepare, values, field in zip(self.prepare, zip(*rows), self.arrow_schema)
+        ]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, schema=self.arrow_schema)
+        self.file.write_batch(batch)
+        self.file_rows += len(rows)
+        self.file_bytes += batch.nbytes
+
+    def write_record(self, record):
+        raise Exception("Parquet batches are written from fetched rows, not records")
+
+    def check_encoding(self):
+        if pyarrow is None:
+            raise Exception("parquet batch format requires the pyarrow package")
+        if self.compression not in PARQUET_COMPRESSIONS:
+            raise Exception(f"Unsupported parquet compression {self.compression}")
+
+    def seal(self):
+        if self.file is None:
+            return
+
+        path, rows = self.path, self.file_rows
+        super().seal()
+
+        self.manifest["files"].append({"path": os.path.basename(path), "rows": rows})
+        manifest_tmp = self.manifest_path + ".tmp"
+        with open(manifest_tmp, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+        os.replace(manifest_tmp, self.manifest_path)
+
+
+def get_writer(config, stream, version=None, time_extracted=None,
+               catalog_entry=None, columns=None):
+    batch_config = config.get("batch_config")
+    if batch_config:
+        if batch_config.get("encoding", {}).get("format") == "parquet":
+            return ParquetBatchWriter(
+                config, stream, version, time_extracted, catalog_entry, columns
+            )
+        return BatchWriter(config, stream, version, time_extracted)
+    return RecordWriter(
+        config,
+        stream,
+        version,
+        time_extracted,
+        get_checkpoint_policy(config, catalog_entry),
+    )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+
+import singer
+
+LOGGER = singer.get_logger()
+
+DEFAULT_PIPELINE_QUEUE_SIZE = 4
+
+# Seconds a stage waits on a full or empty queue before checking whether the
+# pipeline has been stopped
+QUEUE_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception raised in a stage to the consuming thread"""
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _put(items, item, stopped):
+    while not stopped.is_set():
+        try:
+            items.put(item, timeout=QUEUE_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(items, stopped):
+    while not stopped.is_set():
+        try:
+            return items.get(timeout=QUEUE_POLL_INTERVAL)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _drain(items, stopped):
+    while True:
+        item = _get(items, stopped)
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.exc
+        yield item
+
+
+def _run_stage(source, transform, items, stopped):
+    try:
+        for item in source:
+            if not _put(items, transform(item), stopped):
+                return
+        _put(items, _DONE, stopped)
+    except BaseException as exc:  # pylint: disable=broad-except
+        _put(items, _Failure(exc), stopped)
+
+
+def pipeline(source, transform, queue_size=DEFAULT_PIPELINE_QUEUE_SIZE):
+    """
+    Yields transform(item) for every item of source, in order.
+
+    source is iterated on a fetcher thread and transform runs on an encoder
+    thread, so that waiting on the database, encoding and whatever the caller
+    does with the results (writing) overlap. Each hand-off goes through a
+    queue of at most queue_size items, so a slow consumer stalls the stages
+    before it rather than letting fetched chunks pile up in memory.
+
+    An exception in either stage is raised from the generator. If the caller
+    stops consuming, closing the generator stops both stages.
+    """
+    stopped = threading.Event()
+    fetched = queue.Queue(queue_size)
+    encoded = queue.Queue(queue_size)
+
+    stages = [
+        threading.Thread(
+            target=_run_stage,
+            args=(source, lambda item: item, fetched, stopped),
+            name="fetcher",
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_run_stage,
+            args=(_drain(fetched, stopped), transform, encoded, stopped),
+            name="encoder",
+            daemon=True,
+        ),
+    ]
+    for stage in stages:
+        stage.start()
+
+    try:
+        yield from _drain(encoded, stopped)
+    finally:
+        stopped.set()
+        for stage in stages:
+            stage.join()
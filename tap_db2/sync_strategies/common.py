@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 # pylint: disable=too-many-arguments,duplicate-code,too-many-locals
 
-import copy
+import base64
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import decimal
+import functools
+import hashlib
+import json
+import multiprocessing
+import pickle
 import singer
 import time
 import uuid
@@ -10,13 +19,60 @@ import uuid
 import singer.metrics as metrics
 from singer import metadata
 from singer import utils
-from tap_db2.connection import ResultIterator
+from singer.catalog import Catalog
+from tap_db2.connection import ChunkIterator, FetchSizeTuner, NativeResult
+from tap_db2.output import get_writer, snapshot_state
+from tap_db2.pipeline import DEFAULT_PIPELINE_QUEUE_SIZE, pipeline
 from sqlalchemy import text
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 ARRAYSIZE = 1
 
 LOGGER = singer.get_logger()
 
+# Bytes held per fetched value by Python on top of the value's own width
+PYTHON_VALUE_OVERHEAD = 56
+
+# Stored width in bytes of fixed-width DB2 types
+SQL_DATATYPE_WIDTHS = {
+    "smallint": 2,
+    "integer": 4,
+    "int": 4,
+    "bigint": 8,
+    "real": 4,
+    "double": 8,
+    "decfloat": 16,
+    "boolean": 1,
+    "date": 4,
+    "time": 3,
+    "timestamp": 10,
+}
+
+DEFAULT_COLUMN_WIDTH = 32
+
+DEFAULT_FETCH_MEMORY_BUDGET = 64 * 1024 * 1024
+
+AUTO_ARRAYSIZE_MINIMUM = 100
+AUTO_ARRAYSIZE_MAXIMUM = 100000
+
+QUERY_ISOLATION_LEVELS = {"UR", "CS", "RS", "RR"}
+
+QUERY_OPTIMIZATION_CLASSES = {0, 1, 2, 3, 5, 7, 9}
+
+LOCK_TIMEOUT_KEYWORDS = {"NULL", "WAIT", "NOT WAIT"}
+
+# Query profile keys set as special registers on the extraction connection
+SESSION_REGISTERS = {
+    "current_degree": "CURRENT DEGREE",
+    "query_optimization": "CURRENT QUERY OPTIMIZATION",
+    "lock_timeout": "CURRENT LOCK TIMEOUT",
+}
+
+
 def escape(string):
     if "`" in string:
         raise Exception(
@@ -103,6 +159,98 @@ def generate_select_sql(catalog_entry, columns):
     select_sql = select_sql.replace("%", "%%")
     return select_sql
 
+def get_query_profile(config, catalog_entry):
+    """Returns the global query_profile overridden by the stream's entry in
+    stream_query_profiles"""
+    profile = dict(config.get("query_profile") or {})
+    stream_profiles = config.get("stream_query_profiles") or {}
+    profile.update(stream_profiles.get(catalog_entry.tap_stream_id) or {})
+    return profile
+
+
+def apply_query_profile(select_sql, profile):
+    """Appends the profile's read-only, optimize-for and isolation clauses.
+
+    DB2 only accepts these at the very end of a select-statement, so this is
+    called once the WHERE and ORDER BY clauses are in place.
+    """
+    if profile.get("read_only"):
+        select_sql += " FOR READ ONLY"
+
+    optimize_for_rows = profile.get("optimize_for_rows")
+    if optimize_for_rows:
+        select_sql += " OPTIMIZE FOR {} ROWS".format(int(optimize_for_rows))
+
+    isolation = profile.get("isolation")
+    if isolation:
+        isolation = isolation.upper()
+        if isolation not in QUERY_ISOLATION_LEVELS:
+            raise Exception(f"Unknown query isolation level {isolation}")
+        select_sql += f" WITH {isolation}"
+
+    return select_sql
+
+
+def format_register_value(key, value):
+    if key == "current_degree":
+        value = str(value).strip().upper()
+        if value != "ANY" and not (value.isdigit() and 1 <= int(value) <= 32767):
+            raise Exception(f"Invalid current_degree {value}")
+        return f"'{value}'"
+
+    if key == "query_optimization":
+        if int(value) not in QUERY_OPTIMIZATION_CLASSES:
+            raise Exception(f"Invalid query_optimization {value}")
+        return str(int(value))
+
+    if value is None:
+        return "NULL"
+    if isinstance(value, str) and value.upper() in LOCK_TIMEOUT_KEYWORDS:
+        return value.upper()
+    if int(value) < -1:
+        raise Exception(f"Invalid lock_timeout {value}")
+    return str(int(value))
+
+
+def set_session_registers(conn, registers):
+    for key, value in registers.items():
+        conn.execute(
+            text(
+                "SET {} = {}".format(
+                    SESSION_REGISTERS[key], format_register_value(key, value)
+                )
+            )
+        )
+
+
+@contextlib.contextmanager
+def session_registers(conn, profile):
+    """Sets the profile's special registers on conn for the duration of the
+    block, then restores the values they had before"""
+    registers = {
+        key: profile[key] for key in SESSION_REGISTERS if profile.get(key) is not None
+    }
+    if not registers:
+        yield
+        return
+
+    previous = conn.execute(
+        text(
+            "SELECT {} FROM SYSIBM.SYSDUMMY1".format(
+                ", ".join(SESSION_REGISTERS[key] for key in registers)
+            )
+        )
+    ).fetchone()
+    previous = dict(zip(registers, previous))
+
+    LOGGER.info(f"Setting session registers {registers}")
+    set_session_registers(conn, registers)
+    try:
+        yield
+    finally:
+        set_session_registers(conn, previous)
+
+
 def default_date_format():
     return False
 
@@ -113,72 +261,417 @@ def default_offset_value():
     """
     return False
 
-def row_to_singer_record(
-    catalog_entry, version, table_stream, row, columns, time_extracted, config
-):
-    row_to_persist = ()
+def convert_value(elem, sql_data_type, property_format, use_date_data_type_format):
+    """Converts a single fetched value into its Singer representation.
+
+    This is the general type dispatch; the per-column converters built by
+    build_row_converter only fall back to it for unexpected value types.
+    """
+    if isinstance(elem, datetime.datetime):
+        return elem.isoformat() + "+00:00"
+
+    elif isinstance(elem, datetime.date):
+        if use_date_data_type_format:
+            return elem.isoformat()
+        return elem.isoformat() + "T00:00:00+00:00"
+
+    elif isinstance(elem, datetime.timedelta):
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        timedelta_from_epoch = epoch + elem
+        return timedelta_from_epoch.isoformat() + "+00:00"
+
+    elif isinstance(elem, datetime.time):
+        if use_date_data_type_format:
+            return elem.isoformat()
+        return "1970-01-01T" + elem.isoformat() + "+00:00"
+
+    elif isinstance(elem, bytes):
+        if sql_data_type in ["binary", "varbinary"]:
+            # Convert binary byte array to hex string
+            return f"0x{elem.hex().upper()}"
+        # for BIT value, treat 0 as False and anything else as True
+        return elem != b"\x00"
+
+    elif "boolean" in sql_data_type:
+        if elem is None:
+            return None
+        return elem != 0
+
+    elif isinstance(elem, uuid.UUID):
+        return str(elem)
+
+    elif property_format == "singer.decimal":
+        if elem is None:
+            return elem
+        return str(elem)
+
+    return elem
+
+
+# Python types returned by the driver which never need converting (Decimal
+# only does as a singer.decimal, converted before these are checked)
+PASSTHROUGH_TYPES = frozenset([type(None), str, int, float, bool, decimal.Decimal])
+
+
+def column_converter(sql_data_type, property_format, use_date_data_type_format):
+    """Returns a function converting values of a single column.
+
+    The function is specialised for the value type the column's sql-datatype
+    is expected to produce and falls back to convert_value for anything else,
+    so the output is identical to the general dispatch.
+    """
+    fallback = functools.partial(
+        convert_value,
+        sql_data_type=sql_data_type,
+        property_format=property_format,
+        use_date_data_type_format=use_date_data_type_format,
+    )
+
+    if "boolean" in sql_data_type:
+        def convert(elem):
+            if elem is None:
+                return None
+            if isinstance(elem, int):
+                return elem != 0
+            return fallback(elem)
+
+    elif property_format == "singer.decimal":
+        def convert(elem):
+            if elem is None:
+                return None
+            return fallback(elem)
+
+    elif sql_data_type in ("timestamp", "datetime"):
+        def convert(elem):
+            if type(elem) is datetime.datetime:
+                return elem.isoformat() + "+00:00"
+            if elem is None:
+                return None
+            return fallback(elem)
+
+    elif sql_data_type == "date":
+        suffix = "" if use_date_data_type_format else "T00:00:00+00:00"
+
+        def convert(elem):
+            if type(elem) is datetime.date:
+                return elem.isoformat() + suffix
+            if elem is None:
+                return None
+            return fallback(elem)
+
+    else:
+        def convert(elem):
+            if type(elem) in PASSTHROUGH_TYPES:
+                return elem
+            return fallback(elem)
+
+    return convert
+
+
+def build_row_converter(catalog_entry, columns, config):
+    """Compiles a function turning a fetched row into a record dict.
+
+    Metadata and schema lookups happen once here, per stream, rather than for
+    every row: the returned function applies one precomputed converter per
+    column.
+    """
     use_date_data_type_format = config.get("use_date_datatype") or default_date_format()
     md_map = metadata.to_map(catalog_entry.metadata)
     md_map[("properties", "_sdc_deleted_at")] = {
         "sql-datatype": "datetime"  # maybe datetimeoffset??
     }
-    for idx, elem in enumerate(row):
-        property_type = catalog_entry.schema.properties[columns[idx]].type
-        sql_data_type = md_map.get(("properties", columns[idx])).get("sql-datatype")
-        property_format = catalog_entry.schema.properties[columns[idx]].format
-        if isinstance(elem, datetime.datetime):
-            row_to_persist += (elem.isoformat() + "+00:00",)
-
-        elif isinstance(elem, datetime.date):
-            if use_date_data_type_format:
-                row_to_persist += (elem.isoformat(),)
-            else:
-                row_to_persist += (elem.isoformat() + "T00:00:00+00:00",)
-
-        elif isinstance(elem, datetime.timedelta):
-            epoch = datetime.datetime.utcfromtimestamp(0)
-            timedelta_from_epoch = epoch + elem
-            row_to_persist += (timedelta_from_epoch.isoformat() + "+00:00",)
-
-        elif isinstance(elem, bytes):
-            if sql_data_type in ["binary", "varbinary"]:
-                # Convert binary byte array to hex string‘
-                hex_representation = f"0x{elem.hex().upper()}"
-                row_to_persist += (hex_representation,)
-            else:
-                # for BIT value, treat 0 as False and anything else as True
-                boolean_representation = elem != b"\x00"
-                row_to_persist += (boolean_representation,)
-
-        elif "boolean" in sql_data_type or sql_data_type == "boolean":
-            if elem is None:
-                boolean_representation = None
-            elif elem == 0:
-                boolean_representation = False
-            else:
-                boolean_representation = True
-            row_to_persist += (boolean_representation,)
-        elif isinstance(elem, uuid.UUID):
-            row_to_persist += (str(elem),)
-        
-        elif property_format == 'singer.decimal':
-            if elem is None:
-                row_to_persist += (elem,)
-            else:
-                row_to_persist += (str(elem),)
-            
+
+    converters = []
+    for column in columns:
+        sql_data_type = md_map.get(("properties", column), {}).get("sql-datatype") or ""
+        property_schema = catalog_entry.schema.properties.get(column)
+        property_format = property_schema.format if property_schema else None
+        converters.append(
+            column_converter(sql_data_type, property_format, use_date_data_type_format)
+        )
+
+    columns = tuple(columns)
+    converters = tuple(converters)
+
+    def convert_row(row):
+        return {
+            column: convert(elem)
+            for column, convert, elem in zip(columns, converters, row)
+        }
+
+    return convert_row
+
+
+# Conversions worth memoising for low-cardinality columns
+CACHEABLE_SQL_DATATYPES = {"date", "time", "timestamp"}
+
+DEFAULT_CONVERSION_CACHE_SIZE = 10000
+
+# Lookups a cache gets to prove itself and the hit rate it has to reach
+CONVERSION_CACHE_SAMPLE_SIZE = 100000
+CONVERSION_CACHE_MIN_HIT_RATE = 0.5
+
+
+class ConversionCache:
+    """
+    A bounded LRU cache in front of a column converter.
+
+    Columns with few distinct values (dates, times, codes) repeat the same
+    conversion millions of times. Once the cache has seen
+    CONVERSION_CACHE_SAMPLE_SIZE lookups it checks its hit rate and, if it is
+    below CONVERSION_CACHE_MIN_HIT_RATE, disables itself so the column goes
+    back to direct conversion.
+    """
+
+    def __init__(self, column, convert, maxsize):
+        self.column = column
+        self.enabled = True
+        self.convert = functools.lru_cache(maxsize=maxsize)(convert)
+
+    def hit_rate(self):
+        info = self.convert.cache_info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def review(self):
+        info = self.convert.cache_info()
+        if info.hits + info.misses < CONVERSION_CACHE_SAMPLE_SIZE:
+            return
+
+        if self.hit_rate() < CONVERSION_CACHE_MIN_HIT_RATE:
+            LOGGER.info(
+                f"Conversion cache for {self.column} disabled, "
+                f"hit rate {self.hit_rate():.1%}"
+            )
+            self.enabled = False
+            self.convert.cache_clear()
+
+    def log_hit_rate(self):
+        info = self.convert.cache_info()
+        LOGGER.info(
+            f"Conversion cache for {self.column}: {info.hits} hits, "
+            f"{info.misses} misses, hit rate {self.hit_rate():.1%}"
+            + ("" if self.enabled else " (disabled)")
+        )
+
+
+def build_conversion_caches(catalog_entry, columns, config):
+    """Returns a ConversionCache for each column that should use one.
+
+    conversion_cache is "auto" (the default) to cache DATE, TIME and TIMESTAMP
+    columns whose discovered column-cardinality (SYSCAT.COLUMNS.COLCARD) fits
+    in the cache, "all" to cache every such column regardless of statistics,
+    or "off".
+    """
+    mode = config.get("conversion_cache", "auto")
+    if mode in ("off", False, None):
+        return {}
+    if mode not in ("auto", "all", True):
+        raise Exception(f"Unknown conversion_cache {mode}")
+
+    maxsize = config.get("conversion_cache_size") or DEFAULT_CONVERSION_CACHE_SIZE
+    use_date_data_type_format = config.get("use_date_datatype") or default_date_format()
+    md_map = metadata.to_map(catalog_entry.metadata)
+
+    caches = {}
+    for column in columns:
+        column_metadata = md_map.get(("properties", column), {})
+        sql_data_type = column_metadata.get("sql-datatype") or ""
+        if sql_data_type not in CACHEABLE_SQL_DATATYPES:
+            continue
+
+        if mode == "auto":
+            cardinality = column_metadata.get("column-cardinality")
+            if cardinality is None or cardinality < 0 or cardinality > maxsize:
+                continue
+
+        property_schema = catalog_entry.schema.properties.get(column)
+        convert = column_converter(
+            sql_data_type,
+            property_schema.format if property_schema else None,
+            use_date_data_type_format,
+        )
+        caches[column] = ConversionCache(column, convert, maxsize)
+
+    return caches
+
+
+INTEGER_TYPES = frozenset([int, bool])
+
+NUMERIC_TYPES = frozenset([type(None), int, float, decimal.Decimal])
+
+
+def column_batch_converter(
+    sql_data_type, property_format, use_date_data_type_format, cache=None
+):
+    """Returns a function converting all the values of one column of a chunk.
+
+    The types present in the column are checked once per chunk (set(map(type))
+    runs in C); columns that need no conversion are returned untouched and the
+    common cases are converted in a single comprehension. Anything unexpected
+    goes through the per-value column_converter, or the column's
+    ConversionCache while that is enabled.
+    """
+    convert = column_converter(sql_data_type, property_format, use_date_data_type_format)
+
+    if cache is not None:
+        uncached_convert_values = column_batch_converter(
+            sql_data_type, property_format, use_date_data_type_format
+        )
+
+        def convert_values(values):
+            if not cache.enabled:
+                return uncached_convert_values(values)
+            converted = list(map(cache.convert, values))
+            cache.review()
+            return converted
+
+        return convert_values
+
+    if "boolean" in sql_data_type:
+        def convert_values(values):
+            if numpy is not None and set(map(type, values)) <= INTEGER_TYPES:
+                return (numpy.fromiter(values, dtype=numpy.int64, count=len(values)) != 0).tolist()
+            return list(map(convert, values))
+
+    elif property_format == "singer.decimal":
+        def convert_values(values):
+            if set(map(type, values)) <= NUMERIC_TYPES:
+                return [None if v is None else str(v) for v in values]
+            return list(map(convert, values))
+
+    elif sql_data_type in ("timestamp", "datetime", "date"):
+        value_type = datetime.date if sql_data_type == "date" else datetime.datetime
+        if sql_data_type == "date" and not use_date_data_type_format:
+            suffix = "T00:00:00+00:00"
+        elif sql_data_type == "date":
+            suffix = ""
         else:
-            row_to_persist += (elem,)
-    rec = dict(zip(columns, row_to_persist))
+            suffix = "+00:00"
+
+        def convert_values(values):
+            if set(map(type, values)) <= {value_type, type(None)}:
+                return [None if v is None else v.isoformat() + suffix for v in values]
+            return list(map(convert, values))
+
+    else:
+        def convert_values(values):
+            if set(map(type, values)) <= PASSTHROUGH_TYPES:
+                return values
+            return list(map(convert, values))
+
+    return convert_values
+
+
+def build_chunk_converter(catalog_entry, columns, config, caches=None):
+    """Compiles a function turning a fetched chunk of rows into record dicts.
+
+    The chunk is transposed so each column is converted in one pass, then the
+    records are assembled from the converted columns. caches maps column names
+    to the ConversionCache they should use.
+    """
+    caches = caches or {}
+    use_date_data_type_format = config.get("use_date_datatype") or default_date_format()
+    md_map = metadata.to_map(catalog_entry.metadata)
+
+    converters = []
+    for column in columns:
+        sql_data_type = md_map.get(("properties", column), {}).get("sql-datatype") or ""
+        property_schema = catalog_entry.schema.properties.get(column)
+        property_format = property_schema.format if property_schema else None
+        converters.append(
+            column_batch_converter(
+                sql_data_type,
+                property_format,
+                use_date_data_type_format,
+                caches.get(column),
+            )
+        )
+
+    columns = tuple(columns)
+    converters = tuple(converters)
+
+    def convert_chunk(rows):
+        converted = [
+            convert_values(values)
+            for convert_values, values in zip(converters, zip(*rows))
+        ]
+        return [dict(zip(columns, values)) for values in zip(*converted)]
+
+    return convert_chunk
+
+
+def row_to_singer_record(
+    catalog_entry,
+    version,
+    table_stream,
+    row,
+    columns,
+    time_extracted,
+    config,
+    row_converter=None,
+):
+    if row_converter is None:
+        row_converter = build_row_converter(catalog_entry, columns, config)
 
     return singer.RecordMessage(
         stream=table_stream,
-        record=rec,
+        record=row_converter(row),
         version=version,
         time_extracted=time_extracted,
     )
 
 
+def estimate_row_width(catalog_entry, columns):
+    """Estimates the in-memory size of a fetched row of the given columns.
+
+    Uses the discovered average-column-length (SYSCAT.COLUMNS.AVGCOLLEN) when
+    statistics exist, otherwise the column's declared length or type width.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    row_width = 0
+    for column in columns:
+        column_metadata = md_map.get(("properties", column), {})
+        property_schema = catalog_entry.schema.properties.get(column)
+        sql_data_type = column_metadata.get("sql-datatype")
+
+        width = column_metadata.get("average-column-length")
+        if width is None and property_schema is not None and property_schema.maxLength:
+            width = property_schema.maxLength
+        if width is None and column_metadata.get("numeric-precision"):
+            width = column_metadata["numeric-precision"] // 2 + 1
+        if width is None:
+            width = SQL_DATATYPE_WIDTHS.get(sql_data_type, DEFAULT_COLUMN_WIDTH)
+
+        row_width += width + PYTHON_VALUE_OVERHEAD
+
+    return max(row_width, 1)
+
+
+def build_fetch_tuner(catalog_entry, columns, config, max_arraysize=None):
+    """Returns the FetchSizeTuner for a stream synced with cursor_array_size auto.
+
+    The largest fetch allowed is the number of estimated rows that fit in
+    fetch_memory_budget bytes, capped by max_arraysize; tuning starts at a
+    quarter of that.
+    """
+    budget = config.get("fetch_memory_budget") or DEFAULT_FETCH_MEMORY_BUDGET
+    row_width = estimate_row_width(catalog_entry, columns)
+    maximum = min(
+        max(budget // row_width, 1),
+        max_arraysize or AUTO_ARRAYSIZE_MAXIMUM,
+        AUTO_ARRAYSIZE_MAXIMUM,
+    )
+    minimum = min(AUTO_ARRAYSIZE_MINIMUM, maximum)
+    initial = max(maximum // 4, minimum)
+
+    LOGGER.info(
+        f"{catalog_entry.tap_stream_id}: estimated row width {row_width} bytes, "
+        f"fetch size starts at {initial} (range {minimum}-{maximum})"
+    )
+    return FetchSizeTuner(initial, minimum, maximum)
+
+
 def whitelist_bookmark_keys(bookmark_key_set, tap_stream_id, state):
     for bk in [
         non_whitelisted_bookmark_key
@@ -190,6 +683,323 @@ def whitelist_bookmark_keys(bookmark_key_set, tap_stream_id, state):
         singer.clear_bookmark(state, tap_stream_id, bk)
 
 
+# Bytes of each (replication key, primary key) hash kept in a BookmarkDigest
+BOOKMARK_DIGEST_BYTES = 8
+
+DEFAULT_BOOKMARK_DIGEST_SIZE = 100000
+
+
+class BookmarkDigest:
+    """
+    The (replication key, primary key) hashes of the rows emitted within
+    offset_value of the replication key bookmark.
+
+    An incremental query with a negative offset_value selects those rows
+    again on the next sync. The digest is kept in state and admit() turns
+    away the rows found in the previous sync's digest. At most max_size
+    rows are remembered; past that the oldest are emitted again.
+
+    key_type, from bookmark_digest_key_type, says how the offset applies to
+    replication key values: as seconds to date-time values (as the
+    incremental query adds it), and as DB2 adds a number in SQL to numbers,
+    DATEs (a yyyymmdd duration) and TIMEs (hhmmss).
+    """
+
+    def __init__(
+        self,
+        replication_key,
+        key_properties,
+        offset_value,
+        key_type,
+        previous=None,
+        max_size=DEFAULT_BOOKMARK_DIGEST_SIZE,
+    ):
+        self.replication_key = replication_key
+        self.key_columns = [replication_key] + list(key_properties)
+        self.key_type = key_type
+        if key_type == "date-time":
+            self.offset = datetime.timedelta(seconds=float(offset_value))
+        elif key_type in ("date", "time"):
+            self.offset = -labeled_duration(offset_value, key_type)
+        else:
+            self.offset = decimal.Decimal(str(offset_value))
+        self.previous = set(self.decode(previous)) if previous else set()
+        self.recent = collections.deque(maxlen=max_size)
+        # The replication key bookmark the digest is encoded for
+        self.replication_key_value = None
+
+    @staticmethod
+    def decode(encoded):
+        digests = base64.b64decode(encoded)
+        return [
+            digests[i : i + BOOKMARK_DIGEST_BYTES]
+            for i in range(0, len(digests), BOOKMARK_DIGEST_BYTES)
+        ]
+
+    def key_digest(self, record):
+        key = json.dumps([record[column] for column in self.key_columns], default=str)
+        return hashlib.blake2b(key.encode(), digest_size=BOOKMARK_DIGEST_BYTES).digest()
+
+    def admit(self, record):
+        """Returns False when the record was already emitted"""
+        if record[self.replication_key] is None:
+            return True
+        digest = self.key_digest(record)
+        self.recent.append((record[self.replication_key], digest))
+        return digest not in self.previous
+
+    def parse(self, value):
+        if self.key_type == "date-time":
+            parsed = datetime.datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+            return parsed
+        if self.key_type == "date":
+            return datetime.date.fromisoformat(value)
+        if self.key_type == "time":
+            return datetime.datetime.combine(
+                datetime.date(1970, 1, 1), datetime.time.fromisoformat(value)
+            )
+        return decimal.Decimal(str(value))
+
+    def move(self, replication_key_value):
+        """Notes the bookmark moving on to the last emitted row's value. The
+        digest is only encoded when a STATE message is written."""
+        self.replication_key_value = replication_key_value
+
+    def encode(self, replication_key_value):
+        """Forgets the rows the next sync will not select again and returns
+        the others' hashes for the state"""
+        cutoff = self.parse(replication_key_value) + self.offset
+        while self.recent and self.parse(self.recent[0][0]) < cutoff:
+            self.recent.popleft()
+        return base64.b64encode(
+            b"".join(digest for _, digest in self.recent)
+        ).decode("ascii")
+
+
+def labeled_duration(offset_value, key_type):
+    """The timedelta DB2 moves a DATE (yyyymmdd) or TIME (hhmmss) by when a
+    number is added to it. Months and years are counted as their longest,
+    so that the digest keeps at least the rows selected again."""
+    high, rest = divmod(int(abs(decimal.Decimal(str(offset_value)))), 10000)
+    middle, low = divmod(rest, 100)
+    if key_type == "date":
+        return datetime.timedelta(days=high * 366 + middle * 31 + low)
+    return datetime.timedelta(hours=high, minutes=middle, seconds=low)
+
+
+def bookmark_digest_key_type(catalog_entry, replication_key):
+    """Returns the BookmarkDigest key_type of a replication key, or None when
+    offset_value cannot be applied to its values"""
+    property_schema = catalog_entry.schema.properties[replication_key]
+    if property_schema.format in ("date-time", "date", "time"):
+        return property_schema.format
+    if property_schema.format == "singer.decimal":
+        return "number"
+    types = property_schema.type
+    if not isinstance(types, list):
+        types = [types]
+    if "integer" in types or "number" in types:
+        return "number"
+    return None
+
+
+def write_record_bookmarks(
+    state,
+    catalog_entry,
+    replication_method,
+    replication_key,
+    key_properties,
+    record,
+    composite=False,
+    bookmark_digest=None,
+):
+    """Moves the stream's bookmarks on to the given (last emitted) record.
+    With composite, INCREMENTAL streams also bookmark the record's primary
+    key and, given a bookmark_digest, move it on (see write_digest_bookmark)."""
+    if replication_method in {"FULL_TABLE", "LOG_BASED"}:
+        max_pk_values = singer.get_bookmark(
+            state, catalog_entry.tap_stream_id, "max_pk_values"
+        )
+
+        if max_pk_values:
+            last_pk_fetched = {
+                k: v
+                for k, v in record.items()
+                if k in key_properties
+            }
+
+            state = singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "last_pk_fetched",
+                last_pk_fetched,
+            )
+
+    elif replication_method == "INCREMENTAL":
+        if replication_key is not None:
+            state = singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "replication_key",
+                replication_key,
+            )
+
+            state = singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "replication_key_value",
+                record[replication_key],
+            )
+
+            if composite and key_properties:
+                state = singer.write_bookmark(
+                    state,
+                    catalog_entry.tap_stream_id,
+                    "replication_key_pk",
+                    {k: record[k] for k in key_properties},
+                )
+            if bookmark_digest is not None and record[replication_key] is not None:
+                bookmark_digest.move(record[replication_key])
+
+    return state
+
+
+def write_digest_bookmark(state, catalog_entry, bookmark_digest):
+    """Bookmarks the digest of the rows emitted within offset_value of the
+    replication key bookmark, before a STATE message is written"""
+    if bookmark_digest.replication_key_value is not None:
+        state = singer.write_bookmark(
+            state,
+            catalog_entry.tap_stream_id,
+            "replication_key_digest",
+            bookmark_digest.encode(bookmark_digest.replication_key_value),
+        )
+    return state
+
+
+# The pool of encoder processes shared by the queries of a sync run, see
+# encoder_pool
+_encoder_executor = None
+
+# Stream encoders an encoder process keeps built, most recently used last
+ENCODER_CACHE_SIZE = 16
+
+_process_encoders = collections.OrderedDict()
+
+
+def new_encoder_executor(processes):
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+@contextlib.contextmanager
+def encoder_pool(config):
+    """
+    Starts the encoder_processes worker processes once for a sync run, to be
+    shared by every query of every stream instead of each query starting
+    (and importing the tap in) a pool of its own. The pool is shut down when
+    the run ends.
+    """
+    global _encoder_executor  # pylint: disable=global-statement
+
+    processes = int(config.get("encoder_processes") or 0)
+    if processes <= 0:
+        yield
+        return
+
+    _encoder_executor = new_encoder_executor(processes)
+    try:
+        yield
+    finally:
+        executor, _encoder_executor = _encoder_executor, None
+        executor.shutdown(cancel_futures=True)
+
+
+def build_process_encoder(
+    catalog_entry_dict,
+    columns,
+    config,
+    table_stream,
+    stream_version,
+    time_extracted,
+    bookmark_columns,
+):
+    """Builds a query's chunk converter and record encoder in an encoder
+    process"""
+    catalog_entry = Catalog.from_dict({"streams": [catalog_entry_dict]}).streams[0]
+    chunk_converter = build_chunk_converter(
+        catalog_entry,
+        columns,
+        config,
+        build_conversion_caches(catalog_entry, columns, config),
+    )
+    writer = get_writer(
+        config, table_stream, stream_version, time_extracted, catalog_entry, columns
+    )
+    return chunk_converter, writer.encode_record, bookmark_columns
+
+
+def encode_rows_in_process(encoder_key, encoder_args, rows):
+    """Converts and serialises a chunk in an encoder process, with the
+    encoder built from the pickled encoder_args the first time the process
+    sees encoder_key. Only the columns the writer bookmarks are sent back
+    with the encoded lines."""
+    encoder = _process_encoders.get(encoder_key)
+    if encoder is None:
+        encoder = build_process_encoder(*pickle.loads(encoder_args))
+        _process_encoders[encoder_key] = encoder
+        while len(_process_encoders) > ENCODER_CACHE_SIZE:
+            _process_encoders.popitem(last=False)
+    else:
+        _process_encoders.move_to_end(encoder_key)
+
+    chunk_converter, encode_record, bookmark_columns = encoder
+    records = chunk_converter(rows)
+    return (
+        [{column: record[column] for column in bookmark_columns} for record in records],
+        [encode_record(record) for record in records],
+    )
+
+
+def encode_in_processes(chunks, executor, queue_size, encoder_args):
+    """
+    Yields (rows, bookmark records, encoded lines) for each fetched chunk,
+    in the order the chunks were fetched.
+
+    Chunks are fetched on a pipeline thread and handed to the executor's
+    encoder processes, so conversion and JSON encoding are not bound to the
+    GIL of the writing process. The bounded pipeline queues also bound the
+    number of chunks in flight. encoder_args are pickled once and each
+    process builds the query's encoder from them once.
+    """
+    encoder_key = uuid.uuid4().hex
+    encoder_args = pickle.dumps(encoder_args)
+    pending = collections.deque()
+
+    def submit(rows):
+        future = executor.submit(
+            encode_rows_in_process, encoder_key, encoder_args, [tuple(row) for row in rows]
+        )
+        pending.append(future)
+        return rows, future
+
+    submitted = pipeline(chunks, submit, queue_size)
+    try:
+        for rows, future in submitted:
+            records, lines = future.result()
+            pending.popleft()
+            yield rows, records, lines
+    finally:
+        submitted.close()
+        # The pool outlives the query, drop the chunks it no longer needs
+        for future in pending:
+            future.cancel()
+
+
 def sync_query(
     cursor,
     catalog_entry,
@@ -200,7 +1010,12 @@ def sync_query(
     table_stream,
     params,
     config,
+    replication_method=None,
 ):
+    """Extracts the rows of select_sql as records of the stream and moves its
+    bookmarks on as they are written. replication_method defaults to the
+    stream's metadata; FULL_TABLE syncs pass theirs, as INCREMENTAL streams
+    without a replication key fall back to it."""
     replication_key = singer.get_bookmark(
         state, catalog_entry.tap_stream_id, "replication_key"
     )
@@ -208,77 +1023,197 @@ def sync_query(
     # query_string = cursor.mogrify(select_sql, params)
 
     time_extracted = utils.now()
-    if len(params) == 0:
-        results = cursor.execute(text(select_sql))
-    else:
-        LOGGER.info(params["replication_key_value"])
-        stmt = text(select_sql).bindparams(replication_key_value=params["replication_key_value"])
-        results = cursor.execute(stmt)
-    
+    stmt = text(select_sql)
+    if len(params) != 0:
+        LOGGER.info(params)
+        stmt = stmt.bindparams(**params)
+
+    arraysize = ARRAYSIZE
+    stream_buffer_rows = config.get("stream_buffer_rows")
+    if stream_buffer_rows and arraysize != "auto":
+        # The ibm_db cursor reads rows from the server as they are fetched,
+        # so the rows held in memory are bounded by the fetch size alone.
+        # (ibm_db_sa has no supports_server_side_cursors, SQLAlchemy would
+        # ignore stream_results.)
+        arraysize = min(arraysize, stream_buffer_rows)
+
     LOGGER.info(f"{ARRAYSIZE=}")
+    fetch_tuner = None
+    if arraysize == "auto":
+        fetch_tuner = build_fetch_tuner(
+            catalog_entry, columns, config, max_arraysize=stream_buffer_rows
+        )
     rows_saved = 0
     database_name = get_database_name(catalog_entry)
 
-    with metrics.record_counter(None) as counter:
-        counter.tags["database"] = database_name
-        counter.tags["table"] = catalog_entry.table
-        
-        for row in ResultIterator(results, ARRAYSIZE):
-            
-            counter.increment()
+    row_converter = build_row_converter(catalog_entry, columns, config)
+    conversion_caches = build_conversion_caches(catalog_entry, columns, config)
+    chunk_converter = build_chunk_converter(
+        catalog_entry, columns, config, conversion_caches
+    )
+    writer = get_writer(
+        config, table_stream, stream_version, time_extracted, catalog_entry, columns
+    )
+    md_map = metadata.to_map(catalog_entry.metadata)
+    stream_metadata = md_map.get((), {})
+    if replication_method is None:
+        replication_method = stream_metadata.get("replication-method")
+    key_properties = get_key_properties(catalog_entry)
+
+    composite = bool(
+        config.get("composite_bookmarks")
+        and replication_method == "INCREMENTAL"
+        and replication_key is not None
+        and key_properties
+    )
+    bookmark_digest = None
+    bookmark_digest_key = None
+    if composite and float(config.get("offset_value") or 0) < 0:
+        bookmark_digest_key = bookmark_digest_key_type(catalog_entry, replication_key)
+        if bookmark_digest_key is None:
+            LOGGER.warning(
+                f"offset_value cannot be applied to {replication_key} values, "
+                f"rows of {catalog_entry.table} selected again are not deduplicated"
+            )
+    if bookmark_digest_key is not None:
+        bookmark_digest = BookmarkDigest(
+            replication_key,
+            key_properties,
+            config["offset_value"],
+            bookmark_digest_key,
+            previous=singer.get_bookmark(
+                state, catalog_entry.tap_stream_id, "replication_key_digest"
+            ),
+            max_size=int(
+                config.get("bookmark_digest_size") or DEFAULT_BOOKMARK_DIGEST_SIZE
+            ),
+        )
+
+    def write_bookmarks(state, record):
+        return write_record_bookmarks(
+            state,
+            catalog_entry,
+            replication_method,
+            replication_key,
+            key_properties,
+            record,
+            composite,
+            bookmark_digest,
+        )
+
+    def checkpoint(state):
+        if bookmark_digest is not None:
+            write_digest_bookmark(state, catalog_entry, bookmark_digest)
+        writer.write_message(
+            singer.StateMessage(
+                value=snapshot_state(state, catalog_entry.tap_stream_id)
+            )
+        )
+
+    def encode_chunk(rows):
+        """Converts and serialises a fetched chunk, off the writer's thread
+        when the sync is pipelined"""
+        if writer.accepts_rows:
+            return rows, None, None
+        records = chunk_converter(rows)
+        return rows, records, [writer.encode_record(record) for record in records]
+
+    def write_chunk(state, rows_saved, rows, records, lines):
+        """Writes an encoded chunk and emits STATE, always from one thread so
+        that bookmarks follow the records they refer to"""
+        if writer.accepts_rows:
+            # The writer consumes the fetched chunk as is, only the last row
+            # is converted to bookmark it
+            if bookmark_digest is not None:
+                rows = [row for row in rows if bookmark_digest.admit(row_converter(row))]
+                if not rows:
+                    return state, rows_saved
+            writer.write_rows(rows)
+            rows_saved += len(rows)
+            state = write_bookmarks(state, row_converter(rows[-1]))
+
+            if writer.should_checkpoint(rows_saved):
+                checkpoint(state)
+            return state, rows_saved
+
+        last_record = None
+        for record, line in zip(records, lines):
+            if bookmark_digest is not None and not bookmark_digest.admit(record):
+                continue
+            writer.write_encoded(line)
             rows_saved += 1
-            record_message = row_to_singer_record(
-                catalog_entry,
-                stream_version,
-                table_stream,
-                row,
+            last_record = record
+
+            if writer.should_checkpoint(rows_saved):
+                state = write_bookmarks(state, record)
+                checkpoint(state)
+
+        if last_record is not None:
+            state = write_bookmarks(state, last_record)
+        return state, rows_saved
+
+    if config.get("native_cursor"):
+        results = NativeResult(cursor, select_sql, params)
+    else:
+        results = cursor.execute(stmt)
+
+    chunks = ChunkIterator(results, arraysize, fetch_tuner)
+    queue_size = int(config.get("pipeline_queue_size") or DEFAULT_PIPELINE_QUEUE_SIZE)
+    encoder_processes = int(config.get("encoder_processes") or 0)
+    owned_executor = None
+    if encoder_processes > 0 and not writer.accepts_rows:
+        executor = _encoder_executor
+        if executor is None:
+            # Outside of a sync run's encoder_pool the query needs its own
+            executor = owned_executor = new_encoder_executor(encoder_processes)
+        bookmark_columns = [
+            column
+            for column in columns
+            if column in key_properties or column == replication_key
+        ]
+        encoded_chunks = encode_in_processes(
+            chunks,
+            executor,
+            queue_size,
+            (
+                catalog_entry.to_dict(),
                 columns,
-                time_extracted,
                 config,
-            )
-            singer.write_message(record_message)
-            md_map = metadata.to_map(catalog_entry.metadata)
-            stream_metadata = md_map.get((), {})
-            replication_method = stream_metadata.get("replication-method")
+                table_stream,
+                stream_version,
+                time_extracted,
+                bookmark_columns,
+            ),
+        )
+    elif config.get("pipelined_sync"):
+        encoded_chunks = pipeline(chunks, encode_chunk, queue_size)
+    else:
+        encoded_chunks = map(encode_chunk, chunks)
+
+    with metrics.record_counter(None) as counter:
+        counter.tags["database"] = database_name
+        counter.tags["table"] = catalog_entry.table
 
-            if replication_method in {"FULL_TABLE", "LOG_BASED"}:
-                key_properties = get_key_properties(catalog_entry)
+        try:
+            for rows, records, lines in encoded_chunks:
+                state, rows_saved = write_chunk(state, rows_saved, rows, records, lines)
+                counter.increment(len(rows))
 
-                max_pk_values = singer.get_bookmark(
-                    state, catalog_entry.tap_stream_id, "max_pk_values"
-                )
+            checkpoint(state)
+        finally:
+            if hasattr(encoded_chunks, "close"):
+                encoded_chunks.close()
+            if owned_executor is not None:
+                owned_executor.shutdown(cancel_futures=True)
+            if isinstance(results, NativeResult):
+                # Frees the statement handle when the rows were not exhausted
+                results.close()
+            writer.close()
+
+    for conversion_cache in conversion_caches.values():
+        conversion_cache.log_hit_rate()
+
+    if fetch_tuner is not None:
+        LOGGER.info(f"Final fetch size {fetch_tuner.arraysize}")
 
-                if max_pk_values:
-                    last_pk_fetched = {
-                        k: v
-                        for k, v in record_message.record.items()
-                        if k in key_properties
-                    }
-
-                    state = singer.write_bookmark(
-                        state,
-                        catalog_entry.tap_stream_id,
-                        "last_pk_fetched",
-                        last_pk_fetched,
-                    )
-
-            elif replication_method == "INCREMENTAL":
-                if replication_key is not None:
-                    state = singer.write_bookmark(
-                        state,
-                        catalog_entry.tap_stream_id,
-                        "replication_key",
-                        replication_key,
-                    )
-
-                    state = singer.write_bookmark(
-                        state,
-                        catalog_entry.tap_stream_id,
-                        "replication_key_value",
-                        record_message.record[replication_key],
-                    )
-
-            if rows_saved % 1000 == 0:
-                singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
-
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    return rows_saved
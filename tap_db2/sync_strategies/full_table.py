@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 # pylint: disable=duplicate-code,too-many-locals,simplifiable-if-expression
 
-import copy
+import concurrent.futures
+import decimal
+
+import pendulum
 import singer
 from singer import metadata
+from sqlalchemy import text
 
 import tap_db2.sync_strategies.common as common
 
@@ -13,9 +17,30 @@ from tap_db2.connection import (
     modify_ouput_converter,
     revert_ouput_converter,
 )
+from tap_db2.output import (
+    OUTPUT_LOCK,
+    get_state_merger,
+    set_state_merger,
+    snapshot_state,
+    write_message,
+)
 
 LOGGER = singer.get_logger()
 
+# Percentage of the table's pages read to sample range boundaries when DB2
+# has no distribution statistics for the key
+RANGE_SAMPLE_PERCENT = 1
+
+INTEGER_SQL_DATATYPES = {"smallint", "integer", "int", "bigint"}
+
+NUMERIC_SQL_DATATYPES = INTEGER_SQL_DATATYPES | {
+    "decimal",
+    "numeric",
+    "real",
+    "double",
+    "decfloat",
+}
+
 
 def generate_bookmark_keys(catalog_entry):
     md_map = metadata.to_map(catalog_entry.metadata)
@@ -27,6 +52,11 @@ def generate_bookmark_keys(catalog_entry):
         "max_pk_values",
         "version",
         "initial_full_table_complete",
+        "pk_ranges",
+        "completed_pk_ranges",
+        "dbpartitions",
+        "completed_dbpartitions",
+        "completed_data_partitions",
     }
 
     bookmark_keys = base_bookmark_keys
@@ -34,6 +64,593 @@ def generate_bookmark_keys(catalog_entry):
     return bookmark_keys
 
 
+def parse_coldist_value(colvalue, sql_data_type):
+    """SYSCAT statistics hold values as SQL constants: numbers as they are,
+    everything else in quotes"""
+    value = colvalue.strip()
+    if sql_data_type in NUMERIC_SQL_DATATYPES:
+        value = decimal.Decimal(value)
+        return int(value) if sql_data_type in INTEGER_SQL_DATATYPES else value
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        value = value[1:-1].replace("''", "'")
+    return value
+
+
+def boundary_value(value):
+    """Range boundaries are kept in state, so anything but an integer is kept
+    as a string, which DB2 casts back when comparing it with the key"""
+    if isinstance(value, int):
+        return value
+    return str(value)
+
+
+def pick_boundaries(values, range_count):
+    """Returns at most range_count - 1 distinct values splitting the sorted
+    values into equal parts"""
+    if not values:
+        return []
+    picked = {values[len(values) * i // range_count] for i in range(1, range_count)}
+    return sorted(picked)
+
+
+def get_quantile_boundaries(open_conn, catalog_entry, pk, sql_data_type, range_count):
+    rows = open_conn.execute(
+        text(
+            """
+            SELECT COLVALUE
+            FROM SYSCAT.COLDIST
+            WHERE TABSCHEMA = :schema
+              AND TABNAME = :table
+              AND COLNAME = :column
+              AND TYPE = 'Q'
+              AND COLVALUE IS NOT NULL
+            ORDER BY SEQNO
+            """
+        ).bindparams(
+            schema=common.get_database_name(catalog_entry),
+            table=catalog_entry.table,
+            column=pk,
+        )
+    )
+    values = [parse_coldist_value(row[0], sql_data_type) for row in rows]
+    return pick_boundaries(values, range_count)
+
+
+def get_key_range_boundaries(open_conn, catalog_entry, pk, sql_data_type, range_count):
+    """Splits LOW2KEY..HIGH2KEY evenly, only meaningful for numeric keys"""
+    if sql_data_type not in NUMERIC_SQL_DATATYPES:
+        return []
+
+    row = open_conn.execute(
+        text(
+            """
+            SELECT LOW2KEY, HIGH2KEY
+            FROM SYSCAT.COLUMNS
+            WHERE TABSCHEMA = :schema
+              AND TABNAME = :table
+              AND COLNAME = :column
+            """
+        ).bindparams(
+            schema=common.get_database_name(catalog_entry),
+            table=catalog_entry.table,
+            column=pk,
+        )
+    ).fetchone()
+    if row is None or not row[0] or not row[1]:
+        return []
+
+    low = parse_coldist_value(row[0], sql_data_type)
+    high = parse_coldist_value(row[1], sql_data_type)
+    if high <= low:
+        return []
+
+    step = (high - low) / range_count
+    values = [low + step * i for i in range(1, range_count)]
+    if sql_data_type in INTEGER_SQL_DATATYPES:
+        values = [int(value) for value in values]
+    return sorted(set(values))
+
+
+def get_sampled_boundaries(open_conn, catalog_entry, pk, range_count):
+    """Asks DB2 for the upper key of each of range_count tiles of a sample"""
+    escaped_pk = common.escape(pk)
+    rows = open_conn.execute(
+        text(
+            """
+            SELECT MAX(PK)
+            FROM (
+                SELECT {pk} AS PK, NTILE({range_count}) OVER (ORDER BY {pk}) AS TILE
+                FROM {schema}.{table} TABLESAMPLE SYSTEM ({percent})
+            ) AS SAMPLED
+            GROUP BY TILE
+            ORDER BY TILE
+            """.format(
+                pk=escaped_pk,
+                range_count=int(range_count),
+                schema=common.escape(common.get_database_name(catalog_entry)),
+                table=common.escape(catalog_entry.table),
+                percent=RANGE_SAMPLE_PERCENT,
+            )
+        )
+    )
+    # The last tile ends at the end of the table
+    return [row[0] for row in rows if row[0] is not None][:-1]
+
+
+def get_pk_range_boundaries(open_conn, catalog_entry, range_count):
+    key_properties = common.get_key_properties(catalog_entry)
+    if len(key_properties) != 1:
+        LOGGER.info(
+            f"{catalog_entry.table} does not have a single column primary key, "
+            "syncing it as one range"
+        )
+        return []
+
+    pk = key_properties[0]
+    md_map = metadata.to_map(catalog_entry.metadata)
+    sql_data_type = md_map.get(("properties", pk), {}).get("sql-datatype")
+
+    boundaries = get_quantile_boundaries(
+        open_conn, catalog_entry, pk, sql_data_type, range_count
+    )
+    source = "SYSCAT.COLDIST quantiles"
+    if not boundaries:
+        boundaries = get_key_range_boundaries(
+            open_conn, catalog_entry, pk, sql_data_type, range_count
+        )
+        source = "LOW2KEY/HIGH2KEY"
+    if not boundaries:
+        boundaries = get_sampled_boundaries(open_conn, catalog_entry, pk, range_count)
+        source = "a sample"
+
+    LOGGER.info(
+        f"Split {catalog_entry.table} into {len(boundaries) + 1} ranges of {pk} "
+        f"from {source}"
+    )
+    return [boundary_value(value) for value in boundaries]
+
+
+def get_pk_ranges(open_conn, catalog_entry, state, range_count):
+    """Returns the [start, end) key ranges of the table, reusing those of an
+    interrupted sync so that its completed ranges stay valid"""
+    pk_ranges = singer.get_bookmark(state, catalog_entry.tap_stream_id, "pk_ranges")
+    if pk_ranges is not None:
+        return pk_ranges
+
+    boundaries = get_pk_range_boundaries(open_conn, catalog_entry, range_count)
+    pk_ranges = [list(pk_range) for pk_range in zip([None] + boundaries, boundaries + [None])]
+
+    singer.write_bookmark(state, catalog_entry.tap_stream_id, "pk_ranges", pk_ranges)
+    singer.write_bookmark(state, catalog_entry.tap_stream_id, "completed_pk_ranges", [])
+    return pk_ranges
+
+
+def generate_range_sql(select_sql, pk, pk_range):
+    start, end = pk_range
+    conditions = []
+    params = {}
+
+    if start is not None:
+        conditions.append(f"{common.escape(pk)} >= :range_start")
+        params["range_start"] = start
+    if end is not None:
+        conditions.append(f"{common.escape(pk)} < :range_end")
+        params["range_end"] = end
+
+    if conditions:
+        select_sql += " WHERE " + " AND ".join(conditions)
+    return select_sql, params
+
+
+def sync_table_slice(
+    mssql_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    slice_id,
+    select_sql,
+    params,
+    completed_key,
+    merge_state,
+):
+    """Extracts one slice (key range, database partition or data partition)
+    of a table on its own connection.
+
+    Progress within a slice is not resumable, so every STATE written while
+    the slice is synced is the stream's state, which only moves on when a
+    slice completes and is added to the completed_key bookmark.
+    """
+    set_state_merger(merge_state)
+
+    with OUTPUT_LOCK:
+        slice_state = snapshot_state(state, catalog_entry.tap_stream_id)
+
+    query_profile = common.get_query_profile(config, catalog_entry)
+    select_sql = common.apply_query_profile(select_sql, query_profile)
+
+    with mssql_conn.connect() as open_conn:
+        with common.session_registers(open_conn, query_profile):
+            common.sync_query(
+                open_conn,
+                catalog_entry,
+                slice_state,
+                select_sql,
+                columns,
+                stream_version,
+                table_stream,
+                params,
+                config,
+            )
+
+    with OUTPUT_LOCK:
+        completed = singer.get_bookmark(
+            state, catalog_entry.tap_stream_id, completed_key
+        ) or []
+        singer.write_bookmark(
+            state,
+            catalog_entry.tap_stream_id,
+            completed_key,
+            sorted(completed + [slice_id]),
+        )
+        write_message(singer.StateMessage(value=state))
+
+    set_state_merger(None)
+
+
+def sync_table_slices(
+    mssql_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    slices,
+    completed_key,
+    max_workers=None,
+):
+    """Extracts the (slice_id, select_sql, params) slices of a table on up to
+    max_workers (default: all of them at once) connections, skipping the
+    slices whose slice_id is already in the completed_key bookmark"""
+    completed = set(
+        singer.get_bookmark(state, catalog_entry.tap_stream_id, completed_key) or []
+    )
+    parent_merge_state = get_state_merger()
+
+    def merge_state(slice_state):
+        # A slice's own bookmarks are never resumed from, see sync_table_slice
+        merged = snapshot_state(state, catalog_entry.tap_stream_id)
+        if parent_merge_state is not None:
+            return parent_merge_state(merged)
+        return merged
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers or len(slices), thread_name_prefix="slice"
+    ) as executor:
+        futures = [
+            executor.submit(
+                sync_table_slice,
+                mssql_conn,
+                config,
+                catalog_entry,
+                state,
+                columns,
+                stream_version,
+                table_stream,
+                slice_id,
+                select_sql,
+                params,
+                completed_key,
+                merge_state,
+            )
+            for slice_id, select_sql, params in slices
+            if slice_id not in completed
+        ]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def sync_pk_ranges(
+    mssql_conn, config, catalog_entry, state, columns, stream_version, table_stream, pk_ranges
+):
+    pk = common.get_key_properties(catalog_entry)[0]
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+    sync_table_slices(
+        mssql_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        [
+            (index, *generate_range_sql(select_sql, pk, pk_range))
+            for index, pk_range in enumerate(pk_ranges)
+        ],
+        "completed_pk_ranges",
+    )
+
+
+def get_dbpartitions(open_conn, catalog_entry):
+    """Returns the database partitions of the table's partition group"""
+    rows = open_conn.execute(
+        text(
+            """
+            SELECT d.DBPARTITIONNUM
+            FROM SYSCAT.TABLES t
+            JOIN SYSCAT.TABLESPACES ts ON ts.TBSPACE = t.TBSPACE
+            JOIN SYSCAT.DBPARTITIONGROUPDEF d ON d.DBPGNAME = ts.DBPGNAME
+            WHERE t.TABSCHEMA = :schema
+              AND t.TABNAME = :table
+              AND d.IN_USE = 'Y'
+            ORDER BY d.DBPARTITIONNUM
+            """
+        ).bindparams(
+            schema=common.get_database_name(catalog_entry),
+            table=catalog_entry.table,
+        )
+    )
+    return [row[0] for row in rows]
+
+
+def get_table_dbpartitions(open_conn, catalog_entry, state):
+    """Returns the partitions to scan, reusing those of an interrupted sync"""
+    dbpartitions = singer.get_bookmark(
+        state, catalog_entry.tap_stream_id, "dbpartitions"
+    )
+    if dbpartitions is not None:
+        return dbpartitions
+
+    dbpartitions = get_dbpartitions(open_conn, catalog_entry)
+    LOGGER.info(
+        f"{catalog_entry.table} is spread over {len(dbpartitions)} database partitions"
+    )
+
+    singer.write_bookmark(state, catalog_entry.tap_stream_id, "dbpartitions", dbpartitions)
+    singer.write_bookmark(state, catalog_entry.tap_stream_id, "completed_dbpartitions", [])
+    return dbpartitions
+
+
+def generate_dbpartition_sql(select_sql, column, dbpartition):
+    select_sql += f" WHERE DBPARTITIONNUM({common.escape(column)}) = :dbpartition"
+    return select_sql, {"dbpartition": dbpartition}
+
+
+def sync_dbpartitions(
+    mssql_conn, config, catalog_entry, state, columns, stream_version, table_stream, dbpartitions
+):
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+    sync_table_slices(
+        mssql_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        [
+            (dbpartition, *generate_dbpartition_sql(select_sql, columns[0], dbpartition))
+            for dbpartition in dbpartitions
+        ],
+        "completed_dbpartitions",
+    )
+
+
+def get_data_partitions(catalog_entry):
+    """Returns the partitioning column and data partitions recorded in the
+    stream's metadata by discovery"""
+    stream_metadata = metadata.to_map(catalog_entry.metadata).get((), {})
+    return (
+        stream_metadata.get("data-partition-key"),
+        stream_metadata.get("data-partitions") or [],
+    )
+
+
+def data_partition_conditions(column, data_partition):
+    """Returns the predicates (and their parameters) restricting a query to
+    one data partition's range, which lets DB2 eliminate every other
+    partition"""
+    escaped_column = common.escape(column)
+    conditions = []
+    params = {}
+
+    if data_partition["low"] is not None:
+        operator = ">=" if data_partition["low-inclusive"] else ">"
+        conditions.append(f"{escaped_column} {operator} :partition_low")
+        params["partition_low"] = data_partition["low"]
+    if data_partition["high"] is not None:
+        operator = "<=" if data_partition["high-inclusive"] else "<"
+        conditions.append(f"{escaped_column} {operator} :partition_high")
+        params["partition_high"] = data_partition["high"]
+
+    return conditions, params
+
+
+def generate_data_partition_sql(select_sql, column, data_partition):
+    conditions, params = data_partition_conditions(column, data_partition)
+    if conditions:
+        select_sql += " WHERE " + " AND ".join(conditions)
+    return select_sql, params
+
+
+def sync_data_partitions(
+    mssql_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    data_partition_key,
+    data_partitions,
+):
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+    sync_table_slices(
+        mssql_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        [
+            (
+                data_partition["name"],
+                *generate_data_partition_sql(
+                    select_sql, data_partition_key, data_partition
+                ),
+            )
+            for data_partition in data_partitions
+        ],
+        "completed_data_partitions",
+        max_workers=int(config.get("data_partition_workers") or 1),
+    )
+
+
+def keyset_comparison(key_properties, param_prefix, operator, or_equal=False):
+    """Compares the key columns with (:<param_prefix>0, :<param_prefix>1, ...)
+    in key order, spelled out column by column as DB2 only compares row
+    values for equality"""
+    escaped_keys = [common.escape(key) for key in key_properties]
+    terms = []
+    for i, escaped_key in enumerate(escaped_keys):
+        equal_prefix = [
+            f"{escaped_keys[j]} = :{param_prefix}{j}" for j in range(i)
+        ]
+        terms.append(equal_prefix + [f"{escaped_key} {operator} :{param_prefix}{i}"])
+    if or_equal:
+        terms.append(
+            [f"{escaped_key} = :{param_prefix}{i}" for i, escaped_key in enumerate(escaped_keys)]
+        )
+    return "(" + " OR ".join("(" + " AND ".join(term) + ")" for term in terms) + ")"
+
+
+def keyset_params(catalog_entry, key_properties, pk_values, param_prefix):
+    """Binds bookmarked key values, which are in their Singer representation"""
+    params = {}
+    for i, key in enumerate(key_properties):
+        value = pk_values[key]
+        if value is not None and catalog_entry.schema.properties[key].format == "date-time":
+            value = pendulum.parse(value)
+        params[f"{param_prefix}{i}"] = value
+    return params
+
+
+def get_max_pk_values(open_conn, catalog_entry, key_properties, config):
+    """Returns the largest key in the table when the sync starts, converted
+    like the records' so it can be kept in state"""
+    escaped_keys = [common.escape(key) for key in key_properties]
+    row = open_conn.execute(
+        text(
+            "SELECT {} FROM {}.{} ORDER BY {} FETCH FIRST 1 ROW ONLY".format(
+                ", ".join(escaped_keys),
+                common.escape(common.get_database_name(catalog_entry)),
+                common.escape(catalog_entry.table),
+                ", ".join(f"{escaped_key} DESC" for escaped_key in escaped_keys),
+            )
+        )
+    ).fetchone()
+    if row is None:
+        return None
+    return common.build_row_converter(catalog_entry, key_properties, config)(row)
+
+
+def generate_keyset_page_sql(
+    catalog_entry, select_sql, key_properties, max_pk_values, last_pk_fetched, page_size
+):
+    conditions = [keyset_comparison(key_properties, "max_pk_", "<", or_equal=True)]
+    params = keyset_params(catalog_entry, key_properties, max_pk_values, "max_pk_")
+    if last_pk_fetched:
+        conditions.insert(0, keyset_comparison(key_properties, "last_pk_", ">"))
+        params.update(
+            keyset_params(catalog_entry, key_properties, last_pk_fetched, "last_pk_")
+        )
+
+    select_sql += " WHERE {} ORDER BY {} FETCH FIRST {} ROWS ONLY".format(
+        " AND ".join(conditions),
+        ", ".join(common.escape(key) for key in key_properties),
+        int(page_size),
+    )
+    return select_sql, params
+
+
+def sync_keyset_pages(
+    mssql_conn, config, catalog_entry, state, columns, stream_version, table_stream, page_size
+):
+    """
+    Extracts the rows up to the largest key found when the sync started, one
+    page of page_size rows at a time in key order.
+
+    The largest key is kept as the max_pk_values bookmark and each page
+    starts after the last_pk_fetched bookmark, so a resumed sync continues
+    right after the last record emitted. Each page is committed to release
+    its locks before the next one is read.
+    """
+    key_properties = common.get_key_properties(catalog_entry)
+    query_profile = common.get_query_profile(config, catalog_entry)
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+
+    with mssql_conn.connect() as open_conn:
+        max_pk_values = singer.get_bookmark(
+            state, catalog_entry.tap_stream_id, "max_pk_values"
+        )
+        if max_pk_values is None:
+            max_pk_values = get_max_pk_values(
+                open_conn, catalog_entry, key_properties, config
+            )
+            if max_pk_values is None:
+                LOGGER.info(f"{catalog_entry.table} is empty")
+                return
+            singer.write_bookmark(
+                state, catalog_entry.tap_stream_id, "max_pk_values", max_pk_values
+            )
+
+        with common.session_registers(open_conn, query_profile):
+            while True:
+                last_pk_fetched = singer.get_bookmark(
+                    state, catalog_entry.tap_stream_id, "last_pk_fetched"
+                )
+                page_sql, params = generate_keyset_page_sql(
+                    catalog_entry,
+                    select_sql,
+                    key_properties,
+                    max_pk_values,
+                    last_pk_fetched,
+                    page_size,
+                )
+                rows_saved = common.sync_query(
+                    open_conn,
+                    catalog_entry,
+                    state,
+                    common.apply_query_profile(page_sql, query_profile),
+                    columns,
+                    stream_version,
+                    table_stream,
+                    params,
+                    config,
+                    replication_method="FULL_TABLE",
+                )
+                open_conn.commit()
+
+                if rows_saved < page_size:
+                    break
+                if singer.get_bookmark(
+                    state, catalog_entry.tap_stream_id, "last_pk_fetched"
+                ) == last_pk_fetched:
+                    raise Exception(
+                        f"Paging through {catalog_entry.table} made no progress, "
+                        "is its replication-method FULL_TABLE?"
+                    )
+
+
 def sync_table(mssql_conn, config, catalog_entry, state, columns, stream_version):
     mssql_conn = get_db2_sql_engine(config)
     common.whitelist_bookmark_keys(
@@ -60,34 +677,119 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns, stream_version
     if not initial_full_table_complete and not (
         version_exists and state_version is None
     ):
-        singer.write_message(activate_version_message)
-
-    with mssql_conn.connect() as open_conn:
-        LOGGER.info("Generating select_sql")
-        select_sql = common.generate_select_sql(catalog_entry, columns)
+        write_message(activate_version_message)
 
-        params = {}
+    # Kept until the sync completes, so that a resumed sync goes on loading
+    # (and finally activates) the version the interrupted one started
+    singer.write_bookmark(
+        state, catalog_entry.tap_stream_id, "version", stream_version
+    )
 
-        if catalog_entry.tap_stream_id == "dbo-InputMetadata":
-            prev_converter = modify_ouput_converter(open_conn)
+    # A table is split by database partition, else by data partition, else
+    # into primary key ranges, else paged through in key order, else
+    # extracted with a single query
+    range_count = int(config.get("full_table_ranges") or 1)
+    page_size = int(config.get("full_table_page_size") or 0)
+    data_partition_key, data_partitions = None, []
+    if config.get("data_partition_scans"):
+        data_partition_key, data_partitions = get_data_partitions(catalog_entry)
+    dbpartitions = []
+    pk_ranges = []
+    with mssql_conn.connect() as open_conn:
+        if config.get("dbpartition_scans"):
+            dbpartitions = get_table_dbpartitions(open_conn, catalog_entry, state)
+        if len(dbpartitions) < 2 and not data_partitions and range_count > 1:
+            pk_ranges = get_pk_ranges(open_conn, catalog_entry, state, range_count)
 
-        common.sync_query(
-            open_conn,
+    if len(dbpartitions) > 1:
+        sync_dbpartitions(
+            mssql_conn,
+            config,
             catalog_entry,
             state,
-            select_sql,
             columns,
             stream_version,
             table_stream,
-            params,
+            dbpartitions,
+        )
+    elif data_partitions:
+        sync_data_partitions(
+            mssql_conn,
             config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            data_partition_key,
+            data_partitions,
+        )
+    elif len(pk_ranges) > 1:
+        sync_pk_ranges(
+            mssql_conn,
+            config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            pk_ranges,
+        )
+    elif page_size and common.get_key_properties(catalog_entry):
+        sync_keyset_pages(
+            mssql_conn,
+            config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            page_size,
+        )
+    else:
+        sync_whole_table(
+            mssql_conn, config, catalog_entry, state, columns, stream_version, table_stream
         )
-
-        if catalog_entry.tap_stream_id == "dbo-InputMetadata":
-            revert_ouput_converter(open_conn, prev_converter)
 
     # clear max pk value and last pk fetched upon successful sync
     singer.clear_bookmark(state, catalog_entry.tap_stream_id, "max_pk_values")
     singer.clear_bookmark(state, catalog_entry.tap_stream_id, "last_pk_fetched")
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "pk_ranges")
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "completed_pk_ranges")
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "dbpartitions")
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "completed_dbpartitions")
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "completed_data_partitions")
 
-    singer.write_message(activate_version_message)
+    write_message(activate_version_message)
+
+
+def sync_whole_table(
+    mssql_conn, config, catalog_entry, state, columns, stream_version, table_stream
+):
+    with mssql_conn.connect() as open_conn:
+        LOGGER.info("Generating select_sql")
+        query_profile = common.get_query_profile(config, catalog_entry)
+        select_sql = common.generate_select_sql(catalog_entry, columns)
+        select_sql = common.apply_query_profile(select_sql, query_profile)
+
+        params = {}
+
+        if catalog_entry.tap_stream_id == "dbo-InputMetadata":
+            prev_converter = modify_ouput_converter(open_conn)
+
+        with common.session_registers(open_conn, query_profile):
+            common.sync_query(
+                open_conn,
+                catalog_entry,
+                state,
+                select_sql,
+                columns,
+                stream_version,
+                table_stream,
+                params,
+                config,
+                replication_method="FULL_TABLE",
+            )
+
+        if catalog_entry.tap_stream_id == "dbo-InputMetadata":
+            revert_ouput_converter(open_conn, prev_converter)
@@ -1,15 +1,273 @@
 #!/usr/bin/env python3
 # pylint: disable=duplicate-code
 
+import datetime
+import decimal
+import re
+
 import pendulum
 import singer
 from singer import metadata
+from sqlalchemy import text
 
 import tap_db2.sync_strategies.common as common
+import tap_db2.sync_strategies.full_table as full_table
+from tap_db2.output import write_message
 
 LOGGER = singer.get_logger()
 
-BOOKMARK_KEYS = {"replication_key", "replication_key_value", "version"}
+BOOKMARK_KEYS = {
+    "replication_key",
+    "replication_key_value",
+    "version",
+    "backfill_windows",
+    "completed_backfill_windows",
+    "replication_key_pk",
+    "replication_key_digest",
+}
+
+# Guards against a window size far too small for the table's key domain,
+# as every window is kept in state
+MAX_BACKFILL_WINDOWS = 10000
+
+DB2_TIMESTAMP = re.compile(r"^(\d{4}-\d{2}-\d{2})-(\d{2})\.(\d{2})\.(\d{2})")
+
+
+def numeric_value(value, offset_value=0):
+    try:
+        return decimal.Decimal(str(value)) + decimal.Decimal(str(offset_value))
+    except decimal.InvalidOperation:
+        return None
+
+
+def data_partition_limit_value(limit, low_water_mark):
+    """Parses a data partition limit into the type of low_water_mark, or
+    returns None when it cannot be compared with it"""
+    if limit is None or low_water_mark is None:
+        return None
+    if isinstance(low_water_mark, decimal.Decimal):
+        return numeric_value(limit)
+    # DB2 writes timestamps as 2020-01-31-23.59.59.000000
+    limit = DB2_TIMESTAMP.sub(r"\1T\2:\3:\4", limit)
+    try:
+        return pendulum.parse(limit)
+    except ValueError:
+        return None
+
+
+def get_replication_key_data_partitions(config, catalog_entry, replication_key):
+    """Returns the stream's data partitions when the table is partitioned on
+    the replication key and data_partition_scans is enabled"""
+    if not config.get("data_partition_scans") or replication_key is None:
+        return []
+    data_partition_key, data_partitions = full_table.get_data_partitions(catalog_entry)
+    if data_partition_key != replication_key:
+        return []
+    return data_partitions
+
+
+def open_data_partitions(data_partitions, low_water_mark):
+    """Drops the partitions that end before low_water_mark: they cannot hold
+    a row the incremental query would select"""
+    open_partitions = []
+    for data_partition in data_partitions:
+        high = data_partition_limit_value(data_partition["high"], low_water_mark)
+        if high is not None and (
+            high < low_water_mark
+            or (high == low_water_mark and not data_partition["high-inclusive"])
+        ):
+            continue
+        open_partitions.append(data_partition)
+
+    skipped = len(data_partitions) - len(open_partitions)
+    if skipped:
+        LOGGER.info(f"Skipping {skipped} closed data partitions")
+    return open_partitions
+
+
+def get_replication_key_bounds(open_conn, catalog_entry, replication_key, config):
+    """Returns the smallest and largest replication key values in the table,
+    in their Singer representation"""
+    escaped_key = common.escape(replication_key)
+    row = open_conn.execute(
+        text(
+            "SELECT MIN({key}), MAX({key}) FROM {schema}.{table}".format(
+                key=escaped_key,
+                schema=common.escape(common.get_database_name(catalog_entry)),
+                table=common.escape(catalog_entry.table),
+            )
+        )
+    ).fetchone()
+    if row is None or row[1] is None:
+        return None, None
+    convert_row = common.build_row_converter(catalog_entry, [replication_key], config)
+    return (
+        convert_row(row[:1])[replication_key],
+        convert_row(row[1:])[replication_key],
+    )
+
+
+def backfill_window_value(catalog_entry, replication_key, value):
+    """Parses a replication key value so that windows can be stepped from
+    it, or returns None when the key is neither a date-time nor a number"""
+    if catalog_entry.schema.properties[replication_key].format == "date-time":
+        try:
+            return pendulum.parse(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, (int, float, decimal.Decimal)) and not isinstance(value, bool):
+        return value
+    return numeric_value(value)
+
+
+def backfill_window_step(low, window_size):
+    """Windows of a date-time key are window_size days long, those of a
+    numeric key span window_size key values"""
+    if isinstance(low, datetime.datetime):
+        return datetime.timedelta(days=window_size)
+    if isinstance(low, int) and float(window_size).is_integer():
+        return int(window_size)
+    return decimal.Decimal(str(window_size))
+
+
+def backfill_boundary(value):
+    """Window boundaries are kept in state like range boundaries are"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return full_table.boundary_value(value)
+
+
+def get_backfill_windows(open_conn, catalog_entry, state, replication_key, config):
+    """Returns the [start, end) windows of the replication key from its
+    smallest value up to the high-water mark, its largest value when the
+    backfill starts, which closes the last window. The windows of an
+    interrupted backfill are reused so that its completed windows stay
+    valid."""
+    windows = singer.get_bookmark(
+        state, catalog_entry.tap_stream_id, "backfill_windows"
+    )
+    if windows is not None:
+        return windows
+
+    low, high = get_replication_key_bounds(
+        open_conn, catalog_entry, replication_key, config
+    )
+    if high is None:
+        LOGGER.info(f"{catalog_entry.table} is empty, nothing to backfill")
+        return []
+
+    low_value = backfill_window_value(catalog_entry, replication_key, low)
+    high_value = backfill_window_value(catalog_entry, replication_key, high)
+    if low_value is None or high_value is None:
+        LOGGER.info(
+            f"Cannot split {replication_key} into windows, "
+            f"syncing {catalog_entry.table} with a single query"
+        )
+        return []
+
+    step = backfill_window_step(low_value, config["incremental_backfill_window"])
+    boundaries = []
+    boundary = low_value + step
+    while boundary < high_value:
+        if len(boundaries) >= MAX_BACKFILL_WINDOWS:
+            raise Exception(
+                f"{catalog_entry.table} would be backfilled in more than "
+                f"{MAX_BACKFILL_WINDOWS} windows, increase incremental_backfill_window"
+            )
+        boundaries.append(backfill_boundary(boundary))
+        boundary += step
+
+    starts = [low] + boundaries
+    windows = [list(window) for window in zip(starts, boundaries + [high])]
+    LOGGER.info(
+        f"Backfilling {catalog_entry.table} in {len(windows)} windows of "
+        f"{replication_key} up to {high}"
+    )
+
+    singer.write_bookmark(
+        state, catalog_entry.tap_stream_id, "backfill_windows", windows
+    )
+    singer.write_bookmark(
+        state, catalog_entry.tap_stream_id, "completed_backfill_windows", []
+    )
+    return windows
+
+
+def generate_backfill_window_sql(catalog_entry, select_sql, replication_key, windows, index):
+    """The last window includes the high-water mark, the others end where
+    the next one starts"""
+    start, end = windows[index]
+    escaped_key = common.escape(replication_key)
+    end_operator = "<=" if index == len(windows) - 1 else "<"
+    params = {"window_start": start, "window_end": end}
+    if catalog_entry.schema.properties[replication_key].format == "date-time":
+        params = {name: pendulum.parse(value) for name, value in params.items()}
+
+    select_sql += (
+        f" WHERE {escaped_key} >= :window_start"
+        f" AND {escaped_key} {end_operator} :window_end"
+        f" ORDER BY {escaped_key} ASC"
+    )
+    return select_sql, params
+
+
+def generate_null_replication_key_sql(select_sql, replication_key):
+    """The rows without a replication key value, which no window selects"""
+    return f"{select_sql} WHERE {common.escape(replication_key)} IS NULL", {}
+
+
+def sync_backfill(
+    mssql_conn, config, catalog_entry, state, columns, stream_version, table_stream, replication_key
+):
+    """
+    Extracts the history of a stream without a bookmark in windows of the
+    replication key, so that DB2 sorts one window at a time rather than the
+    whole table before the first row arrives. The rows whose replication key
+    is NULL, which an unbounded initial query emits last, are extracted as a
+    final slice after the windows.
+
+    Windows are extracted on up to incremental_backfill_workers connections
+    (default 1: one after the other) and each is checkpointed in the
+    completed_backfill_windows bookmark once complete. Returns the
+    high-water mark the incremental sync continues from, or None when the
+    table was not split.
+    """
+    with mssql_conn.connect() as open_conn:
+        windows = get_backfill_windows(
+            open_conn, catalog_entry, state, replication_key, config
+        )
+    if not windows:
+        return None
+
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+    full_table.sync_table_slices(
+        mssql_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        [
+            (
+                index,
+                *generate_backfill_window_sql(
+                    catalog_entry, select_sql, replication_key, windows, index
+                ),
+            )
+            for index in range(len(windows))
+        ]
+        + [
+            (
+                len(windows),
+                *generate_null_replication_key_sql(select_sql, replication_key),
+            )
+        ],
+        "completed_backfill_windows",
+        max_workers=int(config.get("incremental_backfill_workers") or 1),
+    )
+    return windows[-1][1]
+
 
 def sync_table(mssql_conn, config, catalog_entry, state, columns):
     common.whitelist_bookmark_keys(
@@ -40,6 +298,18 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns):
         state = singer.clear_bookmark(
             state, catalog_entry.tap_stream_id, "replication_key_value"
         )
+        state = singer.clear_bookmark(
+            state, catalog_entry.tap_stream_id, "backfill_windows"
+        )
+        state = singer.clear_bookmark(
+            state, catalog_entry.tap_stream_id, "completed_backfill_windows"
+        )
+        state = singer.clear_bookmark(
+            state, catalog_entry.tap_stream_id, "replication_key_pk"
+        )
+        state = singer.clear_bookmark(
+            state, catalog_entry.tap_stream_id, "replication_key_digest"
+        )
 
     stream_version = common.get_stream_version(
         catalog_entry.tap_stream_id, state
@@ -54,48 +324,141 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns):
         stream=table_stream, version=stream_version
     )
 
-    singer.write_message(activate_version_message)
+    write_message(activate_version_message)
     
     # Get the offset value from config
     offset_value = config.get('offset_value') or 0
     LOGGER.info(f"Incremental Load will be offset by {offset_value}")
     
+    if (
+        replication_key_value is None
+        and replication_key_metadata is not None
+        and config.get("incremental_backfill_window")
+    ):
+        high_water_mark = sync_backfill(
+            mssql_conn,
+            config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            replication_key_metadata,
+        )
+        if high_water_mark is not None:
+            # The incremental sync takes over from the high-water mark
+            replication_key_value = high_water_mark
+            singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "replication_key_value",
+                high_water_mark,
+            )
+            singer.clear_bookmark(
+                state, catalog_entry.tap_stream_id, "backfill_windows"
+            )
+            singer.clear_bookmark(
+                state, catalog_entry.tap_stream_id, "completed_backfill_windows"
+            )
+            write_message(singer.StateMessage(value=state))
+
     LOGGER.info("Beginning SQL")
     with mssql_conn.connect() as open_conn:
         select_sql = common.generate_select_sql(catalog_entry, columns)
+        conditions = []
         params = {}
+        low_water_mark = None
+        order_by_sql = ""
+        composite_key_properties = []
+        if config.get("composite_bookmarks") and replication_key_metadata is not None:
+            composite_key_properties = common.get_key_properties(catalog_entry)
+        replication_key_pk = singer.get_bookmark(
+            state, catalog_entry.tap_stream_id, "replication_key_pk"
+        )
 
         if replication_key_value is not None:
+            bookmarked_value = replication_key_value
             replication_key_format = catalog_entry.schema.properties[
               replication_key_metadata
               ].format
             
-            select_sql += f' WHERE "{replication_key_metadata}" >= :replication_key_value '
+            condition = f'"{replication_key_metadata}" >= :replication_key_value '
 
             # Handle the offset value
             # datetime - use pendulum to alter the value to be passed as a bind parameter
             # other (numeric) - add the offset value in the SQL
             if replication_key_format == "date-time":
                 replication_key_value = pendulum.parse(replication_key_value).add(seconds=offset_value)
+                low_water_mark = replication_key_value
             else:
-                select_sql += f' + ({offset_value})' 
-
-            select_sql += f' ORDER BY "{replication_key_metadata}" ASC'
+                condition += f' + ({offset_value})' 
+                low_water_mark = numeric_value(replication_key_value, offset_value)
 
+            conditions.append(condition)
             params["replication_key_value"] = replication_key_value
-            
-        elif replication_key_metadata is not None:
-            select_sql += ' ORDER BY "{}" ASC'.format(replication_key_metadata)
 
-        common.sync_query(
-            open_conn,
-            catalog_entry,
-            state,
-            select_sql,
-            columns,
-            stream_version,
-            table_stream,
-            params,
-            config,
+            # Without an offset the query resumes right after the last row
+            # emitted. With a negative offset it overlaps on purpose and
+            # sync_query drops the rows in the bookmark digest instead.
+            if composite_key_properties and replication_key_pk and not float(offset_value):
+                bookmark_keys = [replication_key_metadata] + composite_key_properties
+                conditions.append(
+                    full_table.keyset_comparison(bookmark_keys, "bookmark_", ">")
+                )
+                params.update(
+                    full_table.keyset_params(
+                        catalog_entry,
+                        bookmark_keys,
+                        {replication_key_metadata: bookmarked_value, **replication_key_pk},
+                        "bookmark_",
+                    )
+                )
+
+        if replication_key_metadata is not None:
+            order_by_sql = " ORDER BY " + ", ".join(
+                f"{common.escape(column)} ASC"
+                for column in [replication_key_metadata] + composite_key_properties
+            )
+
+        queries = [(conditions, params)]
+        data_partitions = get_replication_key_data_partitions(
+            config, catalog_entry, replication_key_metadata
         )
+        if data_partitions:
+            queries = [
+                (conditions + partition_conditions, {**params, **partition_params})
+                for partition_conditions, partition_params in (
+                    full_table.data_partition_conditions(
+                        replication_key_metadata, data_partition
+                    )
+                    for data_partition in open_data_partitions(
+                        data_partitions, low_water_mark
+                    )
+                )
+            ]
+
+        query_profile = common.get_query_profile(config, catalog_entry)
+
+        # Data partitions are read in order, so the replication key bookmark
+        # only ever moves forwards
+        for query_conditions, query_params in queries:
+            query_sql = select_sql
+            if query_conditions:
+                query_sql += " WHERE " + " AND ".join(query_conditions)
+            query_sql = common.apply_query_profile(
+                query_sql + order_by_sql, query_profile
+            )
+
+            with common.session_registers(open_conn, query_profile):
+                common.sync_query(
+                    open_conn,
+                    catalog_entry,
+                    state,
+                    query_sql,
+                    columns,
+                    stream_version,
+                    table_stream,
+                    query_params,
+                    config,
+                )
 
@@ -14,6 +14,7 @@ from tap_db2.connection import (
     revert_ouput_converter,
 )
 import tap_db2.sync_strategies.common as common
+from tap_db2.output import write_message
 from sqlalchemy import text
 
 LOGGER = singer.get_logger()
@@ -231,6 +232,19 @@ class log_based_sync:
         stream_version = common.get_stream_version(
             self.catalog_entry.tap_stream_id, self.state
         )
+        table_stream = self.catalog_entry.stream.replace("-", "_")
+
+        # Deleted rows only carry the key properties, so compile a converter
+        # for each of the two row shapes up front
+        deleted_columns = list(key_properties) + ["_sdc_deleted_at"]
+        upserted_columns = list(self.columns) + ["_sdc_deleted_at"]
+        deleted_row_converter = common.build_row_converter(
+            self.catalog_entry, deleted_columns, self.config
+        )
+        upserted_row_converter = common.build_row_converter(
+            self.catalog_entry, upserted_columns, self.config
+        )
+
         with self.mssql_conn.connect() as open_conn:
 
             if self.catalog_entry.tap_stream_id == "dbo-InputMetadata":
@@ -247,17 +261,13 @@ class log_based_sync:
 
                 while row:
                     counter.increment()
-                    desired_columns = []
-                    ordered_row = []
-
                     rows_saved += 1
 
                     if row["sys_change_operation"] == "D":
-                        for index, column in enumerate(key_properties):
-                            desired_columns.append(column)
-                            ordered_row.append(row[column])
+                        desired_columns = deleted_columns
+                        row_converter = deleted_row_converter
+                        ordered_row = [row[column] for column in key_properties]
 
-                        desired_columns.append("_sdc_deleted_at")
                         if row["commit_time"] is None:
                             self.logger.warn(
                                 "Found deleted record with no timestamp, falling back to current time."
@@ -267,15 +277,11 @@ class log_based_sync:
                             ordered_row.append(row["commit_time"])
 
                     else:
-
-                        for index, column in enumerate(self.columns):
-                            desired_columns.append(column)
-                            ordered_row.append(row[column])
-
-                        desired_columns.append("_sdc_deleted_at")
+                        desired_columns = upserted_columns
+                        row_converter = upserted_row_converter
+                        ordered_row = [row[column] for column in self.columns]
                         ordered_row.append(None)
 
-                    table_stream = self.catalog_entry.stream.replace("-", "_")
                     record_message = common.row_to_singer_record(
                         self.catalog_entry,
                         stream_version,
@@ -283,8 +289,10 @@ class log_based_sync:
                         ordered_row,
                         desired_columns,
                         time_extracted,
+                        self.config,
+                        row_converter,
                     )
-                    singer.write_message(record_message)
+                    write_message(record_message)
 
                     self.state = singer.write_bookmark(
                         self.state,
@@ -296,7 +304,7 @@ class log_based_sync:
                     # do more
                     row = results.fetchone()
 
-            singer.write_message(singer.StateMessage(value=copy.deepcopy(self.state)))
+            write_message(singer.StateMessage(value=copy.deepcopy(self.state)))
 
             if self.catalog_entry.tap_stream_id == "dbo-InputMetadata":
                 revert_ouput_converter(open_conn, prev_converter)
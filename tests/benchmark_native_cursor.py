@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Compares extraction throughput (rows/s) of the SQLAlchemy result path and the
+native_cursor path over the same synthetic result set.
+
+    python tests/benchmark_native_cursor.py config.json [rows]
+
+generates the rows on the DB2 server described by config.json with a
+recursive query. Without a config the comparison runs against an in-memory
+SQLite table. NativeResult then fetches through a stand-in for the ibm_db
+module serving the same SQLite rows, so only the tap side of the hot loop is
+measured: SQLAlchemy Row objects against NativeResult's fetch_tuple loop.
+Neither figure is DB2 throughput.
+"""
+import datetime
+import decimal
+import io
+import json
+import sqlite3
+import sys
+import time
+import types
+from unittest import mock
+
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+from sqlalchemy import create_engine, text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.connection import ChunkIterator, NativeResult, get_db2_sql_engine
+from tap_db2.output import RecordWriter
+
+ARRAYSIZE = 10000
+
+COLUMNS = ["ID", "NAME", "CREATED", "AMOUNT"]
+
+DB2_SQL = """
+    WITH GEN(N) AS (
+        SELECT 1 FROM SYSIBM.SYSDUMMY1
+        UNION ALL
+        SELECT N + 1 FROM GEN WHERE N < {rows}
+    )
+    SELECT
+        N AS ID,
+        'name ' || VARCHAR(N) AS NAME,
+        CURRENT TIMESTAMP AS CREATED,
+        DEC(N, 12, 2) / 100 AS AMOUNT
+    FROM GEN
+"""
+
+
+class DiscardingStdout(io.TextIOBase):
+    def write(self, s):
+        return len(s)
+
+
+def make_catalog_entry():
+    mdata = {}
+    for column, sql_data_type in zip(
+        COLUMNS, ["integer", "varchar", "timestamp", "decimal"]
+    ):
+        mdata = metadata.write(
+            mdata, ("properties", column), "sql-datatype", sql_data_type
+        )
+
+    return CatalogEntry(
+        tap_stream_id="BENCHMARK-ROWS",
+        stream="ROWS",
+        table="ROWS",
+        schema=Schema(
+            type="object",
+            properties={
+                "ID": Schema(type=["null", "integer"]),
+                "NAME": Schema(type=["null", "string"]),
+                "CREATED": Schema(type=["null", "string"], format="date-time"),
+                "AMOUNT": Schema(type=["null", "number"], format="singer.decimal"),
+            },
+        ),
+        metadata=metadata.to_list(mdata),
+    )
+
+
+def consume(results):
+    """The sync_query hot loop: convert each chunk and write the records"""
+    catalog_entry = make_catalog_entry()
+    chunk_converter = common.build_chunk_converter(catalog_entry, COLUMNS, {})
+    rows = 0
+    with mock.patch("sys.stdout", DiscardingStdout()):
+        writer = RecordWriter({}, "ROWS", 1)
+        for chunk in ChunkIterator(results, ARRAYSIZE):
+            for record in chunk_converter(chunk):
+                writer.write_record(record)
+            rows += len(chunk)
+        writer.close()
+    return rows
+
+
+def timed(label, run):
+    started = time.perf_counter()
+    rows = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<12} {rows} rows in {elapsed:.2f}s: {rows / elapsed:,.0f} rows/s")
+
+
+def benchmark_db2(config, rows):
+    engine = get_db2_sql_engine(config)
+    sql = DB2_SQL.format(rows=rows)
+
+    with engine.connect() as open_conn:
+        timed("sqlalchemy", lambda: consume(open_conn.execute(text(sql))))
+    with engine.connect() as open_conn:
+        timed("native", lambda: consume(NativeResult(open_conn, sql, {})))
+
+
+class SqliteIbmDb:
+    """The ibm_db functions NativeResult calls, on a SQLite connection. No
+    column is reported as DECIMAL, so both paths see the same values."""
+
+    def prepare(self, conn_handle, sql):
+        return types.SimpleNamespace(cursor=conn_handle.cursor(), sql=sql)
+
+    def execute(self, stmt, values):
+        stmt.cursor.execute(stmt.sql, values)
+        return True
+
+    def num_fields(self, stmt):
+        return len(stmt.cursor.description)
+
+    def field_type(self, stmt, i):
+        return "string"
+
+    def fetch_tuple(self, stmt):
+        return stmt.cursor.fetchone() or False
+
+    def free_stmt(self, stmt):
+        stmt.cursor.close()
+        return True
+
+
+def benchmark_sqlite(rows):
+    created = datetime.datetime(2020, 1, 1)
+    data = [
+        (i, f"name {i}", created + datetime.timedelta(seconds=i), str(decimal.Decimal(i) / 100))
+        for i in range(rows)
+    ]
+
+    engine = create_engine("sqlite://")
+    with engine.connect() as open_conn:
+        raw = open_conn.connection.dbapi_connection
+        raw.execute("CREATE TABLE ROWS (ID INTEGER, NAME TEXT, CREATED TIMESTAMP, AMOUNT TEXT)")
+        raw.executemany("INSERT INTO ROWS VALUES (?, ?, ?, ?)", data)
+        sql = "SELECT ID, NAME, CREATED, AMOUNT FROM ROWS"
+
+        # NativeResult reaches the ibm_db handle through the SQLAlchemy
+        # connection
+        native_conn = types.SimpleNamespace(
+            connection=types.SimpleNamespace(
+                dbapi_connection=types.SimpleNamespace(conn_handler=raw)
+            )
+        )
+        timed("sqlalchemy", lambda: consume(open_conn.execute(text(sql))))
+        with mock.patch("tap_db2.connection.ibm_db", SqliteIbmDb()):
+            timed("native", lambda: consume(NativeResult(native_conn, sql, {})))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as config_file:
+            config = json.load(config_file)
+        benchmark_db2(config, int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        benchmark_sqlite(1000000)
@@ -0,0 +1,221 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+from singer import metadata
+
+import tap_db2.sync_strategies.common as common
+import tap_db2.sync_strategies.incremental as incremental
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+def make_incremental_catalog_entry(replication_key="CREATED"):
+    catalog_entry = test_utils.make_rows_catalog_entry()
+    mdata = metadata.to_map(catalog_entry.metadata)
+    mdata = metadata.write(mdata, (), "replication-method", "INCREMENTAL")
+    mdata = metadata.write(mdata, (), "replication-key", replication_key)
+    catalog_entry.metadata = metadata.to_list(mdata)
+    return catalog_entry
+
+
+class WindowConnection(test_utils.StreamingConnection):
+    """Returns the rows with IDs in [start, end), which are CREATED one
+    second apart"""
+
+    def __init__(self, start, end):
+        super().__init__(end)
+        self.start = start
+
+    def execute(self, stmt):
+        result = test_utils.StreamingResult(self.row_count)
+        result.rows = (row for row in result.rows if row[0] >= self.start)
+        return result
+
+
+class TestBookmarkDigest(unittest.TestCase):
+    def test_forgets_rows_outside_the_offset(self):
+        digest = common.BookmarkDigest("RK", ["ID"], -10, key_type="number")
+        for i in range(100):
+            self.assertTrue(digest.admit({"RK": i, "ID": i}))
+
+        encoded = digest.encode(99)
+        self.assertEqual(len(common.BookmarkDigest.decode(encoded)), 11)
+
+        resumed = common.BookmarkDigest("RK", ["ID"], -10, "number", previous=encoded)
+        self.assertFalse(resumed.admit({"RK": 89, "ID": 89}))
+        self.assertTrue(resumed.admit({"RK": 89, "ID": 1000}))
+
+    def test_bounded_size(self):
+        digest = common.BookmarkDigest("RK", ["ID"], -10, "number", max_size=5)
+        for i in range(20):
+            digest.admit({"RK": 0, "ID": i})
+        self.assertEqual(len(common.BookmarkDigest.decode(digest.encode(0))), 5)
+
+    def assert_keeps(self, key_type, offset_value, values, expected):
+        digest = common.BookmarkDigest("RK", ["ID"], offset_value, key_type)
+        for i, value in enumerate(values):
+            digest.admit({"RK": value, "ID": i})
+        self.assertEqual(
+            len(common.BookmarkDigest.decode(digest.encode(values[-1]))), expected
+        )
+
+    def test_date_keys(self):
+        # A DATE plus -10 is 10 days earlier in DB2
+        dates = [f"2020-01-{day:02d}" for day in range(1, 32)]
+        self.assert_keeps("date", -10, dates, 11)
+        # -100 is a month, counted as 31 days
+        self.assert_keeps("date", -100, dates, 31)
+
+    def test_time_keys(self):
+        times = [f"12:{minute:02d}:00" for minute in range(60)]
+        # A TIME plus -500 is 5 minutes earlier
+        self.assert_keeps("time", -500, times, 6)
+
+    def test_key_types(self):
+        catalog_entry = make_incremental_catalog_entry()
+        self.assertEqual(
+            [
+                common.bookmark_digest_key_type(catalog_entry, column)
+                for column in test_utils.COLUMNS
+            ],
+            ["number", None, "date-time", "number"],
+        )
+
+
+class TestOverlapSuppression(unittest.TestCase):
+    config = {"composite_bookmarks": True, "offset_value": -10}
+
+    def sync(self, conn, state):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(common, "ARRAYSIZE", 7):
+            common.sync_query(
+                conn,
+                make_incremental_catalog_entry(),
+                state,
+                "SELECT",
+                test_utils.COLUMNS,
+                1,
+                "TABLE",
+                {},
+                self.config,
+            )
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+
+    def test_overlapping_rows_are_emitted_once(self):
+        state = {"bookmarks": {"SCHEMA-TABLE": {"replication_key": "CREATED"}}}
+        self.assertEqual(self.sync(WindowConnection(0, 100), state), list(range(100)))
+
+        bookmark = state["bookmarks"]["SCHEMA-TABLE"]
+        self.assertEqual(bookmark["replication_key_pk"], {"ID": 99})
+        self.assertEqual(bookmark["replication_key_value"], "2020-01-01T00:01:39+00:00")
+
+        # The next query starts 10 seconds before the bookmark
+        self.assertEqual(
+            self.sync(WindowConnection(89, 120), state), list(range(100, 120))
+        )
+
+    def test_digest_is_encoded_only_for_state_messages(self):
+        state = {"bookmarks": {"SCHEMA-TABLE": {"replication_key": "CREATED"}}}
+        stdout = io.StringIO()
+        encode_patch = mock.patch.object(
+            common.BookmarkDigest,
+            "encode",
+            autospec=True,
+            side_effect=common.BookmarkDigest.encode,
+        )
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            common, "ARRAYSIZE", 1
+        ), encode_patch as encode:
+            common.sync_query(
+                WindowConnection(0, 100),
+                make_incremental_catalog_entry(),
+                state,
+                "SELECT",
+                test_utils.COLUMNS,
+                1,
+                "TABLE",
+                {},
+                self.config,
+            )
+
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        states = [m["value"] for m in messages if m["type"] == "STATE"]
+        # One fetched row per chunk, but not one encoding per row
+        self.assertEqual(encode.call_count, len(states))
+        self.assertLess(len(states), 10)
+        self.assertEqual(
+            len(
+                common.BookmarkDigest.decode(
+                    states[-1]["bookmarks"]["SCHEMA-TABLE"]["replication_key_digest"]
+                )
+            ),
+            11,
+        )
+
+    def test_string_keys_are_not_deduplicated(self):
+        entry = make_incremental_catalog_entry("NAME")
+        state = {"bookmarks": {"SCHEMA-TABLE": {"replication_key": "NAME"}}}
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout):
+            common.sync_query(
+                WindowConnection(0, 20),
+                entry,
+                state,
+                "SELECT",
+                test_utils.COLUMNS,
+                1,
+                "TABLE",
+                {},
+                self.config,
+            )
+
+        bookmark = state["bookmarks"]["SCHEMA-TABLE"]
+        self.assertEqual(bookmark["replication_key_value"], "name 19")
+        self.assertNotIn("replication_key_digest", bookmark)
+
+
+class TestCompositeQuery(unittest.TestCase):
+    def test_resumes_after_last_row(self):
+        queries = []
+
+        def sync_query(conn, catalog_entry, state, select_sql, columns, *args):
+            queries.append((select_sql, args[-2]))
+
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "replication_key": "CREATED",
+                    "replication_key_value": "2020-01-01T00:00:00+00:00",
+                    "replication_key_pk": {"ID": 7},
+                }
+            }
+        }
+        with mock.patch("sys.stdout", io.StringIO()), mock.patch.object(
+            incremental.common, "sync_query", side_effect=sync_query
+        ):
+            incremental.sync_table(
+                test_utils.FakeEngine(),
+                {"composite_bookmarks": True},
+                make_incremental_catalog_entry(),
+                state,
+                test_utils.COLUMNS,
+            )
+
+        select_sql, params = queries[0]
+        self.assertTrue(
+            select_sql.endswith(
+                '(("CREATED" > :bookmark_0) OR ("CREATED" = :bookmark_0 AND "ID" > :bookmark_1))'
+                ' ORDER BY "CREATED" ASC, "ID" ASC'
+            )
+        )
+        self.assertEqual(params["bookmark_1"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
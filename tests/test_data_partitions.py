@@ -0,0 +1,206 @@
+import decimal
+import io
+import unittest
+from unittest import mock
+
+import pendulum
+from singer import metadata
+from singer.catalog import Catalog
+from singer.schema import Schema
+
+import tap_db2
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.sync_strategies.incremental as incremental
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+def monthly_partitions():
+    months = ["2020-01-01", "2020-02-01", "2020-03-01", "2020-04-01"]
+    partitions = [
+        {
+            "name": f"P{i}",
+            "low": low,
+            "high": high,
+            "low-inclusive": True,
+            "high-inclusive": False,
+        }
+        for i, (low, high) in enumerate(zip(months, months[1:]))
+    ]
+    partitions.append(
+        {
+            "name": "PMAX",
+            "low": months[-1],
+            "high": None,
+            "low-inclusive": True,
+            "high-inclusive": False,
+        }
+    )
+    return partitions
+
+
+def make_catalog_entry(partitions=None):
+    if partitions is None:
+        partitions = monthly_partitions()
+    table_metadata = {}
+    if partitions:
+        table_metadata = {
+            "data_partition_key": "CREATED",
+            "data_partitions": partitions,
+        }
+    return test_utils.make_catalog_entry(
+        [
+            (
+                "CREATED",
+                "date",
+                Schema(
+                    type=["null", "string"], format="date-time", inclusion="automatic"
+                ),
+            )
+        ],
+        table="AUDIT",
+        database_name="SCHEMA",
+        replication_key="CREATED",
+        **table_metadata,
+    )
+
+
+class TestDataPartitionMetadata(unittest.TestCase):
+    def test_partition_limits(self):
+        self.assertEqual(tap_db2.data_partition_limit("'2020-01-01'"), "2020-01-01")
+        self.assertEqual(tap_db2.data_partition_limit("100"), "100")
+        self.assertIsNone(tap_db2.data_partition_limit("MINVALUE"))
+        self.assertIsNone(tap_db2.data_partition_limit("MAXVALUE"))
+
+    def test_partition_sql(self):
+        self.assertEqual(
+            full_table.generate_data_partition_sql(
+                'SELECT "CREATED" FROM "S"."T"', "CREATED", monthly_partitions()[0]
+            ),
+            (
+                'SELECT "CREATED" FROM "S"."T" WHERE "CREATED" >= :partition_low '
+                'AND "CREATED" < :partition_high',
+                {"partition_low": "2020-01-01", "partition_high": "2020-02-01"},
+            ),
+        )
+
+
+class TestClosedPartitions(unittest.TestCase):
+    def test_skips_partitions_before_the_bookmark(self):
+        open_partitions = incremental.open_data_partitions(
+            monthly_partitions(), pendulum.parse("2020-02-01T00:00:00")
+        )
+        self.assertEqual([p["name"] for p in open_partitions], ["P1", "P2", "PMAX"])
+
+    def test_timestamps_and_numbers(self):
+        self.assertEqual(
+            incremental.data_partition_limit_value(
+                "2020-01-31-23.59.59.000000", pendulum.parse("2020-01-01")
+            ),
+            pendulum.parse("2020-01-31T23:59:59"),
+        )
+        self.assertEqual(
+            incremental.data_partition_limit_value("100", decimal.Decimal(5)),
+            decimal.Decimal(100),
+        )
+
+    def test_incremental_sync_reads_open_partitions_in_order(self):
+        queries = []
+
+        def sync_query(conn, catalog_entry, state, select_sql, columns, *args):
+            queries.append((select_sql, args[-2]))
+
+        state = {
+            "bookmarks": {
+                "SCHEMA-AUDIT": {
+                    "replication_key": "CREATED",
+                    "replication_key_value": "2020-03-15T00:00:00+00:00",
+                }
+            }
+        }
+        with mock.patch("sys.stdout", io.StringIO()), mock.patch.object(
+            incremental.common, "sync_query", side_effect=sync_query
+        ):
+            incremental.sync_table(
+                test_utils.FakeEngine(),
+                {"data_partition_scans": True},
+                make_catalog_entry(),
+                state,
+                ["CREATED"],
+            )
+
+        self.assertEqual(
+            [params.get("partition_low") for _, params in queries],
+            ["2020-03-01", "2020-04-01"],
+        )
+        self.assertTrue(
+            queries[0][0].endswith(
+                'WHERE "CREATED" >= :replication_key_value  AND "CREATED" >= '
+                ':partition_low AND "CREATED" < :partition_high ORDER BY "CREATED" ASC'
+            )
+        )
+
+
+class TestStaleCatalogPartitions(unittest.TestCase):
+    def resolve(self, catalog_entry, discovered_entry):
+        return tap_db2.resolve_catalog(
+            Catalog([discovered_entry]), [catalog_entry]
+        ).streams[0]
+
+    def test_partitions_are_taken_from_the_discovered_catalog(self):
+        # The catalog was generated before April's partition was attached
+        stale = monthly_partitions()[:3]
+        stale[-1]["high"] = None
+        resolved = self.resolve(make_catalog_entry(stale), make_catalog_entry())
+
+        self.assertEqual(
+            metadata.to_map(resolved.metadata)[()]["data-partitions"],
+            monthly_partitions(),
+        )
+        self.assertEqual(
+            metadata.to_map(resolved.metadata)[()]["replication-key"], "CREATED"
+        )
+
+        queries = []
+
+        def sync_query(conn, catalog_entry, state, select_sql, columns, *args):
+            queries.append(args[-2])
+
+        state = {
+            "bookmarks": {
+                "SCHEMA-AUDIT": {
+                    "replication_key": "CREATED",
+                    "replication_key_value": "2020-03-15T00:00:00+00:00",
+                }
+            }
+        }
+        with mock.patch("sys.stdout", io.StringIO()), mock.patch.object(
+            incremental.common, "sync_query", side_effect=sync_query
+        ):
+            incremental.sync_table(
+                test_utils.FakeEngine(),
+                {"data_partition_scans": True},
+                resolved,
+                state,
+                ["CREATED"],
+            )
+
+        self.assertEqual(
+            [params.get("partition_low") for params in queries],
+            ["2020-03-01", "2020-04-01"],
+        )
+
+    def test_partitions_dropped_when_the_table_is_no_longer_partitioned(self):
+        resolved = self.resolve(make_catalog_entry(), make_catalog_entry([]))
+
+        self.assertNotIn("data-partitions", metadata.to_map(resolved.metadata)[()])
+        self.assertNotIn(
+            "data-partition-key", metadata.to_map(resolved.metadata)[()]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.full_table as full_table
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class PartitionConnection:
+    def __init__(self, dbpartitions):
+        self.dbpartitions = dbpartitions
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(str(stmt))
+        return test_utils.FakeResult(
+            (dbpartition,) for dbpartition in self.dbpartitions
+        )
+
+
+class TestDbPartitions(unittest.TestCase):
+    def test_partition_sql(self):
+        self.assertEqual(
+            full_table.generate_dbpartition_sql('SELECT "ID" FROM "S"."T"', "ID", 3),
+            (
+                'SELECT "ID" FROM "S"."T" WHERE DBPARTITIONNUM("ID") = :dbpartition',
+                {"dbpartition": 3},
+            ),
+        )
+
+    def test_partitions_are_bookmarked(self):
+        state = {}
+        conn = PartitionConnection([0, 1, 2, 3])
+        catalog_entry = test_utils.make_key_catalog_entry()
+
+        self.assertEqual(
+            full_table.get_table_dbpartitions(conn, catalog_entry, state), [0, 1, 2, 3]
+        )
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"],
+            {"dbpartitions": [0, 1, 2, 3], "completed_dbpartitions": []},
+        )
+
+        # A resumed sync scans the same partitions without asking again
+        full_table.get_table_dbpartitions(conn, catalog_entry, state)
+        self.assertEqual(len(conn.statements), 1)
+
+    def test_one_worker_per_partition(self):
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "dbpartitions": [0, 1, 2, 3],
+                    "completed_dbpartitions": [2],
+                }
+            }
+        }
+        synced = []
+
+        def sync_query(conn, catalog_entry, state, select_sql, columns, *args):
+            synced.append(args[-2]["dbpartition"])
+
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            full_table.common, "sync_query", side_effect=sync_query
+        ):
+            full_table.sync_dbpartitions(
+                test_utils.FakeEngine(),
+                {},
+                test_utils.make_key_catalog_entry(),
+                state,
+                ["ID"],
+                1,
+                "TABLE",
+                [0, 1, 2, 3],
+            )
+
+        self.assertEqual(sorted(synced), [0, 1, 3])
+        final_state = json.loads(stdout.getvalue().splitlines()[-1])["value"]
+        self.assertEqual(
+            final_state["bookmarks"]["SCHEMA-TABLE"]["completed_dbpartitions"],
+            [0, 1, 2, 3],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
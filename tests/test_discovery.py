@@ -0,0 +1,373 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import tap_db2
+
+from singer import metadata
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class SyscatConnection:
+    """Answers the discovery queries with the given tables, each of which
+    has an integer primary key ID and a VARCHAR NAME. tables maps each
+    (schema, table) pair to its ALTER_TIME, statistics to its CARD, NPAGES,
+    FPAGES and AVGROWSIZE (default: not collected) and stats_times to its
+    STATS_TIME."""
+
+    def __init__(self, tables, statistics=None, stats_times=None):
+        self.tables = tables
+        self.statistics = statistics or {}
+        self.stats_times = stats_times or {}
+        self.queries = []
+
+    def selected_tables(self, params):
+        pairs = [
+            (params[f"pair_schema_{i}"], params[f"pair_table_{i}"])
+            for i in range(len(params))
+            if f"pair_schema_{i}" in params
+        ]
+        if pairs:
+            return [pair for pair in self.tables if pair in pairs]
+        low = high = None
+        if "range_low_schema" in params:
+            low = (params["range_low_schema"], params["range_low_table"])
+        if "range_high_schema" in params:
+            high = (params["range_high_schema"], params["range_high_table"])
+        return [
+            pair
+            for pair in self.tables
+            if (low is None or pair >= low) and (high is None or pair < high)
+        ]
+
+    def execute(self, stmt):
+        sql = str(stmt)
+        params = stmt.compile().params
+        self.queries.append((sql, params))
+        if "SYSCAT.DATAPARTITIONS" in sql:
+            return test_utils.FakeResult()
+        if "SYSCAT.COLUMNS" in sql:
+            return test_utils.FakeResult(
+                (schema, table, column, data_type, 10, 0, is_pk, None, None)
+                for schema, table in sorted(self.selected_tables(params))
+                for column, data_type, is_pk in (
+                    ("ID", "INTEGER", 1),
+                    ("NAME", "VARCHAR", 0),
+                )
+            )
+        return test_utils.FakeResult(
+            (
+                schema,
+                table,
+                "T",
+                "2020-01-01-00.00.00.000000",
+                self.tables[schema, table],
+                self.stats_times.get((schema, table), "2020-01-01-00.00.00.000000"),
+                *self.statistics.get((schema, table), (-1, -1, -1, -1)),
+            )
+            for schema, table in self.selected_tables(params)
+        )
+
+
+class TestDiscoveryFilter(unittest.TestCase):
+    def test_no_filter(self):
+        self.assertEqual(tap_db2.discovery_filter({}), ("", {}))
+
+    def test_predicates(self):
+        predicates, params = tap_db2.discovery_filter(
+            {
+                "filter_schemas": "SALES, HR",
+                "include_tables": ["ORDER%", "CUSTOMER"],
+                "exclude_tables": "%_BAK",
+            },
+            "p.TABSCHEMA",
+            "p.TABNAME",
+        )
+        self.assertEqual(
+            predicates.splitlines(),
+            [
+                "AND p.TABSCHEMA IN (:filter_schema_0, :filter_schema_1)",
+                "AND (p.TABNAME LIKE :include_table_0 OR p.TABNAME LIKE :include_table_1)",
+                "AND p.TABNAME NOT LIKE :exclude_table_0",
+            ],
+        )
+        self.assertEqual(
+            params,
+            {
+                "filter_schema_0": "SALES",
+                "filter_schema_1": "HR",
+                "include_table_0": "ORDER%",
+                "include_table_1": "CUSTOMER",
+                "exclude_table_0": "%_BAK",
+            },
+        )
+
+    def test_every_syscat_query_is_filtered(self):
+        conn = SyscatConnection({("SALES", "ORDERS"): "2020"})
+        catalog = tap_db2.discover_catalog(
+            test_utils.FakeEngine(conn), {"filter_schemas": "SALES"}
+        )
+
+        self.assertEqual([s.tap_stream_id for s in catalog.streams], ["SALES-ORDERS"])
+        self.assertEqual(len(conn.queries), 3)
+        for sql, params in conn.queries:
+            self.assertIn("TABSCHEMA IN (:filter_schema_0)", sql)
+            self.assertEqual(params, {"filter_schema_0": "SALES"})
+
+
+class TestSelectedTables(unittest.TestCase):
+    def test_only_selected_tables_are_queried(self):
+        conn = SyscatConnection({("S", f"T{i}"): "2020" for i in range(10)})
+        with mock.patch.object(tap_db2, "DISCOVERY_BATCH_SIZE", 2):
+            catalog = tap_db2.discover_catalog(
+                test_utils.FakeEngine(conn),
+                {},
+                tables=[("S", "T1"), ("S", "T4"), ("S", "T9")],
+            )
+
+        self.assertEqual(
+            [s.tap_stream_id for s in catalog.streams], ["S-T1", "S-T4", "S-T9"]
+        )
+        # Tables, partitions and columns, each in two batches
+        self.assertEqual(len(conn.queries), 6)
+        for _, params in conn.queries:
+            self.assertIn("pair_schema_0", params)
+
+    def test_no_selected_tables(self):
+        conn = SyscatConnection({("S", "T"): "2020"})
+        catalog = tap_db2.discover_catalog(test_utils.FakeEngine(conn), {}, tables=[])
+        self.assertEqual(catalog.streams, [])
+        self.assertEqual(conn.queries, [])
+
+
+class TestDiscoveryShards(unittest.TestCase):
+    def test_ranges_cover_every_table(self):
+        table_info = {"A": {"T1": {}, "T2": {}, "T3": {}}, "B": {"T1": {}, "T2": {}}}
+        self.assertEqual(
+            tap_db2.discovery_shards(table_info, None, 2),
+            [(None, (None, ("A", "T3"))), (None, (("A", "T3"), None))],
+        )
+        self.assertEqual(tap_db2.discovery_shards({}, None, 4), [(None, (None, None))])
+
+    def test_deals_out_pairs(self):
+        self.assertEqual(
+            tap_db2.discovery_shards({}, [("B", "T"), ("A", "T"), ("C", "T")], 2),
+            [([("A", "T")], None), ([("B", "T"), ("C", "T")], None)],
+        )
+        self.assertEqual(tap_db2.discovery_shards({}, [], 2), [([], None)])
+
+    def test_range_predicates(self):
+        predicates, params = tap_db2.table_range_filter((("A", "T3"), None))
+        self.assertEqual(
+            predicates,
+            "AND (t.TABSCHEMA > :range_low_schema"
+            " OR (t.TABSCHEMA = :range_low_schema AND t.TABNAME >= :range_low_table))",
+        )
+        self.assertEqual(params, {"range_low_schema": "A", "range_low_table": "T3"})
+
+    def test_parallel_discovery_matches_serial(self):
+        tables = {(f"S{i % 3}", f"T{i}"): "2020" for i in range(10)}
+        serial = tap_db2.discover_catalog(
+            test_utils.FakeEngine(SyscatConnection(tables)), {}
+        )
+
+        conn = SyscatConnection(tables)
+        parallel = tap_db2.discover_catalog(
+            test_utils.FakeEngine(conn),
+            {"discovery_workers": 4, "filter_schemas": "S0,S1,S2"},
+        )
+
+        self.assertEqual(json.dumps(parallel.to_dict()), json.dumps(serial.to_dict()))
+        column_queries = [q for q in conn.queries if "SYSCAT.COLUMNS" in q[0]]
+        self.assertEqual(len(column_queries), 4)
+        for sql, params in column_queries:
+            self.assertIn("TABSCHEMA IN (:filter_schema_0", sql)
+
+
+def table_metadata(catalog, tap_stream_id):
+    return metadata.to_map(catalog.get_stream(tap_stream_id).metadata)[()]
+
+
+class TestTableStatistics(unittest.TestCase):
+    def test_statistics_metadata(self):
+        conn = SyscatConnection(
+            {("S", "BIG"): "2020", ("S", "NEW"): "2020"},
+            {("S", "BIG"): (1000, 40, 42, 120)},
+        )
+        catalog = tap_db2.discover_catalog(test_utils.FakeEngine(conn), {})
+
+        big = table_metadata(catalog, "S-BIG")
+        self.assertEqual(
+            (big["row-count"], big["pages"], big["file-pages"], big["average-row-size"]),
+            (1000, 40, 42, 120),
+        )
+        self.assertNotIn("row-count", table_metadata(catalog, "S-NEW"))
+
+    def test_cached_entries_get_current_statistics(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"catalog_cache_path": os.path.join(directory, "catalog.json")}
+            tables = {("S", "T"): "2020", ("S", "U"): "2020"}
+            tap_db2.discover_catalog(
+                test_utils.FakeEngine(
+                    SyscatConnection(tables, {("S", "T"): (1, 1, 1, 1)})
+                ),
+                config,
+            )
+
+            conn = SyscatConnection(tables, {("S", "U"): (5, 2, 2, 30)})
+            catalog = tap_db2.discover_catalog(test_utils.FakeEngine(conn), config)
+
+        self.assertFalse([q for q in conn.queries if "SYSCAT.COLUMNS" in q[0]])
+        self.assertNotIn("row-count", table_metadata(catalog, "S-T"))
+        self.assertEqual(table_metadata(catalog, "S-U")["row-count"], 5)
+
+
+class TestStreamOrdering(unittest.TestCase):
+    statistics = {
+        ("S", "SMALL"): (10, 1, 1, 10),
+        ("S", "BIG"): (10**6, 5000, 5000, 10),
+        ("S", "MEDIUM"): (10**4, 50, 50, 10),
+    }
+
+    def ordered(self, config, state):
+        tables = {(s, t): "2020" for s, t in self.statistics}
+        tables["S", "UNKNOWN"] = "2020"
+        conn = SyscatConnection(tables, self.statistics)
+        catalog = tap_db2.discover_catalog(
+            test_utils.FakeEngine(SyscatConnection(tables)), {}
+        )
+        for entry in catalog.streams:
+            entry.metadata = metadata.to_list(
+                metadata.write(metadata.to_map(entry.metadata), (), "selected", True)
+            )
+        streams = tap_db2.get_non_binlog_streams(
+            test_utils.FakeEngine(conn), catalog, config, state
+        )
+        return [s.tap_stream_id for s in streams.streams]
+
+    def test_largest_first(self):
+        state = {"currently_syncing": "S-SMALL"}
+        self.assertEqual(
+            self.ordered({"stream_ordering": "largest_first"}, state),
+            ["S-SMALL", "S-BIG", "S-MEDIUM", "S-UNKNOWN"],
+        )
+
+    def test_smallest_first(self):
+        self.assertEqual(
+            self.ordered({"stream_ordering": "smallest_first"}, {}),
+            ["S-SMALL", "S-MEDIUM", "S-BIG", "S-UNKNOWN"],
+        )
+
+    def test_unknown_ordering(self):
+        with self.assertRaisesRegex(Exception, "Unknown stream_ordering"):
+            self.ordered({"stream_ordering": "random"}, {})
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = {
+            "catalog_cache_path": os.path.join(self.directory.name, "catalog.json")
+        }
+        self.tables = {("HR", "STAFF"): "2020", ("SALES", "ORDERS"): "2020"}
+        self.stats_times = {}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def discover(self, config=None, changed_only=False):
+        conn = SyscatConnection(self.tables, stats_times=self.stats_times)
+        catalog = tap_db2.discover_catalog(
+            test_utils.FakeEngine(conn), config or self.config, changed_only
+        )
+        column_queries = [q for q in conn.queries if "SYSCAT.COLUMNS" in q[0]]
+        return catalog, column_queries
+
+    def test_only_changed_tables_are_queried(self):
+        first, column_queries = self.discover()
+        self.assertEqual(len(column_queries), 1)
+
+        unchanged, column_queries = self.discover()
+        self.assertEqual(column_queries, [])
+        # Compared as dumped, breadcrumbs are tuples before being cached
+        self.assertEqual(
+            json.dumps(unchanged.to_dict()), json.dumps(first.to_dict())
+        )
+
+        self.tables[("SALES", "ORDERS")] = "2021"
+        self.tables[("SALES", "ITEMS")] = "2021"
+        changed, column_queries = self.discover()
+        self.assertEqual(len(column_queries), 1)
+        self.assertEqual(
+            column_queries[0][1],
+            {
+                "pair_schema_0": "SALES",
+                "pair_table_0": "ORDERS",
+                "pair_schema_1": "SALES",
+                "pair_table_1": "ITEMS",
+            },
+        )
+        self.assertEqual(
+            [s.tap_stream_id for s in changed.streams],
+            ["HR-STAFF", "SALES-ITEMS", "SALES-ORDERS"],
+        )
+
+    def test_runstats_refreshes_column_statistics(self):
+        self.discover()
+        self.stats_times[("HR", "STAFF")] = "2021-01-01-00.00.00.000000"
+        _, column_queries = self.discover()
+        self.assertEqual(len(column_queries), 1)
+        self.assertEqual(
+            column_queries[0][1], {"pair_schema_0": "HR", "pair_table_0": "STAFF"}
+        )
+
+    def test_changed_only(self):
+        self.discover()
+        self.tables[("HR", "STAFF")] = "2021"
+        changed, _ = self.discover(changed_only=True)
+        self.assertEqual([s.tap_stream_id for s in changed.streams], ["HR-STAFF"])
+
+    def test_schema_config_invalidates_cache(self):
+        self.discover()
+        _, column_queries = self.discover({**self.config, "use_singer_decimal": True})
+        self.assertEqual(len(column_queries), 1)
+        self.assertNotIn("pair_schema_0", column_queries[0][1])
+
+    def test_dropped_tables_leave_the_cache(self):
+        self.discover()
+        del self.tables[("HR", "STAFF")]
+        self.discover()
+        with open(self.config["catalog_cache_path"], encoding="utf-8") as cache_file:
+            self.assertEqual(list(json.load(cache_file)["tables"]), ["SALES-ORDERS"])
+
+    def test_selected_tables_keep_the_rest_of_the_cache(self):
+        self.discover()
+        self.tables[("SALES", "ORDERS")] = "2021"
+        conn = SyscatConnection(self.tables)
+        catalog = tap_db2.discover_catalog(
+            test_utils.FakeEngine(conn), self.config, tables=[("SALES", "ORDERS")]
+        )
+        self.assertEqual([s.tap_stream_id for s in catalog.streams], ["SALES-ORDERS"])
+
+        _, column_queries = self.discover()
+        self.assertEqual(column_queries, [])
+
+    def test_batches_table_lookups(self):
+        self.tables = {("S", f"T{i}"): "2020" for i in range(6)}
+        self.discover()
+        for i in range(5):
+            self.tables[("S", f"T{i}")] = "2021"
+        with mock.patch.object(tap_db2, "DISCOVERY_BATCH_SIZE", 2):
+            catalog, column_queries = self.discover()
+        self.assertEqual(len(column_queries), 3)
+        self.assertEqual(len(catalog.streams), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
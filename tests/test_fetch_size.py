@@ -0,0 +1,90 @@
+import unittest
+
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.connection import ChunkIterator, FetchSizeTuner
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+def observe_window(tuner, seconds_per_row):
+    for _ in range(tuner.WINDOW_FETCHES):
+        tuner.observe(tuner.arraysize, tuner.arraysize * seconds_per_row)
+
+
+class TestFetchSizeTuner(unittest.TestCase):
+    def test_grows_while_throughput_improves(self):
+        tuner = FetchSizeTuner(100, 10, 1000)
+        observe_window(tuner, 0.010)
+        self.assertEqual(tuner.arraysize, 200)
+        observe_window(tuner, 0.005)
+        self.assertEqual(tuner.arraysize, 400)
+        observe_window(tuner, 0.001)
+        self.assertEqual(tuner.arraysize, 800)
+        observe_window(tuner, 0.0005)
+        self.assertEqual(tuner.arraysize, 1000)
+
+    def test_reverses_when_throughput_drops(self):
+        tuner = FetchSizeTuner(100, 10, 1000)
+        observe_window(tuner, 0.010)
+        self.assertEqual(tuner.arraysize, 200)
+        observe_window(tuner, 0.020)
+        self.assertEqual(tuner.arraysize, 100)
+
+    def test_settles_when_throughput_is_flat(self):
+        tuner = FetchSizeTuner(100, 10, 1000)
+        observe_window(tuner, 0.010)
+        observe_window(tuner, 0.010)
+        self.assertEqual(tuner.arraysize, 200)
+        observe_window(tuner, 0.010)
+        self.assertEqual(tuner.arraysize, 200)
+
+    def test_chunk_iterator_uses_tuner(self):
+        tuner = FetchSizeTuner(2, 1, 1000)
+        result = test_utils.FakeResult(range(1000))
+        chunks = list(ChunkIterator(result, tuner=tuner))
+
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 1000)
+        self.assertEqual(result.fetch_sizes[0], 2)
+
+
+class TestBuildFetchTuner(unittest.TestCase):
+    def make_catalog_entry(self, average_column_length):
+        mdata = metadata.write({}, ("properties", "NAME"), "sql-datatype", "varchar")
+        if average_column_length is not None:
+            mdata = metadata.write(
+                mdata,
+                ("properties", "NAME"),
+                "average-column-length",
+                average_column_length,
+            )
+        return CatalogEntry(
+            tap_stream_id="SCHEMA-TABLE",
+            table="TABLE",
+            schema=Schema(
+                type="object",
+                properties={"NAME": Schema(type=["null", "string"], maxLength=2000)},
+            ),
+            metadata=metadata.to_list(mdata),
+        )
+
+    def test_wide_rows_fetch_fewer(self):
+        config = {"fetch_memory_budget": 10 * 1024 * 1024}
+        narrow = common.build_fetch_tuner(self.make_catalog_entry(8), ["NAME"], config)
+        wide = common.build_fetch_tuner(self.make_catalog_entry(None), ["NAME"], config)
+
+        self.assertGreater(narrow.maximum, wide.maximum)
+        self.assertLessEqual(
+            wide.maximum * common.estimate_row_width(self.make_catalog_entry(None), ["NAME"]),
+            config["fetch_memory_budget"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
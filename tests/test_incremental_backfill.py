@@ -0,0 +1,189 @@
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+import pendulum
+from singer.schema import Schema
+
+import tap_db2.sync_strategies.incremental as incremental
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+def make_catalog_entry(sql_data_type="timestamp"):
+    if sql_data_type == "timestamp":
+        property_schema = Schema(type=["null", "string"], format="date-time")
+    else:
+        property_schema = Schema(type=["null", "integer"])
+    return test_utils.make_catalog_entry(
+        [("UPDATED", sql_data_type, property_schema)],
+        table="EVENTS",
+        database_name="SCHEMA",
+        replication_method="INCREMENTAL",
+        replication_key="UPDATED",
+    )
+
+
+class BoundsConnection:
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def execute(self, stmt):
+        assert "MIN(" in str(stmt)
+        return test_utils.FakeResult([(self.low, self.high)])
+
+
+class TestBackfillWindows(unittest.TestCase):
+    def test_numeric_windows(self):
+        state = {}
+        windows = incremental.get_backfill_windows(
+            BoundsConnection(1, 250),
+            make_catalog_entry("integer"),
+            state,
+            "UPDATED",
+            {"incremental_backfill_window": 100},
+        )
+        self.assertEqual(windows, [[1, 101], [101, 201], [201, 250]])
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-EVENTS"],
+            {"backfill_windows": windows, "completed_backfill_windows": []},
+        )
+
+    def test_date_time_windows(self):
+        windows = incremental.get_backfill_windows(
+            BoundsConnection(
+                datetime.datetime(2020, 1, 1, 12), datetime.datetime(2020, 1, 3)
+            ),
+            make_catalog_entry(),
+            {},
+            "UPDATED",
+            {"incremental_backfill_window": 1},
+        )
+        self.assertEqual(
+            windows,
+            [
+                ["2020-01-01T12:00:00+00:00", "2020-01-02T12:00:00+00:00"],
+                ["2020-01-02T12:00:00+00:00", "2020-01-03T00:00:00+00:00"],
+            ],
+        )
+
+    def test_too_many_windows(self):
+        with self.assertRaisesRegex(Exception, "increase incremental_backfill_window"):
+            incremental.get_backfill_windows(
+                BoundsConnection(0, 10**9),
+                make_catalog_entry("integer"),
+                {},
+                "UPDATED",
+                {"incremental_backfill_window": 1},
+            )
+
+    def test_last_window_includes_high_water_mark(self):
+        windows = [["2020-01-01T00:00:00+00:00", "2020-01-02T00:00:00+00:00"]] * 2
+        sql, params = incremental.generate_backfill_window_sql(
+            make_catalog_entry(), "SELECT 1", "UPDATED", windows, 1
+        )
+        self.assertEqual(
+            sql,
+            'SELECT 1 WHERE "UPDATED" >= :window_start AND "UPDATED" <= :window_end'
+            ' ORDER BY "UPDATED" ASC',
+        )
+        self.assertEqual(params["window_end"], pendulum.parse(windows[1][1]))
+
+
+class TestSyncBackfill(unittest.TestCase):
+    def sync(self, state, config):
+        queries = []
+
+        def sync_query(conn, catalog_entry, state, select_sql, columns, *args):
+            queries.append((select_sql, args[-2]))
+
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            incremental.common, "sync_query", side_effect=sync_query
+        ):
+            incremental.sync_table(
+                test_utils.FakeEngine(BoundsConnection(1, 250)),
+                config,
+                make_catalog_entry("integer"),
+                state,
+                ["UPDATED"],
+            )
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return queries, messages
+
+    def test_hands_over_at_high_water_mark(self):
+        config = {"incremental_backfill_window": 100, "incremental_backfill_workers": 2}
+        state = {}
+        queries, messages = self.sync(state, config)
+
+        # The windows and the NULL replication keys, extracted on two workers
+        self.assertEqual(
+            sorted(params.get("window_start", 0) for _, params in queries[:4]),
+            [0, 1, 101, 201],
+        )
+        self.assertEqual(
+            [sql for sql, params in queries[:4] if not params],
+            ['SELECT "UPDATED" FROM "SCHEMA"."EVENTS" WHERE "UPDATED" IS NULL'],
+        )
+        self.assertIn('"UPDATED" >= :replication_key_value', queries[4][0])
+        self.assertEqual(queries[4][1], {"replication_key_value": 250})
+
+        bookmark = state["bookmarks"]["SCHEMA-EVENTS"]
+        self.assertEqual(bookmark["replication_key_value"], 250)
+        self.assertNotIn("backfill_windows", bookmark)
+        self.assertEqual(
+            messages[-1]["value"]["bookmarks"]["SCHEMA-EVENTS"]["replication_key_value"],
+            250,
+        )
+
+    def test_resumes_after_completed_windows(self):
+        state = {
+            "bookmarks": {
+                "SCHEMA-EVENTS": {
+                    "replication_key": "UPDATED",
+                    "backfill_windows": [[1, 101], [101, 201], [201, 250]],
+                    "completed_backfill_windows": [0],
+                }
+            }
+        }
+        queries, _ = self.sync(state, {"incremental_backfill_window": 100})
+        self.assertEqual(
+            [params.get("window_start") for _, params in queries],
+            [101, 201, None, None],
+        )
+        self.assertTrue(queries[2][0].endswith(' WHERE "UPDATED" IS NULL'))
+
+    def test_resumes_after_null_replication_keys(self):
+        state = {
+            "bookmarks": {
+                "SCHEMA-EVENTS": {
+                    "replication_key": "UPDATED",
+                    "backfill_windows": [[1, 101], [101, 201], [201, 250]],
+                    "completed_backfill_windows": [0, 1, 2, 3],
+                }
+            }
+        }
+        queries, _ = self.sync(state, {"incremental_backfill_window": 100})
+        self.assertEqual([params for _, params in queries], [{"replication_key_value": 250}])
+
+    def test_bookmarked_streams_are_not_backfilled(self):
+        state = {
+            "bookmarks": {
+                "SCHEMA-EVENTS": {
+                    "replication_key": "UPDATED",
+                    "replication_key_value": 300,
+                }
+            }
+        }
+        queries, _ = self.sync(state, {"incremental_backfill_window": 100})
+        self.assertEqual([params for _, params in queries], [{"replication_key_value": 300}])
+
+
+if __name__ == "__main__":
+    unittest.main()
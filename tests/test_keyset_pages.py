@@ -0,0 +1,251 @@
+import io
+import json
+import re
+import unittest
+from unittest import mock
+
+import singer
+from singer import metadata
+
+import tap_db2
+import tap_db2.sync_strategies.full_table as full_table
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class MaxKeyConnection:
+    def __init__(self, max_key):
+        self.max_key = max_key
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, stmt):
+        self.statements.append(str(stmt))
+        return test_utils.FakeResult(
+            [(self.max_key,)] if self.max_key is not None else []
+        )
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestKeysetSql(unittest.TestCase):
+    def test_composite_key_comparison(self):
+        self.assertEqual(
+            full_table.keyset_comparison(["A", "B"], "last_pk_", ">"),
+            '(("A" > :last_pk_0) OR ("A" = :last_pk_0 AND "B" > :last_pk_1))',
+        )
+        self.assertEqual(
+            full_table.keyset_comparison(["A", "B"], "max_pk_", "<", or_equal=True),
+            '(("A" < :max_pk_0) OR ("A" = :max_pk_0 AND "B" < :max_pk_1)'
+            ' OR ("A" = :max_pk_0 AND "B" = :max_pk_1))',
+        )
+
+    def test_page_sql(self):
+        catalog_entry = test_utils.make_key_catalog_entry()
+        select_sql = 'SELECT "ID" FROM "S"."T"'
+        self.assertEqual(
+            full_table.generate_keyset_page_sql(
+                catalog_entry, select_sql, ["ID"], {"ID": 99}, None, 10
+            ),
+            (
+                select_sql + ' WHERE (("ID" < :max_pk_0) OR ("ID" = :max_pk_0))'
+                ' ORDER BY "ID" FETCH FIRST 10 ROWS ONLY',
+                {"max_pk_0": 99},
+            ),
+        )
+        self.assertEqual(
+            full_table.generate_keyset_page_sql(
+                catalog_entry, select_sql, ["ID"], {"ID": 99}, {"ID": 40}, 10
+            ),
+            (
+                select_sql + ' WHERE (("ID" > :last_pk_0))'
+                ' AND (("ID" < :max_pk_0) OR ("ID" = :max_pk_0))'
+                ' ORDER BY "ID" FETCH FIRST 10 ROWS ONLY',
+                {"max_pk_0": 99, "last_pk_0": 40},
+            ),
+        )
+
+
+class TestSyncKeysetPages(unittest.TestCase):
+    def sync(self, state, conn, row_count):
+        pages = []
+
+        def sync_query(
+            open_conn, catalog_entry, state, select_sql, columns, *args, **kwargs
+        ):
+            params = args[-2]
+            pages.append(params.get("last_pk_0"))
+
+            start = params.get("last_pk_0", -1) + 1
+            keys = [key for key in range(start, row_count) if key <= params["max_pk_0"]]
+            keys = keys[:10]
+            for key in keys:
+                singer.write_bookmark(
+                    state, "SCHEMA-TABLE", "last_pk_fetched", {"ID": key}
+                )
+            return len(keys)
+
+        with mock.patch("sys.stdout", io.StringIO()), mock.patch.object(
+            full_table.common, "sync_query", side_effect=sync_query
+        ):
+            full_table.sync_keyset_pages(
+                test_utils.FakeEngine(conn),
+                {},
+                test_utils.make_key_catalog_entry(),
+                state,
+                ["ID"],
+                1,
+                "TABLE",
+                10,
+            )
+        return pages
+
+    def test_pages_until_short_page(self):
+        conn = MaxKeyConnection(24)
+        state = {}
+        self.assertEqual(self.sync(state, conn, 25), [None, 9, 19])
+        self.assertEqual(conn.commits, 3)
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"],
+            {"max_pk_values": {"ID": 24}, "last_pk_fetched": {"ID": 24}},
+        )
+
+    def test_resumes_after_last_pk_fetched(self):
+        conn = MaxKeyConnection(None)
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "max_pk_values": {"ID": 24},
+                    "last_pk_fetched": {"ID": 9},
+                }
+            }
+        }
+        # Rows added after the first sync started are left to the next sync
+        self.assertEqual(self.sync(state, conn, 50), [9, 19])
+        self.assertEqual(conn.statements, [])
+
+    def test_empty_table(self):
+        state = {}
+        self.assertEqual(self.sync(state, MaxKeyConnection(None), 0), [])
+        self.assertEqual(state, {})
+
+
+
+class KeysetConnection:
+    """Serves the rows with IDs below row_count page by page, losing the
+    connection when asked for page fail_on_page (counted from 1)"""
+
+    def __init__(self, row_count, fail_on_page=None):
+        self.row_count = row_count
+        self.fail_on_page = fail_on_page
+        self.pages = 0
+
+    def execute(self, stmt):
+        sql = str(stmt)
+        if "FETCH FIRST 1 ROW ONLY" in sql:
+            return test_utils.FakeResult([(self.row_count - 1,)])
+
+        self.pages += 1
+        if self.pages == self.fail_on_page:
+            raise Exception("SQL30081N connection lost")
+        params = stmt.compile().params
+        page_size = int(re.search(r"FETCH FIRST (\d+) ROWS", sql).group(1))
+        start = params.get("last_pk_0", -1) + 1
+        end = min(self.row_count, params["max_pk_0"] + 1)
+        return test_utils.FakeResult((key,) for key in range(start, end)[:page_size])
+
+    def commit(self):
+        pass
+
+
+class TestResumeFullTable(unittest.TestCase):
+    def sync(self, conn, state, now):
+        catalog_entry = test_utils.make_key_catalog_entry()
+        catalog_entry.metadata = metadata.to_list(
+            metadata.write(
+                metadata.to_map(catalog_entry.metadata),
+                (),
+                "replication-method",
+                "FULL_TABLE",
+            )
+        )
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            full_table, "get_db2_sql_engine", return_value=test_utils.FakeEngine(conn)
+        ), mock.patch.object(tap_db2.common.time, "time", return_value=now):
+            try:
+                tap_db2.do_sync_full_table(
+                    test_utils.FakeEngine(conn),
+                    {"full_table_page_size": 10},
+                    catalog_entry,
+                    state,
+                    ["ID"],
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                self.assertIn("SQL30081N", str(exc))
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_resumed_sync_activates_the_interrupted_version(self):
+        interrupted = self.sync(KeysetConnection(25, fail_on_page=3), {}, 1000)
+        states = [m["value"] for m in interrupted if m["type"] == "STATE"]
+        bookmark = states[-1]["bookmarks"]["SCHEMA-TABLE"]
+        self.assertEqual(bookmark["version"], 1000000)
+        self.assertEqual(bookmark["last_pk_fetched"], {"ID": 19})
+
+        state = states[-1]
+        resumed = self.sync(KeysetConnection(25), state, 2000)
+
+        self.assertEqual(
+            {m["version"] for m in resumed if m["type"] in ("RECORD", "ACTIVATE_VERSION")},
+            {1000000},
+        )
+        records = [
+            m["record"]["ID"] for m in interrupted + resumed if m["type"] == "RECORD"
+        ]
+        self.assertEqual(records, list(range(25)))
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"], {"initial_full_table_complete": True}
+        )
+
+
+class TestIncrementalFallback(unittest.TestCase):
+    def test_incremental_stream_without_key_pages_through_the_table(self):
+        catalog_entry = test_utils.make_key_catalog_entry()
+        catalog_entry.metadata = metadata.to_list(
+            metadata.write(
+                metadata.to_map(catalog_entry.metadata),
+                (),
+                "replication-method",
+                "INCREMENTAL",
+            )
+        )
+        conn = KeysetConnection(25)
+        state = {}
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            full_table, "get_db2_sql_engine", return_value=test_utils.FakeEngine(conn)
+        ):
+            tap_db2.sync_non_binlog_stream(
+                test_utils.FakeEngine(conn),
+                catalog_entry,
+                {"full_table_page_size": 10},
+                state,
+            )
+
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            [m["record"]["ID"] for m in messages if m["type"] == "RECORD"],
+            list(range(25)),
+        )
+        self.assertEqual(conn.pages, 3)
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"], {"initial_full_table_complete": True}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import decimal
+import io
+import unittest
+from unittest import mock
+
+import tap_db2.connection as connection
+import tap_db2.sync_strategies.common as common
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class FakeStatement:
+    def __init__(self, rows, field_types):
+        self.rows = list(rows)
+        self.field_types = field_types
+        self.params = None
+
+
+class TestNativeResult(unittest.TestCase):
+    def setUp(self):
+        self.stmt = FakeStatement(
+            [(1, "1.50"), (2, None), (3, "-2.25")], ["int", "decimal"]
+        )
+        self.prepared_sql = None
+
+        def prepare(conn_handle, sql):
+            self.prepared_sql = sql
+            return self.stmt
+
+        def execute(stmt, params):
+            stmt.params = params
+            return True
+
+        def fetch_tuple(stmt):
+            return stmt.rows.pop(0) if stmt.rows else False
+
+        self.ibm_db = mock.Mock(
+            prepare=prepare,
+            execute=execute,
+            fetch_tuple=fetch_tuple,
+            num_fields=lambda stmt: len(stmt.field_types),
+            field_type=lambda stmt, i: stmt.field_types[i],
+        )
+        self.ibm_db.free_stmt = mock.Mock()
+        self.sqlalchemy_conn = mock.Mock()
+
+    def test_binds_named_parameters(self):
+        with mock.patch.object(connection, "ibm_db", self.ibm_db):
+            result = connection.NativeResult(
+                self.sqlalchemy_conn,
+                'SELECT "ID" FROM "S"."T" WHERE "ID" >= :replication_key_value',
+                {"replication_key_value": 2},
+            )
+
+        self.assertEqual(
+            self.prepared_sql, 'SELECT "ID" FROM "S"."T" WHERE "ID" >= ?'
+        )
+        self.assertEqual(result.stmt.params, (2,))
+
+    def test_binds_repeated_parameters_in_order(self):
+        with mock.patch.object(connection, "ibm_db", self.ibm_db):
+            result = connection.NativeResult(
+                self.sqlalchemy_conn,
+                'SELECT "A" FROM "S"."T" WHERE ("A" > :pk_1) OR ("A" = :pk_1 AND "B" > :pk_10)',
+                {"pk_10": "b", "pk_1": 1},
+            )
+
+        self.assertEqual(
+            self.prepared_sql,
+            'SELECT "A" FROM "S"."T" WHERE ("A" > ?) OR ("A" = ? AND "B" > ?)',
+        )
+        self.assertEqual(result.stmt.params, (1, 1, "b"))
+
+    def test_fetches_tuples_with_decimals(self):
+        with mock.patch.object(connection, "ibm_db", self.ibm_db):
+            result = connection.NativeResult(self.sqlalchemy_conn, "SELECT 1", {})
+            chunks = list(connection.ChunkIterator(result, 2))
+
+        self.assertEqual(
+            chunks,
+            [
+                [(1, decimal.Decimal("1.50")), (2, None)],
+                [(3, decimal.Decimal("-2.25"))],
+            ],
+        )
+
+    def test_frees_statement_when_exhausted(self):
+        with mock.patch.object(connection, "ibm_db", self.ibm_db):
+            result = connection.NativeResult(self.sqlalchemy_conn, "SELECT 1", {})
+            list(connection.ChunkIterator(result, 2))
+            result.close()
+
+        self.ibm_db.free_stmt.assert_called_once_with(self.stmt)
+
+    def test_frees_statement_when_closed(self):
+        with mock.patch.object(connection, "ibm_db", self.ibm_db):
+            result = connection.NativeResult(self.sqlalchemy_conn, "SELECT 1", {})
+            result.fetchmany(1)
+            result.close()
+            self.assertEqual(result.fetchmany(1), [])
+
+        self.ibm_db.free_stmt.assert_called_once_with(self.stmt)
+
+    def test_frees_statement_when_execute_fails(self):
+        self.ibm_db.execute = mock.Mock(side_effect=Exception("SQL0204N"))
+        with mock.patch.object(connection, "ibm_db", self.ibm_db):
+            with self.assertRaisesRegex(Exception, "SQL0204N"):
+                connection.NativeResult(self.sqlalchemy_conn, "SELECT 1", {})
+
+        self.ibm_db.free_stmt.assert_called_once_with(self.stmt)
+
+
+class FailingNativeResult(connection.NativeResult):
+    instances = []
+
+    def __init__(self, sqlalchemy_conn, select_sql, params):
+        self.stmt = object()
+        self.closed = False
+        self.instances.append(self)
+
+    def fetchmany(self, arraysize):
+        raise Exception("SQL30081N")
+
+    def close(self):
+        self.closed = True
+
+
+class TestSyncQuery(unittest.TestCase):
+    def test_closes_native_result_on_error(self):
+        with mock.patch("sys.stdout", io.StringIO()), mock.patch.object(
+            common, "NativeResult", FailingNativeResult
+        ):
+            with self.assertRaisesRegex(Exception, "SQL30081N"):
+                common.sync_query(
+                    mock.Mock(),
+                    test_utils.make_rows_catalog_entry(),
+                    {},
+                    "SELECT",
+                    test_utils.COLUMNS,
+                    1,
+                    "TABLE",
+                    {},
+                    {"native_cursor": True},
+                )
+
+        self.assertTrue(FailingNativeResult.instances[-1].closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
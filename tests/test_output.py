@@ -0,0 +1,265 @@
+import datetime
+import decimal
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import singer
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+from tap_db2 import output
+
+
+class TestRecordWriter(unittest.TestCase):
+    def write_records(self, config, records):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout):
+            writer = output.RecordWriter(
+                config, "TABLE", 1509133344771, singer.utils.now()
+            )
+            for record in records:
+                writer.write_record(record)
+            writer.write_message(singer.StateMessage(value={"bookmarks": {}}))
+        return stdout.getvalue().splitlines()
+
+    def test_matches_singer_record_messages(self):
+        time_extracted = singer.utils.now()
+        records = [{"ID": 1, "NAME": "cow", "AMOUNT": decimal.Decimal("1.10")}]
+
+        for json_encoder in ("stdlib", "auto"):
+            stdout = io.StringIO()
+            with mock.patch("sys.stdout", stdout):
+                writer = output.RecordWriter(
+                    {"json_encoder": json_encoder}, "TABLE", 1, time_extracted
+                )
+                writer.write_record(records[0])
+                writer.flush()
+
+            expected = singer.format_message(
+                singer.RecordMessage(
+                    stream="TABLE",
+                    record=records[0],
+                    version=1,
+                    time_extracted=time_extracted,
+                )
+            )
+            self.assertEqual(
+                json.loads(stdout.getvalue(), parse_float=decimal.Decimal),
+                json.loads(expected, parse_float=decimal.Decimal),
+            )
+
+    def test_non_finite_floats_are_null(self):
+        record = {"ID": 1, "RATIO": float("nan"), "LIMIT": float("-inf")}
+        for json_encoder in ("stdlib", "auto"):
+            encode = output.get_json_encoder({"json_encoder": json_encoder})
+            self.assertEqual(
+                json.loads(encode(record)), {"ID": 1, "RATIO": None, "LIMIT": None}
+            )
+
+    def test_state_follows_buffered_records(self):
+        lines = self.write_records({}, [{"ID": i} for i in range(3)])
+        self.assertEqual(
+            [json.loads(line)["type"] for line in lines],
+            ["RECORD", "RECORD", "RECORD", "STATE"],
+        )
+
+    def test_flushes_when_buffer_is_full(self):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout):
+            writer = output.RecordWriter({"output_buffer_size": 1}, "TABLE")
+            writer.write_record({"ID": 1})
+            self.assertEqual(len(stdout.getvalue().splitlines()), 1)
+
+    def test_unknown_encoder(self):
+        with self.assertRaises(Exception):
+            output.get_json_encoder({"json_encoder": "yaml"})
+
+
+class TestCheckpointPolicy(unittest.TestCase):
+    def test_stream_policy_overrides_global(self):
+        config = {
+            "checkpoint_policy": {"rows": 10, "seconds": 60},
+            "stream_checkpoint_policies": {"SCHEMA-TABLE": {"rows": 0, "bytes": 100}},
+        }
+        catalog_entry = CatalogEntry(tap_stream_id="SCHEMA-TABLE")
+        policy = output.get_checkpoint_policy(config, catalog_entry)
+        self.assertEqual(
+            (policy.max_rows, policy.max_seconds, policy.max_bytes), (0, 60, 100)
+        )
+        self.assertEqual(output.get_checkpoint_policy({}).max_rows, 1000)
+
+        with self.assertRaises(Exception):
+            output.get_checkpoint_policy({"checkpoint_policy": {"minutes": 1}})
+
+    def test_checkpoints_on_bytes(self):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout):
+            writer = output.RecordWriter(
+                {}, "TABLE", checkpoint_policy=output.CheckpointPolicy(0, None, 100)
+            )
+            checkpoints = []
+            for i in range(1, 21):
+                writer.write_record({"NAME": "x" * 20})
+                if writer.should_checkpoint(i):
+                    checkpoints.append(i)
+        rows_per_checkpoint = -(-100 // (writer.written_bytes // 20))
+        self.assertEqual(
+            checkpoints, list(range(rows_per_checkpoint, 21, rows_per_checkpoint))
+        )
+
+    def test_checkpoints_on_seconds(self):
+        with mock.patch.object(output.time, "monotonic", side_effect=[0, 1, 5, 5, 6]):
+            policy = output.CheckpointPolicy(0, 5)
+            self.assertFalse(policy.due(1, 0))
+            self.assertTrue(policy.due(2, 0))
+            self.assertFalse(policy.due(3, 0))
+
+
+class TestSnapshotState(unittest.TestCase):
+    def test_copies_only_the_syncing_stream(self):
+        state = {
+            "currently_syncing": "A",
+            "bookmarks": {"A": {"position": 1}, "B": {"position": 2}},
+        }
+        snapshot = output.snapshot_state(state, "A")
+        singer.write_bookmark(state, "A", "position", 3)
+        singer.write_bookmark(state, "C", "position", 4)
+
+        self.assertEqual(
+            snapshot["bookmarks"], {"A": {"position": 1}, "B": {"position": 2}}
+        )
+        self.assertIs(snapshot["bookmarks"]["B"], state["bookmarks"]["B"])
+
+
+class TestBatchWriter(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.config = {
+            "batch_config": {
+                "encoding": {"format": "jsonl", "compression": "gzip"},
+                "storage": {"root": "file://" + self.root, "prefix": "test-"},
+                "batch_size_rows": 2,
+            }
+        }
+
+    def test_state_follows_sealed_files(self):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout):
+            writer = output.get_writer(self.config, "TABLE")
+            for rows_saved in range(1, 4):
+                writer.write_record({"ID": rows_saved})
+                if writer.should_checkpoint(rows_saved):
+                    writer.write_message(singer.StateMessage(value={"n": rows_saved}))
+            writer.write_message(singer.StateMessage(value={"n": 3}))
+            writer.close()
+
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            [m["type"] for m in messages], ["BATCH", "STATE", "BATCH", "STATE"]
+        )
+
+        records = []
+        for message in messages:
+            if message["type"] == "BATCH":
+                self.assertEqual(message["encoding"]["compression"], "gzip")
+                path = message["manifest"][0][len("file://"):]
+                with gzip.open(path, "rt") as batch_file:
+                    records.append([json.loads(line) for line in batch_file])
+        self.assertEqual(records, [[{"ID": 1}, {"ID": 2}], [{"ID": 3}]])
+
+    def test_close_discards_unsealed_file(self):
+        with mock.patch("sys.stdout", io.StringIO()) as stdout:
+            writer = output.get_writer(self.config, "TABLE")
+            writer.write_record({"ID": 1})
+            writer.close()
+
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual(os.listdir(self.root), [])
+
+
+@unittest.skipIf(output.pyarrow is None, "pyarrow is not installed")
+class TestParquetBatchWriter(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.config = {
+            "batch_config": {
+                "encoding": {"format": "parquet"},
+                "storage": {"root": "file://" + self.root},
+                "batch_size_rows": 2,
+            }
+        }
+        mdata = {}
+        for column, sql_data_type in (
+            ("ID", "integer"),
+            ("AMOUNT", "decimal"),
+            ("CREATED", "timestamp"),
+            ("ACTIVE", "boolean"),
+        ):
+            mdata = metadata.write(
+                mdata, ("properties", column), "sql-datatype", sql_data_type
+            )
+        mdata = metadata.write(mdata, ("properties", "AMOUNT"), "numeric-precision", 9)
+        mdata = metadata.write(mdata, ("properties", "AMOUNT"), "numeric-scale", 2)
+        self.catalog_entry = CatalogEntry(
+            tap_stream_id="SCHEMA-TABLE",
+            stream="TABLE",
+            table="TABLE",
+            schema=Schema(
+                type="object",
+                properties={
+                    "ID": Schema(
+                        type=["null", "integer"],
+                        minimum=-(2 ** 31),
+                        maximum=2 ** 31 - 1,
+                    ),
+                    "AMOUNT": Schema(type=["null", "number"], multipleOf=0.01),
+                    "CREATED": Schema(type=["null", "string"], format="date-time"),
+                    "ACTIVE": Schema(type=["null", "boolean"]),
+                },
+            ),
+            metadata=metadata.to_list(mdata),
+        )
+        self.columns = ["ID", "AMOUNT", "CREATED", "ACTIVE"]
+
+    def test_writes_chunks_to_parquet(self):
+        rows = [
+            (1, decimal.Decimal("1.50"), datetime.datetime(2023, 1, 1), 1),
+            (2, None, None, 0),
+            (3, decimal.Decimal("-2.25"), datetime.datetime(2023, 1, 3), None),
+        ]
+        with mock.patch("sys.stdout", io.StringIO()) as stdout:
+            writer = output.get_writer(
+                self.config, "TABLE", 1, None, self.catalog_entry, self.columns
+            )
+            self.assertTrue(writer.accepts_rows)
+            writer.write_rows(rows[:2])
+            self.assertTrue(writer.should_checkpoint(2))
+            writer.write_message(singer.StateMessage(value={}))
+            writer.write_rows(rows[2:])
+            writer.write_message(singer.StateMessage(value={}))
+            writer.close()
+
+        messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        paths = [
+            m["manifest"][0][len("file://"):] for m in messages if m["type"] == "BATCH"
+        ]
+        self.assertEqual(len(paths), 2)
+
+        table = output.pyarrow.parquet.read_table(paths[0])
+        self.assertEqual(str(table.schema.field("ID").type), "int32")
+        self.assertEqual(str(table.schema.field("AMOUNT").type), "decimal128(9, 2)")
+        self.assertEqual(table.column("ACTIVE").to_pylist(), [True, False])
+
+        with open(os.path.join(self.root, "TABLE", "manifest.json")) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual([f["rows"] for f in manifest["files"]], [2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import singer
+from singer.catalog import Catalog, CatalogEntry
+from singer.schema import Schema
+
+import tap_db2
+from tap_db2.output import SharedState, write_message
+
+
+def make_catalog(stream_count):
+    return Catalog(
+        [
+            CatalogEntry(
+                tap_stream_id=f"SCHEMA-TABLE{i}",
+                stream=f"TABLE{i}",
+                table=f"TABLE{i}",
+                schema=Schema(type="object", properties={"ID": Schema(type=["integer"])}),
+                metadata=[],
+            )
+            for i in range(stream_count)
+        ]
+    )
+
+
+def fake_sync(db2_conn, catalog_entry, config, state):
+    """Checkpoints a bookmark a few times, like sync_query does"""
+    for position in range(1, 4):
+        singer.write_bookmark(state, catalog_entry.tap_stream_id, "position", position)
+        write_message(singer.StateMessage(value=state))
+
+
+class TestParallelStreams(unittest.TestCase):
+    def sync(self, state, stream_count=6):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            tap_db2, "sync_non_binlog_stream", side_effect=fake_sync
+        ):
+            tap_db2.sync_non_binlog_streams(
+                None, make_catalog(stream_count), {"max_parallel_streams": 3}, state
+            )
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_state_merges_every_stream(self):
+        state = {"bookmarks": {"SCHEMA-OTHER": {"position": 9}}}
+        messages = self.sync(state)
+
+        final_state = messages[-1]["value"]
+        self.assertIsNone(final_state["currently_syncing"])
+        self.assertEqual(final_state["bookmarks"]["SCHEMA-OTHER"], {"position": 9})
+        for i in range(6):
+            self.assertEqual(
+                final_state["bookmarks"][f"SCHEMA-TABLE{i}"], {"position": 3}
+            )
+
+    def test_bookmarks_never_go_backwards(self):
+        positions = {}
+        for message in self.sync({}):
+            value = message["value"]
+            self.assertTrue(
+                value["currently_syncing"] is None
+                or isinstance(value["currently_syncing"], list)
+            )
+            for tap_stream_id, bookmark in value["bookmarks"].items():
+                self.assertGreaterEqual(
+                    bookmark["position"], positions.get(tap_stream_id, 0)
+                )
+                positions[tap_stream_id] = bookmark["position"]
+
+    def test_failure_is_raised(self):
+        def failing_sync(db2_conn, catalog_entry, config, state):
+            if catalog_entry.tap_stream_id == "SCHEMA-TABLE1":
+                raise Exception("table is locked")
+            fake_sync(db2_conn, catalog_entry, config, state)
+
+        with mock.patch("sys.stdout", io.StringIO()), mock.patch.object(
+            tap_db2, "sync_non_binlog_stream", side_effect=failing_sync
+        ):
+            with self.assertRaisesRegex(Exception, "table is locked"):
+                tap_db2.sync_non_binlog_streams(
+                    None, make_catalog(3), {"max_parallel_streams": 2}, {}
+                )
+
+
+class TestSharedState(unittest.TestCase):
+    def test_currently_syncing_lists_running_streams(self):
+        shared_state = SharedState({})
+        stream_state = shared_state.stream_state("SCHEMA-A")
+        shared_state.start("SCHEMA-A")
+        try:
+            singer.write_bookmark(stream_state, "SCHEMA-A", "position", 1)
+            merged = shared_state.merge("SCHEMA-A", stream_state)
+            self.assertEqual(merged["currently_syncing"], ["SCHEMA-A"])
+            self.assertEqual(merged["bookmarks"], {"SCHEMA-A": {"position": 1}})
+
+            # The merged copy is not shared with the stream's private state
+            singer.write_bookmark(stream_state, "SCHEMA-A", "position", 2)
+            self.assertEqual(merged["bookmarks"]["SCHEMA-A"]["position"], 1)
+        finally:
+            with mock.patch("sys.stdout", io.StringIO()):
+                shared_state.finish("SCHEMA-A")
+
+        self.assertIsNone(shared_state.state["currently_syncing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
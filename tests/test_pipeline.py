@@ -0,0 +1,130 @@
+import datetime
+import io
+import threading
+import unittest
+from unittest import mock
+
+from singer import metadata
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.pipeline import pipeline
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class TestPipeline(unittest.TestCase):
+    def test_preserves_order(self):
+        self.assertEqual(
+            list(pipeline(range(100), lambda item: item * 2, queue_size=2)),
+            [item * 2 for item in range(100)],
+        )
+
+    def test_raises_fetch_errors(self):
+        def source():
+            yield 1
+            raise ValueError("connection lost")
+
+        with self.assertRaisesRegex(ValueError, "connection lost"):
+            list(pipeline(source(), lambda item: item))
+
+    def test_raises_encode_errors(self):
+        def transform(item):
+            if item == 3:
+                raise ValueError("cannot encode")
+            return item
+
+        with self.assertRaisesRegex(ValueError, "cannot encode"):
+            list(pipeline(range(10), transform))
+
+    def test_backpressure_bounds_fetching(self):
+        fetched = []
+        fetching = threading.Event()
+
+        def source():
+            for item in range(1000):
+                fetched.append(item)
+                fetching.set()
+                yield item
+
+        items = pipeline(source(), lambda item: item, queue_size=2)
+        self.assertEqual(next(items), 0)
+        fetching.wait()
+        # Two full queues, one item held by each stage and the one consumed
+        self.assertLessEqual(len(fetched), 2 * 2 + 3)
+        items.close()
+
+
+class TestPipelinedSync(unittest.TestCase):
+    time_extracted = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def sync(self, config, replication_key=None):
+        stdout = io.StringIO()
+        state = {}
+        if replication_key:
+            state = {"bookmarks": {"SCHEMA-TABLE": {"replication_key": replication_key}}}
+        catalog_entry = test_utils.make_rows_catalog_entry()
+        if replication_key:
+            mdata = metadata.write(
+                metadata.to_map(catalog_entry.metadata),
+                (),
+                "replication-method",
+                "INCREMENTAL",
+            )
+            catalog_entry.metadata = metadata.to_list(mdata)
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            common, "ARRAYSIZE", 700
+        ), mock.patch.object(common.utils, "now", return_value=self.time_extracted):
+            common.sync_query(
+                test_utils.StreamingConnection(2500),
+                catalog_entry,
+                state,
+                common.generate_select_sql(catalog_entry, test_utils.COLUMNS),
+                test_utils.COLUMNS,
+                1,
+                "TABLE",
+                {},
+                config,
+            )
+        return stdout.getvalue(), state
+
+    def test_matches_sequential_output(self):
+        sequential, sequential_state = self.sync({})
+        pipelined, pipelined_state = self.sync(
+            {"pipelined_sync": True, "pipeline_queue_size": 1}
+        )
+
+        self.assertEqual(pipelined, sequential)
+        self.assertEqual(pipelined_state, sequential_state)
+        self.assertEqual(pipelined.count('"type": "STATE"'), 3)
+
+    def test_encoder_processes_match_sequential_output(self):
+        sequential, sequential_state = self.sync({}, replication_key="ID")
+        encoded, encoded_state = self.sync(
+            {"encoder_processes": 2, "pipeline_queue_size": 1}, replication_key="ID"
+        )
+
+        self.assertEqual(encoded, sequential)
+        self.assertEqual(encoded_state, sequential_state)
+        self.assertEqual(
+            encoded_state["bookmarks"]["SCHEMA-TABLE"]["replication_key_value"], 2499
+        )
+
+    def test_encoder_pool_is_shared_by_the_run(self):
+        sequential, _ = self.sync({}, replication_key="ID")
+        config = {"encoder_processes": 2, "pipeline_queue_size": 1}
+        with mock.patch.object(
+            common, "new_encoder_executor", wraps=common.new_encoder_executor
+        ) as new_encoder_executor:
+            with common.encoder_pool(config):
+                outputs = [self.sync(config, replication_key="ID")[0] for _ in range(2)]
+            self.assertIsNone(common._encoder_executor)
+
+        new_encoder_executor.assert_called_once_with(2)
+        self.assertEqual(outputs, [sequential, sequential])
+
+
+if __name__ == "__main__":
+    unittest.main()
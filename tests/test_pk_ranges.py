@@ -0,0 +1,133 @@
+import decimal
+import io
+import json
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.full_table as full_table
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class StatisticsConnection:
+    """Answers the SYSCAT statistics queries with canned rows"""
+
+    def __init__(self, quantiles=(), keys=None, sample=()):
+        self.quantiles = quantiles
+        self.keys = keys
+        self.sample = sample
+
+    def execute(self, stmt):
+        sql = str(stmt)
+        if "SYSCAT.COLDIST" in sql:
+            return test_utils.FakeResult((value,) for value in self.quantiles)
+        if "HIGH2KEY" in sql:
+            return test_utils.FakeResult([self.keys] if self.keys else [])
+        return test_utils.FakeResult((value,) for value in self.sample)
+
+
+class TestBoundaries(unittest.TestCase):
+    def test_parses_statistics_values(self):
+        self.assertEqual(full_table.parse_coldist_value(" 42 ", "bigint"), 42)
+        self.assertEqual(
+            full_table.parse_coldist_value("1.50", "decimal"), decimal.Decimal("1.50")
+        )
+        self.assertEqual(full_table.parse_coldist_value("'O''Hara'", "varchar"), "O'Hara")
+
+    def test_prefers_quantiles(self):
+        conn = StatisticsConnection(quantiles=[str(i * 10) for i in range(20)])
+        self.assertEqual(
+            full_table.get_pk_range_boundaries(
+                conn, test_utils.make_key_catalog_entry(), 4
+            ),
+            [50, 100, 150],
+        )
+
+    def test_falls_back_to_key_statistics(self):
+        conn = StatisticsConnection(keys=("0", "1000"))
+        self.assertEqual(
+            full_table.get_pk_range_boundaries(
+                conn, test_utils.make_key_catalog_entry(), 4
+            ),
+            [250, 500, 750],
+        )
+
+    def test_falls_back_to_sample(self):
+        conn = StatisticsConnection(sample=["B", "M", "T", "Z"])
+        self.assertEqual(
+            full_table.get_pk_range_boundaries(
+                conn, test_utils.make_key_catalog_entry("varchar"), 4
+            ),
+            ["B", "M", "T"],
+        )
+
+    def test_range_sql(self):
+        self.assertEqual(
+            full_table.generate_range_sql('SELECT "ID" FROM "S"."T"', "ID", [None, 5]),
+            ('SELECT "ID" FROM "S"."T" WHERE "ID" < :range_end', {"range_end": 5}),
+        )
+        self.assertEqual(
+            full_table.generate_range_sql('SELECT "ID" FROM "S"."T"', "ID", [5, 9]),
+            (
+                'SELECT "ID" FROM "S"."T" WHERE "ID" >= :range_start AND "ID" < :range_end',
+                {"range_start": 5, "range_end": 9},
+            ),
+        )
+
+
+class TestSyncPkRanges(unittest.TestCase):
+    pk_ranges = [[None, 10], [10, 20], [20, None]]
+
+    def sync(self, state, fail_range=None):
+        synced = []
+
+        def sync_query(conn, catalog_entry, state, select_sql, columns, *args):
+            params = args[-2]
+            if params.get("range_start") == fail_range:
+                raise Exception("connection lost")
+            synced.append(params)
+
+        stdout = io.StringIO()
+        with mock.patch("sys.stdout", stdout), mock.patch.object(
+            full_table.common, "sync_query", side_effect=sync_query
+        ):
+            try:
+                full_table.sync_pk_ranges(
+                    test_utils.FakeEngine(),
+                    {},
+                    test_utils.make_key_catalog_entry(),
+                    state,
+                    ["ID"],
+                    1,
+                    "TABLE",
+                    self.pk_ranges,
+                )
+            finally:
+                messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return synced, messages
+
+    def test_resumes_after_completed_ranges(self):
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {"pk_ranges": self.pk_ranges, "completed_pk_ranges": []}
+            }
+        }
+        with self.assertRaisesRegex(Exception, "connection lost"):
+            self.sync(state, fail_range=20)
+
+        completed = state["bookmarks"]["SCHEMA-TABLE"]["completed_pk_ranges"]
+        self.assertEqual(completed, [0, 1])
+
+        synced, messages = self.sync(state)
+        self.assertEqual(synced, [{"range_start": 20}])
+        self.assertEqual(
+            messages[-1]["value"]["bookmarks"]["SCHEMA-TABLE"]["completed_pk_ranges"],
+            [0, 1, 2],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
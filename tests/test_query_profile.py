@@ -0,0 +1,81 @@
+import unittest
+
+from singer.catalog import CatalogEntry
+
+import tap_db2.sync_strategies.common as common
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class RecordingConnection:
+    def __init__(self, current_values):
+        self.current_values = current_values
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(str(stmt))
+        return test_utils.FakeResult(
+            [self.current_values] if self.current_values else []
+        )
+
+
+class TestQueryProfile(unittest.TestCase):
+    def setUp(self):
+        self.catalog_entry = CatalogEntry(tap_stream_id="SCHEMA-TABLE", table="TABLE")
+
+    def test_stream_profile_overrides_global(self):
+        config = {
+            "query_profile": {"read_only": True, "isolation": "CS"},
+            "stream_query_profiles": {"SCHEMA-TABLE": {"isolation": "UR"}},
+        }
+        self.assertEqual(
+            common.get_query_profile(config, self.catalog_entry),
+            {"read_only": True, "isolation": "UR"},
+        )
+
+    def test_clauses_follow_order_by(self):
+        select_sql = 'SELECT "ID" FROM "S"."T" WHERE "ID" >= :replication_key_value ORDER BY "ID" ASC'
+        self.assertEqual(
+            common.apply_query_profile(
+                select_sql,
+                {"read_only": True, "optimize_for_rows": 1000, "isolation": "ur"},
+            ),
+            select_sql + " FOR READ ONLY OPTIMIZE FOR 1000 ROWS WITH UR",
+        )
+        self.assertEqual(common.apply_query_profile(select_sql, {}), select_sql)
+
+    def test_rejects_unknown_isolation(self):
+        with self.assertRaises(Exception):
+            common.apply_query_profile("SELECT 1", {"isolation": "DIRTY"})
+
+    def test_session_registers_are_restored(self):
+        conn = RecordingConnection(("1    ", None))
+        profile = {"current_degree": "any", "lock_timeout": 30, "read_only": True}
+
+        with common.session_registers(conn, profile):
+            self.assertEqual(
+                conn.statements[1:],
+                ["SET CURRENT DEGREE = 'ANY'", "SET CURRENT LOCK TIMEOUT = 30"],
+            )
+
+        self.assertEqual(
+            conn.statements[0],
+            "SELECT CURRENT DEGREE, CURRENT LOCK TIMEOUT FROM SYSIBM.SYSDUMMY1",
+        )
+        self.assertEqual(
+            conn.statements[3:],
+            ["SET CURRENT DEGREE = '1'", "SET CURRENT LOCK TIMEOUT = NULL"],
+        )
+
+    def test_no_registers_no_statements(self):
+        conn = RecordingConnection(None)
+        with common.session_registers(conn, {"read_only": True}):
+            pass
+        self.assertEqual(conn.statements, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
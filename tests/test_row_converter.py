@@ -0,0 +1,219 @@
+import datetime
+import decimal
+import unittest
+import uuid
+from unittest import mock
+
+import singer
+from singer import metadata
+from singer.schema import Schema
+
+import tap_db2.sync_strategies.common as common
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+COLUMNS = [
+    ("ID", "integer", Schema(type=["null", "integer"])),
+    ("NAME", "varchar", Schema(type=["null", "string"])),
+    ("CREATED", "timestamp", Schema(type=["null", "string"], format="date-time")),
+    ("BORN", "date", Schema(type=["null", "string"], format="date-time")),
+    ("ACTIVE", "boolean", Schema(type=["null", "boolean"])),
+    ("AMOUNT", "decimal", Schema(type=["null", "number"], format="singer.decimal")),
+    ("RAW", "varbinary", Schema(type=["null", "string"])),
+    ("TOKEN", "character", Schema(type=["null", "string"])),
+]
+
+ROWS = [
+    (
+        1,
+        "aardvark",
+        datetime.datetime(2023, 1, 2, 3, 4, 5, 600000),
+        datetime.date(2020, 2, 29),
+        1,
+        decimal.Decimal("12.50"),
+        b"\x01\xab",
+        uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    ),
+    (2, None, None, None, 0, None, None, None),
+    (3, "cow", "2023-01-02", datetime.datetime(2020, 1, 1), None, 7, b"\x00", "Y"),
+]
+
+
+def reference_record(catalog_entry, row, columns, config):
+    """The per-cell dispatch the compiled converter must reproduce"""
+    md_map = metadata.to_map(catalog_entry.metadata)
+    use_date_data_type_format = config.get("use_date_datatype") or False
+    return {
+        column: common.convert_value(
+            elem,
+            md_map[("properties", column)]["sql-datatype"],
+            catalog_entry.schema.properties[column].format,
+            use_date_data_type_format,
+        )
+        for column, elem in zip(columns, row)
+    }
+
+
+class TestRowConverter(unittest.TestCase):
+    def setUp(self):
+        self.catalog_entry = test_utils.make_catalog_entry(COLUMNS)
+        self.columns = [name for name, _, _ in COLUMNS]
+
+    def test_matches_value_dispatch(self):
+        for config in ({}, {"use_date_datatype": True}):
+            row_converter = common.build_row_converter(
+                self.catalog_entry, self.columns, config
+            )
+            for row in ROWS:
+                self.assertEqual(
+                    row_converter(row),
+                    reference_record(self.catalog_entry, row, self.columns, config),
+                )
+
+    def test_converts_values(self):
+        row_converter = common.build_row_converter(
+            self.catalog_entry, self.columns, {}
+        )
+        self.assertEqual(
+            row_converter(ROWS[0]),
+            {
+                "ID": 1,
+                "NAME": "aardvark",
+                "CREATED": "2023-01-02T03:04:05.600000+00:00",
+                "BORN": "2020-02-29T00:00:00+00:00",
+                "ACTIVE": True,
+                "AMOUNT": "12.50",
+                "RAW": "0x01AB",
+                "TOKEN": "12345678-1234-5678-1234-567812345678",
+            },
+        )
+
+    def test_row_to_singer_record(self):
+        time_extracted = singer.utils.now()
+        row_converter = common.build_row_converter(
+            self.catalog_entry, self.columns, {}
+        )
+        record_message = common.row_to_singer_record(
+            self.catalog_entry,
+            1,
+            "TABLE",
+            ROWS[1],
+            self.columns,
+            time_extracted,
+            {},
+            row_converter,
+        )
+        self.assertEqual(record_message.stream, "TABLE")
+        self.assertEqual(record_message.record["ACTIVE"], False)
+        self.assertIsNone(record_message.record["AMOUNT"])
+
+
+class TestChunkConverter(unittest.TestCase):
+    def setUp(self):
+        self.catalog_entry = test_utils.make_catalog_entry(COLUMNS)
+        self.columns = [name for name, _, _ in COLUMNS]
+
+    def assert_matches_row_converter(self, rows, config):
+        row_converter = common.build_row_converter(
+            self.catalog_entry, self.columns, config
+        )
+        chunk_converter = common.build_chunk_converter(
+            self.catalog_entry, self.columns, config
+        )
+        self.assertEqual(
+            chunk_converter(rows), [row_converter(row) for row in rows]
+        )
+
+    def test_matches_row_converter(self):
+        for config in ({}, {"use_date_datatype": True}):
+            self.assert_matches_row_converter(ROWS, config)
+            # Chunks holding a single value type take the fast paths
+            self.assert_matches_row_converter(ROWS[:1], config)
+            self.assert_matches_row_converter(ROWS[1:2], config)
+
+    def test_nullable_decimals_take_the_fast_path(self):
+        values = [decimal.Decimal("1.50"), None, 7]
+        with mock.patch.object(
+            common, "column_converter", return_value=mock.Mock(side_effect=AssertionError)
+        ):
+            as_singer_decimal = common.column_batch_converter(
+                "decimal", "singer.decimal", False
+            )
+            as_number = common.column_batch_converter("decimal", None, False)
+        self.assertEqual(as_singer_decimal(values), ["1.50", None, "7"])
+        self.assertEqual(as_number(values), values)
+
+    def test_without_numpy(self):
+        with mock.patch.object(common, "numpy", None):
+            self.assert_matches_row_converter(ROWS, {})
+            self.assert_matches_row_converter(ROWS[:2], {})
+
+
+class TestConversionCache(unittest.TestCase):
+    def setUp(self):
+        self.catalog_entry = test_utils.make_catalog_entry(
+            [("BORN", "date", Schema(type=["null", "string"], format="date-time"))]
+        )
+        mdata = metadata.to_map(self.catalog_entry.metadata)
+        mdata = metadata.write(mdata, ("properties", "BORN"), "column-cardinality", 3)
+        self.catalog_entry.metadata = metadata.to_list(mdata)
+
+    def test_auto_uses_column_cardinality(self):
+        caches = common.build_conversion_caches(self.catalog_entry, ["BORN"], {})
+        self.assertEqual(list(caches), ["BORN"])
+
+        caches = common.build_conversion_caches(
+            self.catalog_entry, ["BORN"], {"conversion_cache_size": 2}
+        )
+        self.assertEqual(caches, {})
+
+        caches = common.build_conversion_caches(
+            self.catalog_entry, ["BORN"], {"conversion_cache": "off"}
+        )
+        self.assertEqual(caches, {})
+
+    def test_cached_conversion(self):
+        caches = common.build_conversion_caches(self.catalog_entry, ["BORN"], {})
+        chunk_converter = common.build_chunk_converter(
+            self.catalog_entry, ["BORN"], {}, caches
+        )
+        days = [datetime.date(2020, 1, 1 + i % 3) for i in range(30)] + [None]
+        records = chunk_converter([(day,) for day in days])
+
+        self.assertEqual(records[0], {"BORN": "2020-01-01T00:00:00+00:00"})
+        self.assertEqual(records[-1], {"BORN": None})
+        self.assertAlmostEqual(caches["BORN"].hit_rate(), 27 / 31)
+
+    def test_disabled_when_hit_rate_is_poor(self):
+        caches = common.build_conversion_caches(
+            self.catalog_entry, ["BORN"], {"conversion_cache": "all"}
+        )
+        chunk_converter = common.build_chunk_converter(
+            self.catalog_entry, ["BORN"], {}, caches
+        )
+        days = [(datetime.date(2020, 1, 1) + datetime.timedelta(days=i),) for i in range(20)]
+
+        with mock.patch.object(common, "CONVERSION_CACHE_SAMPLE_SIZE", 10):
+            chunk_converter(days)
+            self.assertFalse(caches["BORN"].enabled)
+            self.assertEqual(
+                chunk_converter(days[:1]), [{"BORN": "2020-01-01T00:00:00+00:00"}]
+            )
+
+    def test_time_values(self):
+        self.assertEqual(
+            common.convert_value(datetime.time(13, 5), "time", "date-time", False),
+            "1970-01-01T13:05:00+00:00",
+        )
+        self.assertEqual(
+            common.convert_value(datetime.time(13, 5), "time", "time", True),
+            "13:05:00",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
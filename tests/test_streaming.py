@@ -0,0 +1,77 @@
+import importlib.util
+import tracemalloc
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.common as common
+
+try:
+    import tests.utils as test_utils
+except ImportError:
+    import utils as test_utils
+
+
+class TestStreamingMemory(unittest.TestCase):
+    config = {"stream_buffer_rows": 500, "output_buffer_size": 64 * 1024}
+
+    def sync(self, row_count, config=None, arraysize=10000):
+        catalog_entry = test_utils.make_rows_catalog_entry()
+        connection = test_utils.StreamingConnection(row_count)
+
+        tracemalloc.start()
+        try:
+            with mock.patch(
+                "sys.stdout", test_utils.DiscardingStdout()
+            ), mock.patch.object(common, "ARRAYSIZE", arraysize):
+                common.sync_query(
+                    connection,
+                    catalog_entry,
+                    {},
+                    common.generate_select_sql(catalog_entry, test_utils.COLUMNS),
+                    test_utils.COLUMNS,
+                    1,
+                    "TABLE",
+                    {},
+                    config or self.config,
+                )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return connection, peak
+
+    def test_fetch_size_is_capped(self):
+        connection, _ = self.sync(2000)
+        self.assertEqual(set(connection.result.fetch_sizes), {500})
+
+    def test_auto_fetch_size_is_capped(self):
+        connection, _ = self.sync(20000, arraysize="auto")
+        self.assertLessEqual(max(connection.result.fetch_sizes), 500)
+
+    def test_peak_memory_independent_of_table_size(self):
+        _, small_peak = self.sync(5000)
+        _, large_peak = self.sync(50000)
+
+        self.assertLess(large_peak, small_peak * 1.5)
+
+    def test_peak_memory_bounded_by_stream_buffer_rows(self):
+        _, unbounded_peak = self.sync(
+            50000, {"output_buffer_size": 64 * 1024}, arraysize=50000
+        )
+        _, bounded_peak = self.sync(50000, arraysize=50000)
+
+        self.assertLess(bounded_peak * 5, unbounded_peak)
+
+
+@unittest.skipUnless(importlib.util.find_spec("ibm_db_sa"), "requires ibm_db_sa")
+class TestDialect(unittest.TestCase):
+    def test_no_server_side_cursors(self):
+        # SQLAlchemy ignores stream_results on dialects without server-side
+        # cursors, stream_buffer_rows relies on the fetch size instead
+        from ibm_db_sa.ibm_db import DB2Dialect_ibm_db
+
+        self.assertFalse(DB2Dialect_ibm_db.supports_server_side_cursors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,20 @@
+import contextlib
+import datetime
+import decimal
+import io
 import os
 import singer
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
 import tap_db2
 import tap_db2.sync_strategies.common as common
 from tap_db2.connection import get_db2_sql_engine
 
+# The columns of the rows StreamingResult generates
+COLUMNS = ["ID", "NAME", "CREATED", "AMOUNT"]
+
+
 def display_config():
     print(args)
 
@@ -55,3 +66,119 @@ def set_replication_method_and_key(stream, r_method, r_key):
 
     stream.metadata = singer.metadata.to_list(new_md)
     return stream
+
+
+def make_catalog_entry(columns, table="TABLE", **table_metadata):
+    """A catalog entry for SCHEMA.table. columns is a list of (name,
+    sql-datatype, Schema) and table_metadata the stream's metadata, with
+    underscores for the dashes of its keys."""
+    mdata = {}
+    for key, value in table_metadata.items():
+        mdata = metadata.write(mdata, (), key.replace("_", "-"), value)
+    for name, sql_data_type, _ in columns:
+        mdata = metadata.write(
+            mdata, ("properties", name), "sql-datatype", sql_data_type
+        )
+
+    return CatalogEntry(
+        tap_stream_id=f"SCHEMA-{table}",
+        stream=table,
+        table=table,
+        schema=Schema(
+            type="object",
+            properties={name: schema for name, _, schema in columns},
+        ),
+        metadata=metadata.to_list(mdata),
+    )
+
+
+def make_key_catalog_entry(sql_data_type="integer"):
+    """SCHEMA.TABLE with a single primary key column ID"""
+    return make_catalog_entry(
+        [("ID", sql_data_type, Schema(type=["integer"]))],
+        database_name="SCHEMA",
+        table_key_properties=["ID"],
+    )
+
+
+def make_rows_catalog_entry():
+    """The FULL_TABLE stream of the rows StreamingResult generates"""
+    return make_catalog_entry(
+        [
+            ("ID", "integer", Schema(type=["null", "integer"])),
+            ("NAME", "varchar", Schema(type=["null", "string"])),
+            ("CREATED", "timestamp", Schema(type=["null", "string"], format="date-time")),
+            (
+                "AMOUNT",
+                "decimal",
+                Schema(type=["null", "number"], format="singer.decimal"),
+            ),
+        ],
+        replication_method="FULL_TABLE",
+        database_name="SCHEMA",
+        table_key_properties=["ID"],
+    )
+
+
+class FakeResult(list):
+    """Canned rows of a query, fetched like a SQLAlchemy result"""
+
+    def __init__(self, rows=()):
+        super().__init__(rows)
+        self.fetch_sizes = []
+
+    def fetchone(self):
+        return self[0] if self else None
+
+    def fetchall(self):
+        return list(self)
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        rows, self[:] = self[:size], self[size:]
+        return rows
+
+
+class FakeEngine:
+    def __init__(self, connection=None):
+        self.connection = connection
+
+    @contextlib.contextmanager
+    def connect(self):
+        yield self.connection
+
+
+class StreamingResult:
+    """Generates rows on demand, like the ibm_db cursor reading them from the
+    server as they are fetched, and records the fetch sizes asked for"""
+
+    def __init__(self, row_count):
+        self.fetch_sizes = []
+        self.rows = (
+            (
+                i,
+                "name %d" % i,
+                datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=i),
+                decimal.Decimal(i) / 100,
+            )
+            for i in range(row_count)
+        )
+
+    def fetchmany(self, arraysize):
+        self.fetch_sizes.append(arraysize)
+        return [row for _, row in zip(range(arraysize), self.rows)]
+
+
+class StreamingConnection:
+    def __init__(self, row_count):
+        self.row_count = row_count
+        self.result = None
+
+    def execute(self, stmt):
+        self.result = StreamingResult(self.row_count)
+        return self.result
+
+
+class DiscardingStdout(io.TextIOBase):
+    def write(self, s):
+        return len(s)